@@ -0,0 +1,197 @@
+"""
+Base class for the agents of the interview preparation framework.
+"""
+import asyncio
+
+from models.hedging import BackupWatch, watch_backup_wins
+from utils.helpers import is_error_response
+from utils.metrics import record_cache_lookup
+from utils.similarity_cache import get_similarity_cache
+
+
+class BaseAgent:
+    """
+    Shared plumbing for agents that send prompts to a model integration.
+    """
+
+    def __init__(self, llm, use_cache=True, similarity_cache=None):
+        """
+        Initialize the agent.
+
+        Args:
+            llm: The language model to use for the agent.
+            use_cache (bool): Whether outputs may be served from the response and similarity caches.
+            similarity_cache (SimilarityCache, optional): Cache of outputs for similar requests.
+                Defaults to the process-wide cache.
+        """
+        self.llm = llm
+        self.use_cache = use_cache
+        self.similarity_cache = similarity_cache or get_similarity_cache()
+
+    def _generate(self, prompt, call_type, stream=False):
+        """
+        Send a prompt to the language model.
+
+        Args:
+            prompt (str): The prompt to send.
+            call_type (str): The type of call, used by integrations to pick the cache TTL.
+            stream (bool): Whether to return a generator of text chunks instead of a string.
+
+        Returns:
+            str or generator: The generated response, or its chunks when streaming.
+        """
+        if stream:
+            return self._generate_stream(prompt, call_type)
+
+        # For now, we'll use the LLM directly instead of the agent
+        # In a future implementation, we'll use the agent with tools
+        if hasattr(self.llm, 'generate_response'):
+            return self.llm.generate_response(prompt, call_type=call_type, use_cache=self.use_cache)
+        else:
+            # Fallback for CrewAI LLM
+            return str(self.llm.invoke(prompt))
+
+    def _in_context(self, **texts):
+        """
+        Get which texts the model already has from earlier in its conversation,
+        when the integration is a session that keeps one.
+
+        Args:
+            **texts: The texts to check, keyed by name.
+
+        Returns:
+            tuple: The names of the texts a prompt can refer to instead of repeating.
+        """
+        in_context = getattr(self.llm, 'in_context', None)
+        if in_context is None:
+            return ()
+        return tuple(name for name, text in texts.items() if in_context(text))
+
+    async def _agenerate(self, prompt, call_type):
+        """
+        Async counterpart of _generate. Models without an async API are called
+        from a worker thread so the event loop is not blocked.
+
+        Args:
+            prompt (str): The prompt to send.
+            call_type (str): The type of call, used by integrations to pick the cache TTL.
+
+        Returns:
+            str: The generated response.
+        """
+        if hasattr(self.llm, 'agenerate_response'):
+            return await self.llm.agenerate_response(prompt, call_type=call_type, use_cache=self.use_cache)
+        return await asyncio.to_thread(self._generate, prompt, call_type)
+
+    def _generate_stream(self, prompt, call_type):
+        """
+        Stream a response from the language model.
+
+        Models without a streaming API yield their whole response as one chunk.
+
+        Args:
+            prompt (str): The prompt to send.
+            call_type (str): The type of call, used by integrations to pick the cache TTL.
+
+        Yields:
+            str: Chunks of the generated response.
+        """
+        if hasattr(self.llm, 'generate_response_stream'):
+            yield from self.llm.generate_response_stream(prompt, call_type=call_type, use_cache=self.use_cache)
+        else:
+            yield self._generate(prompt, call_type)
+
+    def _generate_similar(self, kind, text_fields, exact_fields, generate, stream=False):
+        """
+        Serve an output from the similarity cache, generating and caching it on a miss.
+
+        Args:
+            kind (str): The type of output, e.g. "company_research".
+            text_fields (tuple): Normalized free-text inputs compared by similarity.
+            exact_fields (tuple): Inputs that must match exactly. The model is always included.
+            generate (callable): Called with the stream flag to generate the output on a miss.
+            stream (bool): Whether to return a generator of text chunks instead of a string.
+
+        Returns:
+            str or generator: The cached or generated output.
+        """
+        cache = self.similarity_cache if self.use_cache else None
+        if cache is None:
+            return generate(stream)
+
+        exact_fields, cached = self._lookup_similar(cache, kind, text_fields, exact_fields)
+        if cached is not None:
+            return self._yield_once(cached) if stream else cached
+
+        if stream:
+            return self._store_stream(cache, kind, text_fields, exact_fields, generate(True))
+
+        with watch_backup_wins() as watch:
+            output = generate(False)
+        # Outputs of a hedged call's backup model must not be cached under the primary model
+        if not is_error_response(output) and not watch.backup_won:
+            cache.store(kind, text_fields, output, exact_fields)
+        return output
+
+    async def _agenerate_similar(self, kind, text_fields, exact_fields, agenerate):
+        """
+        Async counterpart of _generate_similar.
+
+        Args:
+            kind (str): The type of output, e.g. "company_research".
+            text_fields (tuple): Normalized free-text inputs compared by similarity.
+            exact_fields (tuple): Inputs that must match exactly. The model is always included.
+            agenerate (callable): Called without arguments to get a coroutine generating the output on a miss.
+
+        Returns:
+            str: The cached or generated output.
+        """
+        cache = self.similarity_cache if self.use_cache else None
+        if cache is None:
+            return await agenerate()
+
+        exact_fields, cached = self._lookup_similar(cache, kind, text_fields, exact_fields)
+        if cached is not None:
+            return cached
+
+        with watch_backup_wins() as watch:
+            output = await agenerate()
+        if not is_error_response(output) and not watch.backup_won:
+            cache.store(kind, text_fields, output, exact_fields)
+        return output
+
+    def _lookup_similar(self, cache, kind, text_fields, exact_fields):
+        """
+        Look up the output of a similar earlier request.
+
+        Returns:
+            tuple: (exact_fields, cached) with the model added to the exact fields,
+                and the cached output or None.
+        """
+        exact_fields = (getattr(self.llm, 'provider', None), getattr(self.llm, 'model_name', None)) + tuple(exact_fields)
+        cached = cache.lookup(kind, text_fields, exact_fields)
+        record_cache_lookup("similarity", kind, cached is not None)
+        if cached is not None:
+            print(f"Serving {kind} for {' / '.join(text_fields)} from the similarity cache")
+        return exact_fields, cached
+
+    @staticmethod
+    def _yield_once(text):
+        yield text
+
+    @staticmethod
+    def _store_stream(cache, kind, text_fields, exact_fields, chunks):
+        parts = []
+        watch = BackupWatch()
+        chunks = iter(chunks)
+        while True:
+            # Only watch while the stream runs, not while the consumer handles a chunk
+            with watch.active():
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+            parts.append(chunk)
+            yield chunk
+        output = "".join(parts)
+        if not is_error_response(output) and not watch.backup_won:
+            cache.store(kind, text_fields, output, exact_fields)
@@ -2,21 +2,39 @@
 Interview agent for the interview preparation framework.
 Simplified version that doesn't rely on crewai.
 """
-from prompts.interview_prompts import InterviewPrompts
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 
-class InterviewAgent:
+from prompts.interview_prompts import InterviewPrompts, INTERVIEW_CATEGORIES
+from agents.base_agent import BaseAgent
+from utils.feedback_parser import AnswerFeedback, parse_batch_feedback
+from utils.helpers import is_error_response, submit_with_context
+from utils.similarity_cache import fingerprint, normalize_company, normalize_role
+
+# Answers graded per model call by provide_feedback_batch
+DEFAULT_FEEDBACK_BATCH_SIZE = 10
+
+
+class IncompleteGuideError(RuntimeError):
+    """
+    Raised when some question categories could not be generated.
+    """
+
+class InterviewAgent(BaseAgent):
     """
     Agent responsible for generating interview questions and answers.
     """
 
-    def __init__(self, llm):
+    def __init__(self, llm, use_cache=True, similarity_cache=None):
         """
         Initialize the interview agent.
 
         Args:
             llm: The language model to use for the agent.
+            use_cache (bool): Whether outputs may be served from the response and similarity caches.
+            similarity_cache (SimilarityCache, optional): Cache of outputs for similar requests.
         """
-        self.llm = llm
+        super().__init__(llm, use_cache=use_cache, similarity_cache=similarity_cache)
 
     def get_interview_preparation_prompt(self):
         """
@@ -41,10 +59,40 @@ class InterviewAgent:
         improve their interview performance. You have a keen eye for identifying strengths and
         weaknesses in answers and can provide actionable feedback that helps candidates improve."""
 
-    def generate_interview_questions(self, role, company_name, experience_level, company_info, role_info):
+    def generate_interview_questions(self, role, company_name, experience_level, company_info, role_info, stream=False):
         """
         Generate interview questions and answers.
 
+        Args:
+            role (str): The job role.
+            company_name (str): The name of the company.
+            experience_level (str): The experience level of the candidate.
+            company_info (str): Information about the company.
+            role_info (str): Information about the role.
+            stream (bool): Whether to return a generator of text chunks instead of a string.
+
+        Returns:
+            str or generator: Generated interview questions and answers.
+        """
+        prompt = InterviewPrompts.interview_questions_prompt(
+            role, company_name, experience_level, company_info, role_info,
+            provider=getattr(self.llm, 'provider', None),
+            model_name=getattr(self.llm, 'model_name', None),
+            in_context=self._in_context(company_info=company_info, role_info=role_info)
+        )
+
+        return self._generate_similar(
+            "interview_questions", (normalize_role(role), normalize_company(company_name)),
+            # Guides are only reused with the research they were written from
+            (experience_level, fingerprint(company_info, role_info)),
+            lambda stream: self._generate(prompt, "interview_questions", stream=stream),
+            stream=stream
+        )
+
+    async def agenerate_interview_questions(self, role, company_name, experience_level, company_info, role_info):
+        """
+        Async counterpart of generate_interview_questions.
+
         Args:
             role (str): The job role.
             company_name (str): The name of the company.
@@ -56,21 +104,161 @@ class InterviewAgent:
             str: Generated interview questions and answers.
         """
         prompt = InterviewPrompts.interview_questions_prompt(
-            role, company_name, experience_level, company_info, role_info
+            role, company_name, experience_level, company_info, role_info,
+            provider=getattr(self.llm, 'provider', None),
+            model_name=getattr(self.llm, 'model_name', None),
+            in_context=self._in_context(company_info=company_info, role_info=role_info)
+        )
+
+        return await self._agenerate_similar(
+            "interview_questions", (normalize_role(role), normalize_company(company_name)),
+            # Guides are only reused with the research they were written from
+            (experience_level, fingerprint(company_info, role_info)),
+            lambda: self._agenerate(prompt, "interview_questions")
+        )
+
+    def generate_interview_questions_parallel(self, role, company_name, experience_level, company_info,
+                                             role_info, stream=False, max_retries=2):
+        """
+        Generate interview questions with one concurrent request per question category.
+
+        Each category is generated and retried on its own, then the sections are
+        merged in category order. If a category still fails after its retries, the
+        guide is incomplete: a string result is an "Error: ..." message, and a
+        stream yields the sections it has, with an error note in place of the
+        failed ones, then raises IncompleteGuideError. Incomplete guides are not
+        cached.
+
+        Args:
+            role (str): The job role.
+            company_name (str): The name of the company.
+            experience_level (str): The experience level of the candidate.
+            company_info (str): Information about the company.
+            role_info (str): Information about the role.
+            stream (bool): Whether to return a generator that yields each section, in order, as soon as it is ready.
+            max_retries (int): Maximum number of retries per category.
+
+        Returns:
+            str or generator: Generated interview questions and answers.
+
+        Raises:
+            IncompleteGuideError: When streaming, after the last section, if a category failed.
+        """
+        def generate(stream):
+            sections = self._generate_category_sections(
+                role, company_name, experience_level, company_info, role_info, max_retries
+            )
+            if stream:
+                return sections
+            try:
+                return "".join(sections)
+            except IncompleteGuideError as e:
+                return f"Error: {e}"
+
+        return self._generate_similar(
+            "interview_questions", (normalize_role(role), normalize_company(company_name)),
+            # Guides are only reused with the research they were written from
+            (experience_level, fingerprint(company_info, role_info)),
+            generate, stream=stream
         )
 
-        # For now, we'll use the LLM directly instead of the agent
-        # In a future implementation, we'll use the agent with tools
-        if hasattr(self.llm, 'generate_response'):
-            return self.llm.generate_response(prompt)
+    def _generate_category_sections(self, role, company_name, experience_level, company_info, role_info,
+                                    max_retries):
+        """
+        Run one request per question category and yield the sections in order.
+
+        Yields:
+            str: The text of each category section.
+
+        Raises:
+            IncompleteGuideError: After the last section, if a category failed.
+        """
+        start_numbers = []
+        number = 1
+        for _, count, _ in INTERVIEW_CATEGORIES:
+            start_numbers.append(number)
+            number += count
+
+        # In a session, each category continues from the same snapshot of the conversation, so the
+        # categories run concurrently and their prompts do not depend on which one finished first
+        if hasattr(self.llm, 'fork'):
+            agents = [
+                InterviewAgent(self.llm.fork(), use_cache=self.use_cache, similarity_cache=self.similarity_cache)
+                for _ in INTERVIEW_CATEGORIES
+            ]
         else:
-            # Fallback for CrewAI LLM
-            return str(self.llm.invoke(prompt))
+            agents = [self] * len(INTERVIEW_CATEGORIES)
+
+        with ThreadPoolExecutor(max_workers=len(INTERVIEW_CATEGORIES)) as executor:
+            futures = [
+                submit_with_context(
+                    executor, agent._generate_category, role, company_name,
+                    experience_level, company_info, role_info, category, start_number, max_retries
+                )
+                for agent, category, start_number in zip(agents, INTERVIEW_CATEGORIES, start_numbers)
+            ]
+            failures = []
+            for index, future in enumerate(futures):
+                section, error = future.result()
+                if error is not None:
+                    failures.append(f"{INTERVIEW_CATEGORIES[index][0]}: {error}")
+                yield ("\n\n" if index else "") + section.strip()
+
+        if failures:
+            raise IncompleteGuideError(
+                f"Could not generate {len(failures)} of {len(INTERVIEW_CATEGORIES)} question categories "
+                f"({'; '.join(failures)})"
+            )
 
-    def provide_feedback(self, candidate_answer, question, ideal_answer):
+    def _generate_category(self, role, company_name, experience_level, company_info, role_info,
+                           category, start_number, max_retries):
+        """
+        Generate the questions of one category, retrying failed attempts.
+
+        Returns:
+            tuple: (section, error) where section is an error note and error is set if every attempt failed.
+        """
+        prompt = InterviewPrompts.interview_category_prompt(
+            role, company_name, experience_level, company_info, role_info, category, start_number,
+            provider=getattr(self.llm, 'provider', None),
+            model_name=getattr(self.llm, 'model_name', None),
+            in_context=self._in_context(company_info=company_info, role_info=role_info)
+        )
+
+        error = None
+        for attempt in range(max_retries + 1):
+            try:
+                section = self._generate(prompt, "interview_questions")
+                if not is_error_response(section):
+                    return section, None
+                error = section or "Error: Empty response"
+            except Exception as e:
+                error = f"Error: {e}"
+            print(f"Generating {category[0]} questions failed (attempt {attempt + 1}/{max_retries + 1}): {error}")
+
+        return f"## {category[0]}\n\n{error}", error
+
+    def provide_feedback(self, candidate_answer, question, ideal_answer, stream=False):
         """
         Provide feedback on a candidate's answer.
 
+        Args:
+            candidate_answer (str): The candidate's answer.
+            question (str): The interview question.
+            ideal_answer (str): The ideal answer to the question.
+            stream (bool): Whether to return a generator of text chunks instead of a string.
+
+        Returns:
+            str or generator: Feedback on the candidate's answer.
+        """
+        prompt = InterviewPrompts.feedback_prompt(candidate_answer, question, ideal_answer)
+
+        return self._generate(prompt, "feedback", stream=stream)
+
+    async def aprovide_feedback(self, candidate_answer, question, ideal_answer):
+        """
+        Async counterpart of provide_feedback.
+
         Args:
             candidate_answer (str): The candidate's answer.
             question (str): The interview question.
@@ -81,10 +269,130 @@ class InterviewAgent:
         """
         prompt = InterviewPrompts.feedback_prompt(candidate_answer, question, ideal_answer)
 
-        # For now, we'll use the LLM directly instead of the agent
-        # In a future implementation, we'll use the agent with tools
-        if hasattr(self.llm, 'generate_response'):
-            return self.llm.generate_response(prompt)
-        else:
-            # Fallback for CrewAI LLM
-            return str(self.llm.invoke(prompt))
+        return await self._agenerate(prompt, "feedback")
+
+    def provide_feedback_batch(self, items, batch_size=DEFAULT_FEEDBACK_BATCH_SIZE, max_workers=4, max_retries=1):
+        """
+        Grade many answers with few model calls.
+
+        Answers are graded batch_size at a time, with up to max_workers calls
+        in flight. Answers whose grading cannot be parsed are graded again on
+        new batches, up to max_retries times.
+
+        Args:
+            items (list): (question, candidate_answer, ideal_answer) tuples.
+            batch_size (int): Answers graded per call; 1 grades each answer with its own call.
+            max_workers (int): Maximum number of calls in flight at once.
+            max_retries (int): How many times answers that could not be graded are graded again.
+
+        Returns:
+            list: One AnswerFeedback per item, in order. The score is None if the answer could not be graded,
+                and the feedback is then the error.
+        """
+        results = [None] * len(items)
+        pending = list(range(len(items)))
+        errors = {}
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            for _ in range(max_retries + 1):
+                if not pending:
+                    break
+                batches = self._batches(pending, batch_size)
+                futures = [submit_with_context(executor, self._grade_batch, items, batch) for batch in batches]
+                pending = self._collect_grades(
+                    batches, [future.result() for future in futures], results, errors
+                )
+        return self._finish_grades(results, errors)
+
+    async def aprovide_feedback_batch(self, items, batch_size=DEFAULT_FEEDBACK_BATCH_SIZE, max_concurrency=4,
+                                      max_retries=1):
+        """
+        Async counterpart of provide_feedback_batch.
+
+        Args:
+            items (list): (question, candidate_answer, ideal_answer) tuples.
+            batch_size (int): Answers graded per call; 1 grades each answer with its own call.
+            max_concurrency (int): Maximum number of calls in flight at once.
+            max_retries (int): How many times answers that could not be graded are graded again.
+
+        Returns:
+            list: One AnswerFeedback per item, in order.
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def grade(batch):
+            async with semaphore:
+                return await self._agrade_batch(items, batch)
+
+        results = [None] * len(items)
+        pending = list(range(len(items)))
+        errors = {}
+        for _ in range(max_retries + 1):
+            if not pending:
+                break
+            batches = self._batches(pending, batch_size)
+            grades = await asyncio.gather(*(grade(batch) for batch in batches))
+            pending = self._collect_grades(batches, grades, results, errors)
+        return self._finish_grades(results, errors)
+
+    @staticmethod
+    def _batches(indices, batch_size):
+        batch_size = max(1, batch_size)
+        return [indices[start:start + batch_size] for start in range(0, len(indices), batch_size)]
+
+    def _grade_batch(self, items, batch):
+        """
+        Grade the answers at the given indices with one model call.
+
+        Returns:
+            tuple: (AnswerFeedback by index for the answers that were graded, error or None)
+        """
+        prompt = InterviewPrompts.batch_feedback_prompt([items[index] for index in batch])
+        try:
+            return self._parse_grades(batch, self._generate(prompt, "feedback"))
+        except Exception as e:
+            return {}, f"Error: {e}"
+
+    async def _agrade_batch(self, items, batch):
+        """
+        Async counterpart of _grade_batch.
+        """
+        prompt = InterviewPrompts.batch_feedback_prompt([items[index] for index in batch])
+        try:
+            return self._parse_grades(batch, await self._agenerate(prompt, "feedback"))
+        except Exception as e:
+            return {}, f"Error: {e}"
+
+    @staticmethod
+    def _parse_grades(batch, response):
+        if is_error_response(response):
+            return {}, response or "Error: Empty response"
+        parsed = parse_batch_feedback(response)
+        graded = {
+            index: AnswerFeedback(index + 1, parsed[number].score, parsed[number].feedback)
+            for number, index in enumerate(batch, start=1) if number in parsed
+        }
+        return graded, "Error: Could not parse the grading of this answer."
+
+    @staticmethod
+    def _collect_grades(batches, grades, results, errors):
+        """
+        Store the answers that were graded and return the indices still to grade.
+        """
+        pending = []
+        for batch, (graded, error) in zip(batches, grades):
+            for index in batch:
+                if index in graded:
+                    results[index] = graded[index]
+                else:
+                    errors[index] = error
+                    pending.append(index)
+        if pending:
+            print(f"Could not grade {len(pending)} of the answers")
+        return pending
+
+    @staticmethod
+    def _finish_grades(results, errors):
+        return [
+            feedback if feedback is not None else AnswerFeedback(index + 1, None, errors[index])
+            for index, feedback in enumerate(results)
+        ]
@@ -0,0 +1,323 @@
+"""
+Pipeline helpers for the interview preparation framework.
+Runs the research stages that do not depend on each other side by side, and
+the whole pipeline as a background job whose stages are memoized on their inputs.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from agents.interview_agent import InterviewAgent
+from agents.research_agent import ResearchAgent
+from agents.stage_graph import Stage, StageGraph, get_stage_memo
+from models.hedging import watch_backup_wins
+from utils.guide_archive import get_guide_archive
+from utils.guide_parser import GuideParser, parse_interview_questions
+from utils.helpers import is_error_response, submit_with_context
+from utils.metrics import pipeline_run, record_cache_lookup, stage_timer
+
+COMPANY_RESEARCH_STAGE = "company_research"
+ROLE_ANALYSIS_STAGE = "role_analysis"
+INTERVIEW_QUESTIONS_STAGE = "interview_questions"
+
+
+def get_fallback_research(stage, role, company_name, experience_level):
+    """
+    Get the simplified context used when a research stage fails.
+
+    Args:
+        stage (str): The name of the failed stage.
+        role (str): The job role.
+        company_name (str): The name of the company.
+        experience_level (str): The experience level of the candidate.
+
+    Returns:
+        str: The fallback context for the stage.
+    """
+    if stage == COMPANY_RESEARCH_STAGE:
+        return f"Company: {company_name}"
+    return f"Role: {role}, Experience: {experience_level}"
+
+
+def run_research_stages(research_agent, role, company_name, experience_level,
+                        on_stage_complete=None, concurrent=True):
+    """
+    Run company research and role analysis.
+
+    Neither stage uses the other's output, so by default both LLM calls are
+    issued at the same time. A stage that raises is replaced by its simplified
+    fallback context instead of failing the whole pipeline.
+
+    Args:
+        research_agent (ResearchAgent): The agent used for both stages.
+        role (str): The job role.
+        company_name (str): The name of the company.
+        experience_level (str): The experience level of the candidate.
+        on_stage_complete (callable, optional): Called as
+            on_stage_complete(stage, error) from the calling thread as each stage finishes.
+        concurrent (bool): Whether to run the two stages concurrently.
+
+    Returns:
+        tuple: (company_info, role_info, errors) where errors maps failed stage names to exceptions.
+    """
+    def timed(stage, fn):
+        def run():
+            with stage_timer(stage):
+                return fn()
+        return run
+
+    stages = {
+        COMPANY_RESEARCH_STAGE: timed(COMPANY_RESEARCH_STAGE, lambda: research_agent.research_company(company_name)),
+        ROLE_ANALYSIS_STAGE: timed(
+            ROLE_ANALYSIS_STAGE, lambda: research_agent.analyze_role(role, company_name, experience_level)
+        ),
+    }
+    results = {}
+    errors = {}
+
+    def finish(stage, result=None, error=None):
+        if error is not None:
+            print(f"Stage {stage} failed: {error}")
+            errors[stage] = error
+            result = get_fallback_research(stage, role, company_name, experience_level)
+        results[stage] = result
+        if on_stage_complete:
+            on_stage_complete(stage, error)
+
+    if concurrent:
+        with ThreadPoolExecutor(max_workers=len(stages)) as executor:
+            futures = {submit_with_context(executor, fn): stage for stage, fn in stages.items()}
+            # Callbacks run here rather than in the worker threads so callers
+            # can safely update UI elements from them
+            for future in as_completed(futures):
+                stage = futures[future]
+                try:
+                    finish(stage, result=future.result())
+                except Exception as e:
+                    finish(stage, error=e)
+    else:
+        for stage, fn in stages.items():
+            try:
+                finish(stage, result=fn())
+            except Exception as e:
+                finish(stage, error=e)
+
+    return results[COMPANY_RESEARCH_STAGE], results[ROLE_ANALYSIS_STAGE], errors
+
+
+async def arun_research_stages(research_agent, role, company_name, experience_level, on_stage_complete=None):
+    """
+    Async counterpart of run_research_stages. Both stages always run concurrently
+    on the event loop, and cancelling the caller cancels them.
+
+    Args:
+        research_agent (ResearchAgent): The agent used for both stages.
+        role (str): The job role.
+        company_name (str): The name of the company.
+        experience_level (str): The experience level of the candidate.
+        on_stage_complete (callable, optional): Called as on_stage_complete(stage, error) as each stage finishes.
+
+    Returns:
+        tuple: (company_info, role_info, errors) where errors maps failed stage names to exceptions.
+    """
+    async def run_stage(stage, coro):
+        with stage_timer(stage):
+            try:
+                return stage, await coro, None
+            except Exception as e:
+                return stage, None, e
+
+    tasks = [
+        asyncio.ensure_future(run_stage(COMPANY_RESEARCH_STAGE, research_agent.aresearch_company(company_name))),
+        asyncio.ensure_future(run_stage(
+            ROLE_ANALYSIS_STAGE, research_agent.aanalyze_role(role, company_name, experience_level)
+        )),
+    ]
+    results = {}
+    errors = {}
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            stage, result, error = await next_done
+            if error is not None:
+                print(f"Stage {stage} failed: {error}")
+                errors[stage] = error
+                result = get_fallback_research(stage, role, company_name, experience_level)
+            results[stage] = result
+            if on_stage_complete:
+                on_stage_complete(stage, error)
+    finally:
+        # Stop the other stage if the caller was cancelled
+        for task in tasks:
+            task.cancel()
+
+    return results[COMPANY_RESEARCH_STAGE], results[ROLE_ANALYSIS_STAGE], errors
+
+
+def run_interview_guide_job(job, model_integration, role, company_name, experience_level, use_cache=True,
+                            concurrent_research=True, parallel_categories=False):
+    """
+    Generate an interview guide as a background job, recording progress and partial results on the job.
+
+    The research stages are stored as they finish and the guide's text is
+    appended as it streams in, so the app can show them while the job runs.
+    With use_cache, each stage is memoized on its own inputs, so a resubmitted
+    request only runs the stages whose inputs changed, and a request answered
+    before is served from the guide archive. Every full guide is archived.
+
+    Args:
+        job (Job): The job running the pipeline.
+        model_integration: The model integration used by the agents.
+        role (str): The job role.
+        company_name (str): The name of the company.
+        experience_level (str): The experience level of the candidate.
+        use_cache (bool): Whether outputs may be served from the caches, the stage memo and the archive.
+        concurrent_research (bool): Whether to run the research stages concurrently.
+        parallel_categories (bool): Whether to generate each question category with its own request.
+
+    Returns:
+        dict: The guide's text ("interview_questions"), its parsed questions, the pipeline run ID
+            and the guide's ID in the archive ("guide_id", None if it was not archived).
+    """
+    research_agent = ResearchAgent(model_integration, use_cache=use_cache)
+    interview_agent = InterviewAgent(model_integration, use_cache=use_cache)
+    stage_labels = {
+        COMPANY_RESEARCH_STAGE: "company information",
+        ROLE_ANALYSIS_STAGE: "job role requirements",
+    }
+    streamed_questions = []
+
+    def stream_interview_questions(role, company_name, experience_level, parallel_categories,
+                                   company_research, role_analysis):
+        # A retry replaces any partial output
+        guide_parser = GuideParser()
+        job.update(interview_questions="")
+        if parallel_categories:
+            generate_questions = interview_agent.generate_interview_questions_parallel
+        else:
+            generate_questions = interview_agent.generate_interview_questions
+        for chunk in guide_parser.parse_stream(generate_questions(
+            role, company_name, experience_level, company_research, role_analysis, stream=True
+        )):
+            job.check_cancelled()
+            job.append("interview_questions", chunk)
+        streamed_questions[:] = guide_parser.questions
+        return job.snapshot()["partial"]["interview_questions"]
+
+    def fallback(stage):
+        return lambda request: get_fallback_research(stage, role, company_name, experience_level)
+
+    graph = StageGraph(
+        [
+            Stage(COMPANY_RESEARCH_STAGE, research_agent.research_company, inputs=("company_name",),
+                  fallback=fallback(COMPANY_RESEARCH_STAGE)),
+            Stage(ROLE_ANALYSIS_STAGE, research_agent.analyze_role,
+                  inputs=("role", "company_name", "experience_level"), fallback=fallback(ROLE_ANALYSIS_STAGE)),
+            Stage(INTERVIEW_QUESTIONS_STAGE, stream_interview_questions,
+                  inputs=("role", "company_name", "experience_level", "parallel_categories"),
+                  depends_on=(COMPANY_RESEARCH_STAGE, ROLE_ANALYSIS_STAGE)),
+        ],
+        memo=get_stage_memo() if use_cache else None,
+        scope=(getattr(model_integration, "provider", None), getattr(model_integration, "model_name", None))
+    )
+    request = {
+        "role": role,
+        "company_name": company_name,
+        "experience_level": experience_level,
+        "parallel_categories": parallel_categories,
+    }
+
+    provider = getattr(model_integration, "provider", None)
+    model_name = getattr(model_integration, "model_name", None)
+    archive = get_guide_archive()
+    guide_id = None
+
+    with pipeline_run(source="app", provider=provider, model=model_name) as run_metrics:
+        job.update(run_id=run_metrics.run_id)
+
+        # A request answered before is served from the archive without calling the model
+        archived = None
+        if archive is not None and use_cache:
+            archived = archive.find(role, company_name, experience_level, provider, model_name)
+            record_cache_lookup("guide_archive", INTERVIEW_QUESTIONS_STAGE, archived is not None)
+        if archived is not None:
+            archive.add_owner(archived["guide_id"], job.session_id)
+            job.update(
+                progress=100, message="Completed! Loaded the interview questions generated earlier for this request.",
+                company_info=archived["company_info"], role_info=archived["role_info"],
+                interview_questions=archived["interview_questions"]
+            )
+            return {
+                "interview_questions": archived["interview_questions"],
+                "questions": archived["questions"],
+                "run_id": run_metrics.run_id,
+                "guide_id": archived["guide_id"],
+            }
+
+        try:
+            completed_stages = []
+
+            def on_stage_complete(stage, output, error, reused):
+                if stage == INTERVIEW_QUESTIONS_STAGE:
+                    # A reused guide was not streamed
+                    job.update(interview_questions=output)
+                    return
+                completed_stages.append(stage)
+                job.update(**{"company_info" if stage == COMPANY_RESEARCH_STAGE else "role_info": output})
+                if error is not None:
+                    job.warn(
+                        f"Could not finish researching {stage_labels[stage]}, using a simplified summary: {error}"
+                    )
+                if len(completed_stages) == 2:
+                    message = "Step 3/3: Generating interview questions and answers..."
+                elif reused:
+                    message = f"Step {len(completed_stages)}/3: Reused the {stage_labels[stage]} from an earlier run..."
+                else:
+                    message = f"Step {len(completed_stages)}/3: Finished researching {stage_labels[stage]}..."
+                job.update(progress=33 * len(completed_stages), message=message)
+                job.check_cancelled()
+
+            if concurrent_research:
+                message = "Steps 1-2/3: Researching company information and analyzing job role requirements..."
+            else:
+                message = "Steps 1-2/3: Researching company information, then analyzing job role requirements..."
+            job.update(progress=0, message=message)
+            with watch_backup_wins() as watch:
+                outputs, errors, reused = graph.run(request, on_stage_complete=on_stage_complete,
+                                                    concurrent=concurrent_research)
+            interview_questions = outputs[INTERVIEW_QUESTIONS_STAGE]
+            if INTERVIEW_QUESTIONS_STAGE in reused:
+                parsed_questions = parse_interview_questions(interview_questions)
+            else:
+                parsed_questions = list(streamed_questions)
+                # Guides written from simplified or failed research are not kept in place of a full one
+                failed = errors or any(is_error_response(output) for output in outputs.values())
+                # The archive is keyed on the primary model, so guides partly written by a hedged call's
+                # backup model are not archived
+                if archive is not None and not failed and not watch.backup_won:
+                    guide_id = archive.put(
+                        role, company_name, experience_level, provider, model_name, interview_questions,
+                        company_info=outputs[COMPANY_RESEARCH_STAGE], role_info=outputs[ROLE_ANALYSIS_STAGE],
+                        questions=[question.to_dict() for question in parsed_questions], owner=job.session_id
+                    )
+        except Exception as e:
+            # A cancelled job stops instead of falling back
+            if job.cancelled:
+                raise
+            job.warn(f"An error occurred during generation: {e}. Trying an alternative approach with simplified "
+                     "prompts...")
+
+            # Fallback to direct question generation without detailed research
+            with stage_timer(INTERVIEW_QUESTIONS_STAGE):
+                interview_questions = stream_interview_questions(
+                    role, company_name, experience_level, parallel_categories,
+                    get_fallback_research(COMPANY_RESEARCH_STAGE, role, company_name, experience_level),
+                    get_fallback_research(ROLE_ANALYSIS_STAGE, role, company_name, experience_level)
+                )
+            parsed_questions = list(streamed_questions)
+
+    job.update(progress=100, message="Completed! Here are your interview questions and answers.")
+    return {
+        "interview_questions": interview_questions,
+        "questions": [question.to_dict() for question in parsed_questions],
+        "run_id": run_metrics.run_id,
+        "guide_id": guide_id,
+    }
@@ -2,21 +2,33 @@
 Research agent for the interview preparation framework.
 Simplified version that doesn't rely on crewai.
 """
+import asyncio
+
 from prompts.interview_prompts import InterviewPrompts
+from agents.base_agent import BaseAgent
+from utils.company_index import get_company_index
+from utils.metrics import record_cache_lookup
+from utils.similarity_cache import normalize_company, normalize_role
 
-class ResearchAgent:
+class ResearchAgent(BaseAgent):
     """
     Agent responsible for researching company and role information.
     """
 
-    def __init__(self, llm):
+    def __init__(self, llm, use_cache=True, similarity_cache=None, company_index=None):
         """
         Initialize the research agent.
 
         Args:
             llm: The language model to use for the agent.
+            use_cache (bool): Whether outputs may be served from the company index and the
+                response and similarity caches.
+            similarity_cache (SimilarityCache, optional): Cache of outputs for similar requests.
+            company_index (CompanyIndex, optional): Pre-generated company research.
+                Defaults to the process-wide index.
         """
-        self.llm = llm
+        super().__init__(llm, use_cache=use_cache, similarity_cache=similarity_cache)
+        self.company_index = company_index or get_company_index()
 
     def get_company_research_prompt(self):
         """
@@ -42,30 +54,94 @@ class ResearchAgent:
         into clear skill requirements and help candidates understand what companies are really
         looking for in specific roles."""
 
-    def research_company(self, company_name):
+    def research_company(self, company_name, stream=False):
         """
         Research information about a company.
 
+        Args:
+            company_name (str): The name of the company to research.
+            stream (bool): Whether to return a generator of text chunks instead of a string.
+
+        Returns:
+            str or generator: Information about the company.
+        """
+        research = self._get_indexed_research(company_name)
+        if research is not None:
+            return self._yield_once(research) if stream else research
+
+        prompt = InterviewPrompts.company_research_prompt(company_name)
+
+        return self._generate_similar(
+            "company_research", (normalize_company(company_name),), (),
+            lambda stream: self._generate(prompt, "company_research", stream=stream),
+            stream=stream
+        )
+
+    async def aresearch_company(self, company_name):
+        """
+        Async counterpart of research_company.
+
         Args:
             company_name (str): The name of the company to research.
 
         Returns:
             str: Information about the company.
         """
+        # The company index is a SQLite database, so it is read in a worker thread instead of on the event loop
+        research = await asyncio.to_thread(self._get_indexed_research, company_name)
+        if research is not None:
+            return research
+
         prompt = InterviewPrompts.company_research_prompt(company_name)
 
-        # For now, we'll use the LLM directly instead of the agent
-        # In a future implementation, we'll use the agent with tools
-        if hasattr(self.llm, 'generate_response'):
-            return self.llm.generate_response(prompt)
-        else:
-            # Fallback for CrewAI LLM
-            return str(self.llm.invoke(prompt))
+        return await self._agenerate_similar(
+            "company_research", (normalize_company(company_name),), (),
+            lambda: self._agenerate(prompt, "company_research")
+        )
 
-    def analyze_role(self, role, company_name, experience_level):
+    def _get_indexed_research(self, company_name):
+        """
+        Look up pre-generated research for a company in the company index.
+
+        Args:
+            company_name (str): The name of the company.
+
+        Returns:
+            str: The indexed research, or None if caching is off or the company is not indexed.
+        """
+        if not self.use_cache or self.company_index is None:
+            return None
+        research = self.company_index.get(
+            company_name, getattr(self.llm, 'provider', None), getattr(self.llm, 'model_name', None)
+        )
+        record_cache_lookup("company_index", "company_research", research is not None)
+        return research
+
+    def analyze_role(self, role, company_name, experience_level, stream=False):
         """
         Analyze a job role.
 
+        Args:
+            role (str): The job role to analyze.
+            company_name (str): The name of the company.
+            experience_level (str): The experience level of the candidate.
+            stream (bool): Whether to return a generator of text chunks instead of a string.
+
+        Returns:
+            str or generator: Analysis of the job role.
+        """
+        prompt = InterviewPrompts.role_analysis_prompt(role, company_name, experience_level)
+
+        return self._generate_similar(
+            "role_analysis", (normalize_role(role), normalize_company(company_name)), (experience_level,),
+            lambda stream: self._generate(prompt, "role_analysis", stream=stream),
+            stream=stream
+        )
+
+    async def aanalyze_role(self, role, company_name, experience_level):
+        """
+        Async counterpart of analyze_role.
+
         Args:
             role (str): The job role to analyze.
             company_name (str): The name of the company.
@@ -76,10 +152,7 @@ class ResearchAgent:
         """
         prompt = InterviewPrompts.role_analysis_prompt(role, company_name, experience_level)
 
-        # For now, we'll use the LLM directly instead of the agent
-        # In a future implementation, we'll use the agent with tools
-        if hasattr(self.llm, 'generate_response'):
-            return self.llm.generate_response(prompt)
-        else:
-            # Fallback for CrewAI LLM
-            return str(self.llm.invoke(prompt))
+        return await self._agenerate_similar(
+            "role_analysis", (normalize_role(role), normalize_company(company_name)), (experience_level,),
+            lambda: self._agenerate(prompt, "role_analysis")
+        )
@@ -0,0 +1,259 @@
+"""
+Dependency-aware stage memoization for the interview preparation framework.
+
+The pipeline is modeled as a small DAG of stages. Each stage is a function
+of the request fields and upstream stage outputs it declares, and its output
+is memoized on exactly those inputs. When a request is edited and submitted
+again, only the stages whose inputs changed run again: changing the
+experience level reuses the company research, and resubmitting identical
+inputs reuses every stage.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from models.hedging import watch_backup_wins
+from utils.helpers import is_error_response, submit_with_context
+from utils.metrics import record_cache_lookup, stage_timer
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_TTL_SECONDS = 60 * 60
+
+
+class StageMemo:
+    """
+    In-memory LRU of stage outputs keyed on each stage's inputs.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS):
+        """
+        Initialize the memo.
+
+        Args:
+            max_entries (int): Maximum number of outputs kept.
+            ttl_seconds (float): How long an output is reused.
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """
+        Get a memoized output.
+
+        Args:
+            key (str): The stage key.
+
+        Returns:
+            str: The output, or None if it is unknown or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        """
+        Memoize an output, evicting the least recently used ones if the memo is full.
+
+        Args:
+            key (str): The stage key.
+            value (str): The output.
+        """
+        with self._lock:
+            self._entries[key] = (value, time.time() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class Stage:
+    """
+    A pipeline stage and the inputs it depends on.
+    """
+
+    def __init__(self, name, fn, inputs=(), depends_on=(), fallback=None):
+        """
+        Initialize the stage.
+
+        Args:
+            name (str): The name of the stage.
+            fn (callable): Called with the declared request fields and upstream outputs as keyword arguments.
+            inputs (tuple): Names of the request fields the stage uses.
+            depends_on (tuple): Names of the stages whose outputs the stage uses.
+            fallback (callable, optional): Called with the request to get an output if the stage fails.
+                Without one, the stage's error is raised.
+        """
+        self.name = name
+        self.fn = fn
+        self.inputs = tuple(inputs)
+        self.depends_on = tuple(depends_on)
+        self.fallback = fallback
+
+
+class StageGraph:
+    """
+    Runs stages in dependency order, reusing memoized outputs.
+    """
+
+    def __init__(self, stages, memo=None, scope=()):
+        """
+        Initialize the graph.
+
+        Args:
+            stages (list): The stages, each listed after the stages it depends on.
+            memo (StageMemo, optional): Where outputs are memoized. Without one, every stage runs.
+            scope (tuple): Settings that affect every stage, such as the provider and model.
+        """
+        self.stages = list(stages)
+        self.memo = memo
+        self.scope = scope
+
+    def stage_key(self, stage, request, outputs):
+        """
+        Build the memo key of a stage from exactly its own inputs.
+
+        Args:
+            stage (Stage): The stage.
+            request (dict): The request fields.
+            outputs (dict): The outputs of the stages run so far.
+
+        Returns:
+            str: A hex digest identifying the stage's inputs.
+        """
+        payload = json.dumps(
+            [stage.name, self.scope, [request[name] for name in stage.inputs],
+             [outputs[name] for name in stage.depends_on]],
+            sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def run(self, request, on_stage_complete=None, concurrent=True):
+        """
+        Run the stages whose memoized outputs cannot be reused.
+
+        Stages whose dependencies are ready at the same time run concurrently.
+
+        Args:
+            request (dict): The request fields.
+            on_stage_complete (callable, optional): Called as on_stage_complete(stage, output, error, reused)
+                from the calling thread as each stage finishes.
+            concurrent (bool): Whether independent stages run at the same time.
+
+        Returns:
+            tuple: (outputs, errors, reused) where outputs maps stage names to outputs, errors maps
+                failed stage names to exceptions and reused is the set of stages served from the memo.
+        """
+        outputs = {}
+        errors = {}
+        reused = set()
+
+        def finish(stage, key, output=None, error=None, from_memo=False, memoize=True):
+            if error is not None:
+                if stage.fallback is None:
+                    raise error
+                print(f"Stage {stage.name} failed: {error}")
+                errors[stage.name] = error
+                output = stage.fallback(request)
+            elif from_memo:
+                reused.add(stage.name)
+            elif self.memo is not None and memoize and not is_error_response(output):
+                self.memo.put(key, output)
+            outputs[stage.name] = output
+            if on_stage_complete:
+                on_stage_complete(stage.name, output, error, from_memo)
+
+        remaining = list(self.stages)
+        while remaining:
+            ready = [stage for stage in remaining if all(name in outputs for name in stage.depends_on)]
+            if not ready:
+                raise ValueError("Stage dependencies cannot be satisfied: " +
+                                 ", ".join(stage.name for stage in remaining))
+            remaining = [stage for stage in remaining if stage not in ready]
+
+            to_run = []
+            for stage in ready:
+                key = self.stage_key(stage, request, outputs)
+                output = self.memo.get(key) if self.memo is not None else None
+                if self.memo is not None:
+                    record_cache_lookup("stage_memo", stage.name, output is not None)
+                if output is not None:
+                    finish(stage, key, output=output, from_memo=True)
+                else:
+                    to_run.append((stage, key))
+
+            if concurrent and len(to_run) > 1:
+                with ThreadPoolExecutor(max_workers=len(to_run)) as executor:
+                    futures = {
+                        submit_with_context(executor, self._run_stage, stage, request, outputs): (stage, key)
+                        for stage, key in to_run
+                    }
+                    # Callbacks run here rather than in the worker threads, and an exception
+                    # they raise stops the run instead of being taken for the stage's error
+                    for future in as_completed(futures):
+                        stage, key = futures[future]
+                        try:
+                            output, memoize = future.result()
+                        except Exception as e:
+                            finish(stage, key, error=e)
+                        else:
+                            finish(stage, key, output=output, memoize=memoize)
+            else:
+                for stage, key in to_run:
+                    try:
+                        output, memoize = self._run_stage(stage, request, outputs)
+                    except Exception as e:
+                        finish(stage, key, error=e)
+                    else:
+                        finish(stage, key, output=output, memoize=memoize)
+
+        return outputs, errors, reused
+
+    @staticmethod
+    def _run_stage(stage, request, outputs):
+        """
+        Run a stage.
+
+        Returns:
+            tuple: (output, memoize) where memoize is False if a hedged call in the stage was answered by
+                the backup model, whose output must not be reused as the primary model's.
+        """
+        kwargs = {name: request[name] for name in stage.inputs}
+        kwargs.update({name: outputs[name] for name in stage.depends_on})
+        with stage_timer(stage.name), watch_backup_wins() as watch:
+            output = stage.fn(**kwargs)
+        return output, not watch.backup_won
+
+
+_stage_memo = None
+_stage_memo_lock = threading.Lock()
+
+
+def get_stage_memo():
+    """
+    Get the process-wide stage memo, configured from STAGE_MEMO_MAX_ENTRIES and STAGE_MEMO_TTL.
+
+    Returns:
+        StageMemo: The shared memo, or None if STAGE_MEMO_DISABLED is set.
+    """
+    global _stage_memo
+    if os.getenv("STAGE_MEMO_DISABLED", "").lower() in ("1", "true", "yes"):
+        return None
+    with _stage_memo_lock:
+        if _stage_memo is None:
+            _stage_memo = StageMemo(
+                max_entries=int(os.getenv("STAGE_MEMO_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+                ttl_seconds=float(os.getenv("STAGE_MEMO_TTL", DEFAULT_TTL_SECONDS))
+            )
+        return _stage_memo
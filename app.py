@@ -2,16 +2,27 @@
 Main Streamlit application for the interview preparation framework.
 """
 import streamlit as st
+import json
 import os
 import time
-from dotenv import load_dotenv
+import uuid
 
-from agents.research_agent import ResearchAgent
-from agents.interview_agent import InterviewAgent
-from utils.helpers import get_model_integration, format_interview_questions, validate_inputs
+from agents.pipeline import run_interview_guide_job
+from utils.helpers import get_hedged_integration, get_model_integration, load_environment, validate_inputs
+from utils.guide_archive import get_guide_archive
+from utils.model_discovery import get_available_models
+from utils.similarity_cache import get_similarity_cache
+from utils.job_queue import ACTIVE_STATUSES, DONE, FAILED, get_job_queue
+from utils.metrics import get_registry, start_metrics_server
 
-# Load environment variables from .env file
-load_dotenv()
+# Load environment variables from .env file (once per process, not on every rerun)
+load_environment()
+
+# Export metrics for Prometheus when METRICS_PORT is set
+start_metrics_server()
+
+# Seconds between checks on a generation in progress
+JOB_POLL_SECONDS = 1.0
 
 # Set page configuration
 st.set_page_config(
@@ -67,25 +78,15 @@ def main():
         index=0
     )
 
-    # Get available models based on the selected provider
+    # Get the last known models for the selected provider; the list is refreshed in the background
     if model_provider == "Google AI Studio":
-        try:
-            google_integration = get_model_integration("google")
-            available_models = google_integration.get_available_models()
-            # Ensure our specific model is first in the list
-            if "gemini-2.5-pro-exp-03-25" in available_models:
-                available_models.remove("gemini-2.5-pro-exp-03-25")
-                available_models.insert(0, "gemini-2.5-pro-exp-03-25")
-        except Exception as e:
-            st.sidebar.warning(f"Error connecting to Google AI Studio: {e}")
-            available_models = ["gemini-2.5-pro-exp-03-25", "gemini-pro", "gemini-pro-vision"]
+        available_models = get_available_models("google")
+        # Ensure our specific model is first in the list
+        if "gemini-2.5-pro-exp-03-25" in available_models:
+            available_models.remove("gemini-2.5-pro-exp-03-25")
+            available_models.insert(0, "gemini-2.5-pro-exp-03-25")
     else:  # Ollama
-        try:
-            ollama_integration = get_model_integration("ollama")
-            available_models = ollama_integration.get_available_models()
-        except Exception as e:
-            st.sidebar.warning(f"Error connecting to Ollama: {e}")
-            available_models = ["llama3", "mistral", "gemma", "codellama"]
+        available_models = get_available_models("ollama")
 
     model_name = st.sidebar.selectbox(
         "Select Model",
@@ -93,6 +94,23 @@ def main():
         index=0
     )
 
+    # Load the selected Ollama model in the background so the first request does not wait for it
+    if model_provider == "Ollama":
+        try:
+            if get_model_integration("ollama", model_name).warm_up():
+                st.sidebar.caption(f"Loading {model_name} into memory...")
+        except Exception as e:
+            print(f"Error warming up Ollama model {model_name}: {e}")
+
+    continue_context = False
+    if model_provider == "Ollama":
+        continue_context = st.sidebar.checkbox(
+            "Continue the model's context across steps",
+            value=True,
+            help="Generate the questions from the context the model built up while researching, instead of "
+                 "sending the research again. The research steps then run one after another."
+        )
+
     # Add API key input for Google AI Studio
     if model_provider == "Google AI Studio":
         google_api_key = st.sidebar.text_input(
@@ -103,6 +121,54 @@ def main():
         if google_api_key:
             os.environ["GOOGLE_API_KEY"] = google_api_key
 
+    hedge_requests = st.sidebar.checkbox(
+        "Hedge slow requests with a backup model",
+        value=bool(os.getenv("HEDGE_PROVIDER")),
+        help="If a request is slower than most recent ones, send it to a backup model too and use whichever "
+             "answers first."
+    )
+    backup_provider = backup_model = None
+    if hedge_requests:
+        providers = {"Ollama": "ollama", "Google AI Studio": "google"}
+        default_backup = os.getenv("HEDGE_PROVIDER", "ollama" if model_provider == "Google AI Studio" else "google")
+        backup_label = st.sidebar.selectbox(
+            "Backup Model Provider",
+            list(providers),
+            index=list(providers.values()).index(default_backup) if default_backup in providers.values() else 0
+        )
+        backup_provider = providers[backup_label]
+        backup_model = st.sidebar.selectbox("Backup Model", get_available_models(backup_provider), index=0)
+        # A local backup model is only fast if it is already loaded
+        if backup_provider == "ollama":
+            try:
+                get_model_integration("ollama", backup_model).warm_up()
+            except Exception as e:
+                print(f"Error warming up Ollama model {backup_model}: {e}")
+
+    concurrent_research = st.sidebar.checkbox(
+        "Run research steps concurrently",
+        value=True,
+        help="Research the company and analyze the role at the same time."
+    )
+
+    parallel_categories = st.sidebar.checkbox(
+        "Generate question categories in parallel",
+        value=False,
+        help="Generate each question category with its own request at the same time. Faster, but uses more requests."
+    )
+
+    use_cache = st.sidebar.checkbox(
+        "Use cached responses",
+        value=True,
+        help="Reuse recent results instead of calling the model again. Only the steps whose inputs changed are rerun."
+    )
+
+    show_performance = st.sidebar.checkbox(
+        "Show performance panel",
+        value=False,
+        help="Show stage timings, token counts, retries and cache hits for the last run."
+    )
+
     # Main form
     with st.form("interview_form"):
         st.markdown('<h2 class="sub-header">Interview Details</h2>', unsafe_allow_html=True)
@@ -124,6 +190,10 @@ def main():
         # Submit button
         submit_button = st.form_submit_button("Generate Interview Questions")
 
+    # Generation runs as a background job, so reruns caused by widget interactions do not restart it
+    job_queue = get_job_queue()
+    session_id = st.session_state.setdefault("session_id", uuid.uuid4().hex)
+
     # Process form submission
     if submit_button:
         # Validate inputs
@@ -132,70 +202,152 @@ def main():
         if not is_valid:
             st.error(error_message)
         else:
-            # Show loading spinner
-            with st.spinner("Generating interview questions and answers..."):
-                try:
-                    # Get model integration
-                    model_integration = get_model_integration(
-                        "ollama" if model_provider == "Ollama" else "google",
-                        model_name
-                    )
+            provider = "ollama" if model_provider == "Ollama" else "google"
+            try:
+                # Get model integration
+                if hedge_requests:
+                    model_integration = get_hedged_integration(provider, model_name, backup_provider, backup_model)
+                elif continue_context:
+                    # A backup model would not have the session's context, so sessions are not hedged
+                    model_integration = get_model_integration(provider, model_name).session()
+                else:
+                    model_integration = get_model_integration(provider, model_name)
+
+                # A new submission replaces the session's generation in progress
+                if st.session_state.get("job_id"):
+                    job_queue.cancel(st.session_state["job_id"])
+                st.session_state["job_id"] = job_queue.submit(
+                    session_id, run_interview_guide_job, kind="interview_guide",
+                    model_integration=model_integration, role=role, company_name=company_name,
+                    experience_level=experience_level, use_cache=use_cache,
+                    concurrent_research=concurrent_research, parallel_categories=parallel_categories
+                )
+                st.session_state["job_request"] = {"role": role, "company_name": company_name}
+            except Exception as e:
+                st.error(f"An error occurred: {e}")
+
+    # Show the progress and results of the session's generation
+    job = job_queue.get(st.session_state["job_id"]) if st.session_state.get("job_id") else None
+    polling = False
+    if job is not None:
+        state = job.snapshot()
+        request = st.session_state.get("job_request", {})
+        role_label, company_label = request.get("role", ""), request.get("company_name", "")
+        if state["partial"].get("run_id"):
+            st.session_state["last_run_id"] = state["partial"]["run_id"]
+
+        for warning in state["warnings"]:
+            st.warning(warning)
+        if state["status"] in ACTIVE_STATUSES:
+            polling = True
+            st.progress(state["progress"])
+            st.info(state["message"])
+            if st.button("Cancel generation"):
+                job_queue.cancel(state["job_id"])
+        elif state["status"] == DONE:
+            st.progress(100)
+            st.success(state["message"])
+        elif state["status"] == FAILED:
+            st.error(f"An error occurred: {state['error']}")
+        else:
+            st.info("Generation cancelled.")
 
-                    # Create agents
-                    research_agent = ResearchAgent(model_integration)
-                    interview_agent = InterviewAgent(model_integration)
-
-                    # Set up progress tracking
-                    progress_bar = st.progress(0)
-                    status_text = st.empty()
-
-                    try:
-                        # Research company
-                        status_text.info("Step 1/3: Researching company information...")
-                        company_info = research_agent.research_company(company_name)
-                        progress_bar.progress(33)
-
-                        # Analyze role
-                        status_text.info("Step 2/3: Analyzing job role requirements...")
-                        role_info = research_agent.analyze_role(role, company_name, experience_level)
-                        progress_bar.progress(66)
-
-                        # Generate interview questions
-                        status_text.info("Step 3/3: Generating interview questions and answers...")
-                        interview_questions = interview_agent.generate_interview_questions(
-                            role, company_name, experience_level, company_info, role_info
-                        )
-                        progress_bar.progress(100)
-                        status_text.success("Completed! Here are your interview questions and answers.")
-                    except Exception as e:
-                        st.error(f"An error occurred during generation: {e}")
-                        st.info("Trying alternative approach with simplified prompts...")
-
-                        # Fallback to direct question generation without detailed research
-                        interview_questions = interview_agent.generate_interview_questions(
-                            role, company_name, experience_level,
-                            f"Company: {company_name}",
-                            f"Role: {role}, Experience: {experience_level}"
-                        )
-
-                    # Format and display results
-                    formatted_questions = format_interview_questions(interview_questions)
-
-                    st.markdown('<div class="result-container">', unsafe_allow_html=True)
-                    st.markdown(f"## Interview Questions for {role} at {company_name}")
-                    st.markdown(formatted_questions)
-                    st.markdown('</div>', unsafe_allow_html=True)
-
-                    # Add download button
-                    st.download_button(
-                        label="Download Interview Questions",
-                        data=f"# Interview Questions for {role} at {company_name}\n\n{interview_questions}",
-                        file_name=f"{role.replace(' ', '_')}_{company_name.replace(' ', '_')}_interview_questions.md",
-                        mime="text/markdown"
+        result = state["result"] or {}
+        interview_questions = result.get("interview_questions", state["partial"].get("interview_questions"))
+        if interview_questions:
+            st.markdown('<div class="result-container">', unsafe_allow_html=True)
+            st.markdown(f"## Interview Questions for {role_label} at {company_label}")
+            st.markdown(interview_questions)
+            st.markdown('</div>', unsafe_allow_html=True)
+
+        if state["status"] == DONE:
+            # Add download button
+            st.download_button(
+                label="Download Interview Questions",
+                data=f"# Interview Questions for {role_label} at {company_label}\n\n{interview_questions}",
+                file_name=f"{role_label.replace(' ', '_')}_{company_label.replace(' ', '_')}_interview_questions.md",
+                mime="text/markdown"
+            )
+
+            if result.get("questions"):
+                st.download_button(
+                    label=f"Download {len(result['questions'])} Questions as JSON",
+                    data=json.dumps(result["questions"], indent=2),
+                    file_name=f"{role_label.replace(' ', '_')}_{company_label.replace(' ', '_')}_interview_questions.json",
+                    mime="application/json"
+                )
+
+    # Search and reopen guides generated earlier, without calling the model. On a shared server
+    # each session only sees its own guides unless GUIDE_ARCHIVE_SHARED is set.
+    guide_archive = get_guide_archive()
+    archive_owner = None if os.getenv("GUIDE_ARCHIVE_SHARED", "").lower() in ("1", "true", "yes") else session_id
+    if guide_archive is not None and guide_archive.count(archive_owner):
+        with st.expander("Past Interview Guides"):
+            keywords = st.text_input("Search past guides", placeholder="Company, role or keyword")
+            matches = guide_archive.search(keywords, owner=archive_owner)
+            if not matches:
+                st.caption("No saved guides match your search.")
+            else:
+                selected = st.selectbox(
+                    "Saved guides", range(len(matches)),
+                    format_func=lambda index: (
+                        f"{matches[index]['role']} at {matches[index]['company_name']} "
+                        f"({matches[index]['experience_level']}, {matches[index]['model_name']}, "
+                        f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(matches[index]['created_at']))})"
                     )
+                )
+                guide = guide_archive.get(matches[selected]["guide_id"])
+                st.markdown(guide["interview_questions"])
+                st.download_button(
+                    label="Download This Guide",
+                    data=f"# Interview Questions for {guide['role']} at {guide['company_name']}\n\n"
+                         f"{guide['interview_questions']}",
+                    file_name=f"{guide['role'].replace(' ', '_')}_{guide['company_name'].replace(' ', '_')}"
+                              "_interview_questions.md",
+                    mime="text/markdown",
+                    key="download_archived_guide"
+                )
 
-                except Exception as e:
-                    st.error(f"An error occurred: {e}")
+    # Report how often similar earlier requests were reused
+    similarity_cache = get_similarity_cache()
+    if similarity_cache:
+        stats = similarity_cache.get_stats().values()
+        lookups = sum(kind["lookups"] for kind in stats)
+        hits = sum(kind["hits"] for kind in stats)
+        if lookups:
+            st.sidebar.caption(f"Similar-request cache: {hits}/{lookups} hits ({hits / lookups:.0%})")
+
+    # Show where the time of this session's last run went
+    if show_performance:
+        last_run = next(
+            (run for run in reversed(get_registry().recent_runs())
+             if run["run_id"] == st.session_state.get("last_run_id")),
+            None
+        )
+        with st.sidebar.expander("Performance", expanded=True):
+            if last_run is None:
+                st.caption("Generate interview questions to see the performance of the run.")
+            else:
+                lines = [f"- Total: {last_run['elapsed_seconds']:.1f}s"]
+                lines += [f"- {stage.replace('_', ' ').capitalize()}: {seconds:.1f}s"
+                          for stage, seconds in last_run["stages"].items()]
+                lines += [
+                    f"- Model calls: {last_run['llm_calls']} "
+                    f"({last_run['prompt_tokens']} prompt / {last_run['output_tokens']} output tokens, estimated)",
+                    f"- Retries: {last_run['retries']}, truncated prompts: {last_run['truncations']}, "
+                    f"backoff: {last_run['backoff_seconds']:.1f}s",
+                    f"- Cache hits: {last_run['cache_hits']}/{last_run['cache_hits'] + last_run['cache_misses']}, "
+                    f"joined identical requests: {last_run['coalesced_calls']}, "
+                    f"hedged requests: {last_run['hedged_calls']}",
+                ]
+                st.markdown("\n".join(lines))
+
+    job_stats = job_queue.get_stats()
+    if job_stats["running"] or job_stats["queued"]:
+        st.sidebar.caption(
+            f"Generations on this server: {job_stats['running']} running, {job_stats['queued']} waiting "
+            f"({job_stats['workers']} at a time)"
+        )
 
     # Add information about the framework
     st.sidebar.markdown("---")
@@ -216,5 +368,10 @@ def main():
         "5. Download the questions for offline review"
     )
 
+    # Check on the generation in progress again shortly
+    if polling:
+        time.sleep(JOB_POLL_SECONDS)
+        st.rerun()
+
 if __name__ == "__main__":
     main()
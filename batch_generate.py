@@ -0,0 +1,356 @@
+"""
+Headless batch generation for the interview preparation framework.
+
+Reads (role, company, experience level) jobs from a CSV or JSONL file, runs
+them through the research and interview agents on a bounded worker pool and
+appends one JSON result per line to the output file. Jobs already present in
+the output are skipped, so an interrupted run can simply be started again.
+
+Usage:
+    python batch_generate.py jobs.csv results.jsonl --provider google --workers 4
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+
+from agents.research_agent import ResearchAgent
+from agents.interview_agent import InterviewAgent
+from agents.pipeline import (
+    COMPANY_RESEARCH_STAGE, ROLE_ANALYSIS_STAGE, INTERVIEW_QUESTIONS_STAGE, get_fallback_research
+)
+from utils.guide_parser import parse_interview_questions
+from utils.helpers import get_hedged_integration, is_error_response, validate_inputs
+from utils.metrics import pipeline_run, stage_timer
+
+
+def load_jobs(path):
+    """
+    Load batch jobs from a CSV or JSONL file.
+
+    Each job needs role, company_name (or company) and experience_level
+    fields, and may carry its own id.
+
+    Args:
+        path (str): Path of the jobs file.
+
+    Returns:
+        list: Job dictionaries with id, role, company_name and experience_level keys.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith((".jsonl", ".ndjson")):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+
+    jobs = []
+    for line_number, row in enumerate(rows, start=1):
+        job = {
+            "role": (row.get("role") or "").strip(),
+            "company_name": (row.get("company_name") or row.get("company") or "").strip(),
+            "experience_level": (row.get("experience_level") or "").strip(),
+        }
+        is_valid, error_message = validate_inputs(job["role"], job["company_name"], job["experience_level"])
+        if not is_valid:
+            print(f"Skipping job {line_number}: {error_message}")
+            continue
+        job["id"] = str(row.get("id") or make_job_id(job))
+        jobs.append(job)
+    return jobs
+
+
+def make_job_id(job):
+    """
+    Derive a stable id for a job from its inputs.
+
+    Args:
+        job (dict): The job.
+
+    Returns:
+        str: The job id.
+    """
+    payload = json.dumps([job["role"], job["company_name"], job["experience_level"]]).lower()
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def load_completed_job_ids(path):
+    """
+    Read the ids of jobs that already finished successfully from an output file.
+
+    Args:
+        path (str): Path of the JSONL output file.
+
+    Returns:
+        set: The ids of completed jobs.
+    """
+    completed = set()
+    if not os.path.exists(path):
+        return completed
+
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by an interrupted run
+                continue
+            if record.get("status") == "ok":
+                completed.add(record.get("id"))
+    return completed
+
+
+class SharedCompanyResearch:
+    """
+    Company research shared by every job for the same company.
+    The first job to ask for a company runs the research; the others wait for its result.
+    Failed research is only shared with the jobs already waiting for it, so the next job retries it.
+    """
+
+    def __init__(self, research_agent):
+        """
+        Initialize the shared research.
+
+        Args:
+            research_agent (ResearchAgent): The agent used to research companies.
+        """
+        self.research_agent = research_agent
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def get(self, company_name):
+        """
+        Get the research for a company, running it if no other job has.
+
+        Args:
+            company_name (str): The name of the company.
+
+        Returns:
+            str: Information about the company.
+        """
+        key = " ".join(company_name.lower().split())
+        with self._lock:
+            future = self._futures.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._futures[key] = future
+
+        if owner:
+            try:
+                research = self.research_agent.research_company(company_name)
+            except Exception as e:
+                self._forget(key, future)
+                future.set_exception(e)
+            else:
+                if is_error_response(research):
+                    self._forget(key, future)
+                future.set_result(research)
+        return future.result()
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._futures.get(key) is future:
+                del self._futures[key]
+
+
+def run_job(job, research_agent, interview_agent, shared_research, parallel_categories=False,
+            continue_context=False):
+    """
+    Generate the interview guide for one job.
+
+    Args:
+        job (dict): The job.
+        research_agent (ResearchAgent): The agent used for role analysis.
+        interview_agent (InterviewAgent): The agent used to generate questions.
+        shared_research (SharedCompanyResearch): The shared company research.
+        parallel_categories (bool): Whether to generate each question category with its own request.
+        continue_context (bool): Whether the role analysis and questions continue one Ollama session.
+
+    Returns:
+        dict: The result record for the job.
+    """
+    role, company_name, experience_level = job["role"], job["company_name"], job["experience_level"]
+    if continue_context and hasattr(research_agent.llm, "session"):
+        # Company research is shared between jobs, so only the job's own stages share a session
+        session = research_agent.llm.session()
+        research_agent = ResearchAgent(
+            session, use_cache=research_agent.use_cache, similarity_cache=research_agent.similarity_cache,
+            company_index=research_agent.company_index
+        )
+        interview_agent = InterviewAgent(
+            session, use_cache=interview_agent.use_cache, similarity_cache=interview_agent.similarity_cache
+        )
+    record = dict(job)
+    started = time.time()
+
+    with pipeline_run(source="batch", job_id=job["id"]) as run_metrics:
+        research_errors = []
+        try:
+            with stage_timer(COMPANY_RESEARCH_STAGE):
+                company_info = shared_research.get(company_name)
+        except Exception as e:
+            print(f"Company research failed for {company_name}: {e}")
+            research_errors.append(f"Company research failed: {e}")
+            company_info = get_fallback_research(COMPANY_RESEARCH_STAGE, role, company_name, experience_level)
+
+        try:
+            with stage_timer(ROLE_ANALYSIS_STAGE):
+                role_info = research_agent.analyze_role(role, company_name, experience_level)
+        except Exception as e:
+            print(f"Role analysis failed for {role} at {company_name}: {e}")
+            research_errors.append(f"Role analysis failed: {e}")
+            role_info = get_fallback_research(ROLE_ANALYSIS_STAGE, role, company_name, experience_level)
+
+        # As in the app's pipeline, a guide written from simplified or failed research is not a
+        # finished result, so it is recorded as an error and retried when the batch is resumed
+        research_errors += [
+            f"{stage.replace('_', ' ').capitalize()} failed: {output or 'Error: Empty response'}"
+            for stage, output in ((COMPANY_RESEARCH_STAGE, company_info), (ROLE_ANALYSIS_STAGE, role_info))
+            if is_error_response(output)
+        ]
+
+        try:
+            if parallel_categories:
+                generate_questions = interview_agent.generate_interview_questions_parallel
+            else:
+                generate_questions = interview_agent.generate_interview_questions
+            with stage_timer(INTERVIEW_QUESTIONS_STAGE):
+                interview_questions = generate_questions(role, company_name, experience_level, company_info, role_info)
+            if is_error_response(interview_questions):
+                record.update(status="error", error=interview_questions or "Error: Empty response")
+            else:
+                record.update(
+                    status="error" if research_errors else "ok",
+                    interview_questions=interview_questions,
+                    questions=[question.to_dict() for question in parse_interview_questions(interview_questions)],
+                )
+                if research_errors:
+                    record.update(error="; ".join(research_errors))
+        except Exception as e:
+            record.update(status="error", error=str(e))
+
+    record.update(
+        company_info=company_info,
+        role_info=role_info,
+        elapsed_seconds=round(time.time() - started, 2),
+        metrics=run_metrics.to_dict(),
+    )
+    return record
+
+
+def run_batch(jobs, output_path, model_integration, workers=4, use_cache=True, parallel_categories=False,
+              continue_context=False):
+    """
+    Run batch jobs on a worker pool, appending each result to the output file as it finishes.
+
+    Args:
+        jobs (list): The jobs to run.
+        output_path (str): Path of the JSONL output file.
+        model_integration: The model integration used by the agents.
+        workers (int): Maximum number of jobs to run at once.
+        use_cache (bool): Whether model responses may be served from the response cache.
+        parallel_categories (bool): Whether to generate each question category with its own request.
+        continue_context (bool): Whether each job's stages continue one Ollama session.
+
+    Returns:
+        tuple: (succeeded, failed) job counts.
+    """
+    research_agent = ResearchAgent(model_integration, use_cache=use_cache)
+    interview_agent = InterviewAgent(model_integration, use_cache=use_cache)
+    shared_research = SharedCompanyResearch(research_agent)
+
+    succeeded = failed = 0
+    started = time.time()
+    with open(output_path, "a", encoding="utf-8") as output, \
+            ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                run_job, job, research_agent, interview_agent, shared_research, parallel_categories,
+                continue_context
+            )
+            for job in jobs
+        ]
+        for future in as_completed(futures):
+            record = future.result()
+            record.update(provider=model_integration.provider, model=model_integration.model_name)
+            output.write(json.dumps(record) + "\n")
+            # Every finished job is a checkpoint for resuming the run
+            output.flush()
+            os.fsync(output.fileno())
+
+            if record["status"] == "ok":
+                succeeded += 1
+            else:
+                failed += 1
+            done = succeeded + failed
+            jobs_per_minute = done / max(time.time() - started, 1e-6) * 60
+            print(
+                f"[{done}/{len(jobs)}] {record['status']}: {record['role']} at {record['company_name']} "
+                f"({record['elapsed_seconds']}s, {jobs_per_minute:.1f} jobs/min)"
+            )
+
+    return succeeded, failed
+
+
+def main(argv=None):
+    """
+    Run the batch generation command.
+
+    Args:
+        argv (list, optional): Command-line arguments. Defaults to sys.argv.
+
+    Returns:
+        int: The process exit code.
+    """
+    parser = argparse.ArgumentParser(description="Generate interview guides for many jobs at once.")
+    parser.add_argument("input", help="CSV or JSONL file with role, company_name and experience_level fields")
+    parser.add_argument("output", help="JSONL file the results are appended to")
+    parser.add_argument("--provider", choices=["google", "ollama"], default="google", help="Model provider")
+    parser.add_argument("--model", help="Model name (defaults to the provider's default model)")
+    parser.add_argument("--workers", type=int, default=4, help="Maximum number of jobs to run at once")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the response cache")
+    parser.add_argument("--parallel-categories", action="store_true",
+                        help="Generate each question category with its own concurrent request")
+    parser.add_argument("--continue-context", action="store_true",
+                        help="With Ollama, generate each job's questions from the context of its role analysis")
+    parser.add_argument("--hedge-provider", choices=["google", "ollama"],
+                        help="Backup provider for slow requests (defaults to HEDGE_PROVIDER)")
+    parser.add_argument("--hedge-model", help="Backup model name (defaults to HEDGE_MODEL)")
+    args = parser.parse_args(argv)
+
+    jobs = load_jobs(args.input)
+    completed = load_completed_job_ids(args.output)
+    pending = [job for job in jobs if job["id"] not in completed]
+    print(f"Loaded {len(jobs)} jobs, {len(jobs) - len(pending)} already completed, {len(pending)} to run.")
+    if not pending:
+        return 0
+
+    model_integration = get_hedged_integration(args.provider, args.model, args.hedge_provider, args.hedge_model)
+    if hasattr(model_integration, "warm_up"):
+        # Load the local model once up front instead of inside the first jobs
+        model_integration.warm_up(wait=True)
+    continue_context = args.continue_context
+    if continue_context and getattr(model_integration, "secondary", None) is not None:
+        # The backup model would not have the session's context
+        print("Hedged requests do not continue a session, ignoring --continue-context.")
+        continue_context = False
+    started = time.time()
+    succeeded, failed = run_batch(
+        pending, args.output, model_integration, workers=max(1, args.workers), use_cache=not args.no_cache,
+        parallel_categories=args.parallel_categories, continue_context=continue_context
+    )
+    elapsed = time.time() - started
+    print(
+        f"Finished {succeeded + failed} jobs in {elapsed:.1f}s "
+        f"({(succeeded + failed) / max(elapsed, 1e-6) * 60:.1f} jobs/min): {succeeded} succeeded, {failed} failed."
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
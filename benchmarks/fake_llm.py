@@ -0,0 +1,377 @@
+"""
+Local stand-ins for the model providers, used by the benchmarks.
+
+FakeOllamaServer speaks enough of the Ollama HTTP API (/api/tags and
+/api/generate, streaming or not) for OllamaIntegration to talk to it, and
+FakeGeminiModel replaces the Gemini model objects used by
+GoogleAIIntegration. Both simulate first-token latency, decode speed,
+errors and rate limiting.
+"""
+import asyncio
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeLLMConfig:
+    """
+    Behaviour of a fake model backend.
+    """
+
+    def __init__(self, first_token_latency=0.5, tokens_per_second=50.0, error_rate=0.0,
+                 rate_limit_rate=0.0, output_tokens=300, seed=None, load_latency=0.0, prompt_tokens_per_second=0.0):
+        """
+        Initialize the configuration.
+
+        Args:
+            first_token_latency (float): Seconds before the first token is produced.
+            tokens_per_second (float): Decode speed after the first token.
+            error_rate (float): Fraction of requests that fail with a server error.
+            rate_limit_rate (float): Fraction of requests rejected with a 429.
+            output_tokens (int): Approximate number of tokens per response.
+            seed (int, optional): Seed for reproducible error injection.
+            load_latency (float): Seconds the fake Ollama server takes to load a model that is
+                not loaded, or is loaded with a different num_ctx.
+            prompt_tokens_per_second (float): Prompt evaluation speed of the fake Ollama server. Tokens of
+                a context passed back in are not evaluated again. 0 makes prompt evaluation instant.
+        """
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.output_tokens = output_tokens
+        self.load_latency = load_latency
+        self.prompt_tokens_per_second = prompt_tokens_per_second
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def pick_failure(self):
+        """
+        Decide whether the next request fails.
+
+        Returns:
+            str: "rate_limit", "error" or None.
+        """
+        with self._lock:
+            self.requests += 1
+            roll = self._random.random()
+        if roll < self.rate_limit_rate:
+            return "rate_limit"
+        if roll < self.rate_limit_rate + self.error_rate:
+            return "error"
+        return None
+
+
+_GUIDE_CATEGORIES = [
+    ("Technical Skills", 4), ("Problem-Solving", 2), ("Behavioral/Situational", 2), ("Company/Role-Specific", 2),
+]
+
+
+def fake_response_tokens(prompt, output_tokens):
+    """
+    Build the tokens of a canned response that looks like real output for the prompt.
+
+    Args:
+        prompt (str): The prompt.
+        output_tokens (int): Approximate number of tokens to produce.
+
+    Returns:
+        list: The response split into tokens, each ending with its whitespace.
+    """
+    if "interview questions" in prompt.lower():
+        lines = []
+        number = 1
+        for category, count in _GUIDE_CATEGORIES:
+            lines.append(f"## {category}")
+            for _ in range(count):
+                lines.append(f"**Question {number}:** How would you approach problem {number}?")
+                lines.append("**What the interviewer is looking for:** Structured thinking and clear trade-offs.")
+                lines.append("**Sample Strong Answer:** " + "I would clarify the requirements first. " * 3)
+                number += 1
+        words = "\n".join(lines).replace("\n", " \n ").split(" ")
+        # Pad the guide to the requested length
+        words += ["detail"] * max(0, output_tokens - len(words))
+    else:
+        sentence = "This is simulated research output used for benchmarking the pipeline."
+        words = (sentence + " ") * (output_tokens // 10 + 1)
+        words = words.split(" ")[:output_tokens]
+    return [word + " " if word != "\n" else word for word in words]
+
+
+def _simulate(config, prompt):
+    """
+    Yield response tokens with the configured latency and decode speed.
+    """
+    time.sleep(config.first_token_latency)
+    delay = 1.0 / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+    for index, token in enumerate(fake_response_tokens(prompt, config.output_tokens)):
+        if index and delay:
+            time.sleep(delay)
+        yield token
+
+
+async def _asimulate(config, prompt):
+    """
+    Async counterpart of _simulate.
+    """
+    await asyncio.sleep(config.first_token_latency)
+    delay = 1.0 / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+    for index, token in enumerate(fake_response_tokens(prompt, config.output_tokens)):
+        if index and delay:
+            await asyncio.sleep(delay)
+        yield token
+
+
+class _OllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/api/tags":
+            self._send_json(200, {"models": [{"name": name} for name in self.server.model_names]})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.path.rstrip("/") != "/api/generate":
+            self._send_json(404, {"error": "not found"})
+            return
+
+        config = self.server.config
+        failure = config.pick_failure()
+        if failure == "rate_limit":
+            self._send_json(429, {"error": "rate limited"})
+            return
+        if failure == "error":
+            self._send_json(500, {"error": "simulated server error"})
+            return
+
+        model = request.get("model", "")
+        prompt = request.get("prompt", "")
+        load_duration = self.server.load(model, request)
+        final = {"model": model, "done": True, "context": [1, 2, 3], "load_duration": load_duration}
+        if not prompt:
+            # An empty prompt only loads the model
+            self._send_json(200, dict(final, response=""))
+            return
+
+        # Only the new prompt is evaluated; a context passed back in is already processed
+        prompt_tokens = len(prompt.split())
+        prompt_eval_seconds = 0.0
+        if config.prompt_tokens_per_second > 0:
+            prompt_eval_seconds = prompt_tokens / config.prompt_tokens_per_second
+        time.sleep(prompt_eval_seconds)
+        final.update(prompt_eval_count=prompt_tokens, prompt_eval_duration=int(prompt_eval_seconds * 1e9))
+
+        def finish(tokens):
+            context = list(request.get("context") or []) + [0] * (prompt_tokens + len(tokens))
+            return dict(final, context=context, eval_count=len(tokens))
+
+        if not request.get("stream", True):
+            tokens = list(_simulate(config, prompt))
+            self._send_json(200, dict(finish(tokens), response="".join(tokens)))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        tokens = []
+        for token in _simulate(config, prompt):
+            tokens.append(token)
+            self._write_chunk({"model": model, "response": token, "done": False})
+        self._write_chunk(dict(finish(tokens), response=""))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, payload):
+        data = (json.dumps(payload) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+class FakeOllamaServer:
+    """
+    Local HTTP server imitating the Ollama API, run on a background thread.
+    """
+
+    def __init__(self, config=None, host="127.0.0.1", port=0, model_names=("fake-model",)):
+        """
+        Initialize the server.
+
+        Args:
+            config (FakeLLMConfig, optional): The simulated model behaviour.
+            host (str): The interface to listen on.
+            port (int): The port to listen on; 0 picks a free port.
+            model_names (tuple): Models reported by /api/tags.
+        """
+        self.config = config or FakeLLMConfig()
+        self._server = ThreadingHTTPServer((host, port), _OllamaHandler)
+        self._server.daemon_threads = True
+        self._server.config = self.config
+        self._server.model_names = list(model_names)
+        self._server.load = self._load
+        self._loaded = {}
+        self._load_lock = threading.Lock()
+        self._thread = None
+
+    def _load(self, model, request):
+        """
+        Simulate Ollama loading a model, honouring keep_alive and num_ctx.
+
+        Returns:
+            int: The load time in nanoseconds, 0 if the model was already loaded.
+        """
+        num_ctx = (request.get("options") or {}).get("num_ctx", 2048)
+        keep_alive = request.get("keep_alive")
+        if keep_alive is None:
+            keep_alive = "5m"
+        keep_alive = str(keep_alive)
+        units = {"s": 1, "m": 60, "h": 3600}
+        seconds = float(keep_alive[:-1]) * units[keep_alive[-1]] if keep_alive[-1] in units else float(keep_alive)
+
+        now = time.monotonic()
+        with self._load_lock:
+            loaded = self._loaded.get(model)
+            cold = loaded is None or loaded[0] != num_ctx or loaded[1] < now
+            self._loaded[model] = (num_ctx, float("inf") if seconds < 0 else now + self.config.load_latency * cold + seconds)
+        if not cold:
+            return 0
+        time.sleep(self.config.load_latency)
+        return int(self.config.load_latency * 1e9)
+
+    @property
+    def url(self):
+        """
+        str: The base URL of the server.
+        """
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """
+        Start serving requests in the background.
+
+        Returns:
+            FakeOllamaServer: The server itself.
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop the server.
+        """
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class _FakeGeminiChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGeminiModel:
+    """
+    Stand-in for genai.GenerativeModel with simulated latency, errors and quota errors.
+    """
+
+    def __init__(self, config):
+        """
+        Initialize the fake model.
+
+        Args:
+            config (FakeLLMConfig): The simulated model behaviour.
+        """
+        self.config = config
+
+    def _check_failure(self):
+        failure = self.config.pick_failure()
+        if failure == "rate_limit":
+            raise Exception("429 Resource has been exhausted (e.g. check quota). retry_delay { seconds: 1 }")
+        if failure == "error":
+            raise Exception("500 Simulated internal error")
+
+    def generate_content(self, prompt, stream=False):
+        """
+        Generate a simulated response.
+
+        Args:
+            prompt (str): The prompt.
+            stream (bool): Whether to return an iterator of chunks.
+
+        Returns:
+            object: A response with a text attribute, or an iterator of such chunks when streaming.
+        """
+        self._check_failure()
+        tokens = _simulate(self.config, prompt)
+        if stream:
+            return (_FakeGeminiChunk(token) for token in tokens)
+        return _FakeGeminiChunk("".join(tokens))
+
+    async def generate_content_async(self, prompt, stream=False):
+        """
+        Async counterpart of generate_content.
+
+        Args:
+            prompt (str): The prompt.
+            stream (bool): Whether to return an async iterator of chunks.
+
+        Returns:
+            object: A response with a text attribute, or an async iterator of such chunks when streaming.
+        """
+        self._check_failure()
+        if stream:
+            return self._astream(prompt)
+        return _FakeGeminiChunk("".join([token async for token in _asimulate(self.config, prompt)]))
+
+    async def _astream(self, prompt):
+        async for token in _asimulate(self.config, prompt):
+            yield _FakeGeminiChunk(token)
+
+
+@contextmanager
+def fake_gemini(config=None):
+    """
+    Route every GoogleAIIntegration request to a FakeGeminiModel.
+
+    Args:
+        config (FakeLLMConfig, optional): The simulated model behaviour.
+
+    Yields:
+        FakeLLMConfig: The configuration in use.
+    """
+    import models.google_ai_integration as google_ai_integration
+
+    config = config or FakeLLMConfig()
+    model = FakeGeminiModel(config)
+    integration = google_ai_integration.GoogleAIIntegration
+    originals = (integration._get_model, integration.list_models)
+    integration._get_model = lambda self, asynchronous=False: model
+    integration.list_models = lambda self: ["fake-gemini"]
+    try:
+        yield config
+    finally:
+        integration._get_model, integration.list_models = originals
@@ -0,0 +1,359 @@
+"""
+Multi-session load test for the Streamlit app.
+
+Simulates N users at once, each an AppTest session that submits the form
+and waits for its guide, against the fake Ollama backend running in its own
+process. N is ramped up level by level, and each level reports p50/p99
+latency, throughput, and the CPU time and peak resident memory each session
+used beyond an idle session. Latency is measured from the job's submission
+to its completion, so it is not rounded up to the app's once-a-second
+polling. The ramp stops at the first level that fails too many sessions or
+exceeds the p99 limit, which is reported as the failure point.
+
+AppTest patches Streamlit's runtime and config for the duration of each
+script run, so it is not safe to run several sessions on threads of one
+interpreter. Each session therefore runs in its own process with its own
+app, job queue and caches, sharing only the model backend. Before the ramp,
+one idle session that fills in the form without submitting it measures what
+a process costs on its own, and that is subtracted from every session's CPU
+time and memory.
+
+Usage:
+    python -m benchmarks.load_test --sessions 1 2 4 8 16 32
+    python -m benchmarks.load_test --compare benchmarks/results/<earlier load test results>.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import resource
+import sys
+import threading
+import time
+
+from benchmarks.run_benchmarks import RESULTS_DIR, configure_environment, git_commit, summarize
+
+DEFAULT_LEVELS = [1, 2, 4, 8, 16, 32]
+# Seconds allowed for a session process to start and import the app before the level starts
+SESSION_START_TIMEOUT = 120.0
+# What the reported latencies measure, from Job.created_at to Job.finished_at
+LATENCY_MEASURE = "job submission to completion"
+
+
+def _serve_backend(config_kwargs, conn):
+    """
+    Run the fake Ollama server in a child process, so its work is not counted as the app's.
+    """
+    from benchmarks.fake_llm import FakeLLMConfig, FakeOllamaServer
+
+    server = FakeOllamaServer(FakeLLMConfig(**config_kwargs)).start()
+    conn.send(server.url)
+    # Serve until the parent closes its end of the pipe
+    try:
+        conn.recv()
+    except EOFError:
+        pass
+    server.stop()
+
+
+def _run_session(session, timeout, idle, start, results):
+    """
+    Run one AppTest session in a child process and report its result and resource use.
+    """
+    result = {"latency": None, "failed": True}
+    integration = None
+    try:
+        from benchmarks.run_benchmarks import run_app
+        from utils.helpers import get_model_integration
+
+        integration = get_model_integration("ollama")
+    except Exception as e:
+        print(f"Session {session} failed to start: {e}")
+
+    try:
+        # Every session of the level starts together, once the imports are done
+        start.wait(timeout=SESSION_START_TIMEOUT)
+        if integration is not None:
+            result = run_app(integration, session, timeout=timeout, idle=idle)
+    except threading.BrokenBarrierError:
+        print(f"Session {session} failed: the level did not start")
+    except Exception as e:
+        print(f"Session {session} failed: {e}")
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    # Peak resident memory is reported in kilobytes on Linux and bytes on macOS
+    peak_rss = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+    results.put((session, {
+        "latency": result.get("latency"),
+        "failed": bool(result.get("failed")),
+        "cpu_seconds": usage.ru_utime + usage.ru_stime,
+        "peak_rss": peak_rss,
+    }))
+
+
+def run_sessions(sessions, timeout, idle=False):
+    """
+    Start every session in its own process at once and wait for all of them.
+
+    Args:
+        sessions (int): Number of concurrent sessions.
+        timeout (float): Seconds a session waits for its guide before counting as failed.
+        idle (bool): Whether the sessions fill in the form without submitting it.
+
+    Returns:
+        tuple: (results, wall_time), with one result per session; sessions that never
+            reported back count as failed and have no resource use.
+    """
+    context = multiprocessing.get_context("spawn")
+    start = context.Barrier(sessions + 1)
+    results = context.Queue()
+    processes = [
+        context.Process(target=_run_session, args=(session, timeout, idle, start, results), daemon=True)
+        for session in range(sessions)
+    ]
+    for process in processes:
+        process.start()
+
+    try:
+        start.wait(timeout=SESSION_START_TIMEOUT)
+    except threading.BrokenBarrierError:
+        print("  Not every session started; counting the missing ones as failed")
+    started = time.perf_counter()
+    reported = {}
+    deadline = time.monotonic() + timeout + SESSION_START_TIMEOUT
+    while len(reported) < sessions:
+        try:
+            session, result = results.get(timeout=max(0.0, deadline - time.monotonic()))
+        except queue.Empty:
+            break
+        reported[session] = result
+    wall_time = time.perf_counter() - started
+
+    for process in processes:
+        process.join(timeout=5)
+        if process.is_alive():
+            process.terminate()
+            process.join()
+    return [reported.get(session, {"latency": None, "failed": True}) for session in range(sessions)], wall_time
+
+
+def _mean(values):
+    return sum(values) / len(values) if values else None
+
+
+def measure_idle_session(timeout):
+    """
+    Measure the CPU time and peak resident memory of an idle session's process.
+
+    Args:
+        timeout (float): Seconds the session may take.
+
+    Returns:
+        dict: cpu_seconds and peak_rss of the idle session.
+    """
+    (result,), _ = run_sessions(1, timeout, idle=True)
+    if "cpu_seconds" not in result:
+        raise RuntimeError("The idle session did not report back")
+    return {"cpu_seconds": result["cpu_seconds"], "peak_rss": result["peak_rss"]}
+
+
+def run_level(sessions, timeout, idle_session):
+    """
+    Run one level of the ramp: start every session at once and wait for all of them.
+
+    Args:
+        sessions (int): Number of concurrent sessions.
+        timeout (float): Seconds a session waits for its guide before counting as failed.
+        idle_session (dict): The idle session's resource use, from measure_idle_session().
+
+    Returns:
+        dict: Latency summary, failures, throughput, and CPU and memory use of the level.
+    """
+    results, wall_time = run_sessions(sessions, timeout)
+    measured = [result for result in results if "cpu_seconds" in result]
+    cpu_used = sum(result["cpu_seconds"] for result in measured)
+    mean_cpu = _mean([result["cpu_seconds"] for result in measured])
+    mean_rss = _mean([result["peak_rss"] for result in measured])
+
+    succeeded = [result for result in results if not result.get("failed")]
+    return {
+        "sessions": sessions,
+        "failures": sessions - len(succeeded),
+        "failure_rate": round((sessions - len(succeeded)) / sessions, 3),
+        "wall_time": round(wall_time, 3),
+        "throughput_per_minute": round(len(succeeded) / wall_time * 60, 2) if wall_time else None,
+        "latency": summarize([result["latency"] for result in succeeded]),
+        "cpu_seconds": round(cpu_used, 3),
+        "cpu_seconds_per_session": (
+            round(mean_cpu - idle_session["cpu_seconds"], 3) if mean_cpu is not None else None
+        ),
+        "cpu_utilization": round(cpu_used / wall_time, 3) if wall_time else None,
+        "peak_rss_mb": round(max(result["peak_rss"] for result in measured) / 2 ** 20, 1) if measured else None,
+        "rss_mb_per_session": (
+            round(max(0, mean_rss - idle_session["peak_rss"]) / 2 ** 20, 2) if mean_rss is not None else None
+        ),
+    }
+
+
+def failure_reason(level, max_failure_rate, max_p99):
+    """
+    Decide whether a level is past the failure point.
+
+    Returns:
+        str: Why the level failed, or None if it held up.
+    """
+    if level["failure_rate"] > max_failure_rate:
+        return f"{level['failures']}/{level['sessions']} sessions failed"
+    p99 = level["latency"].get("p99")
+    if max_p99 and p99 is not None and p99 > max_p99:
+        return f"p99 latency {p99:.1f}s exceeded {max_p99:.1f}s"
+    return None
+
+
+def print_level(level):
+    """
+    Print one level's results.
+    """
+    latency = level["latency"]
+    if latency.get("count"):
+        latencies = f"p50 {latency['p50']:.2f}s  p99 {latency['p99']:.2f}s"
+    else:
+        latencies = "n/a"
+    if level["cpu_seconds_per_session"] is not None:
+        resources = (f"CPU +{level['cpu_seconds_per_session']:.2f}s/session  "
+                     f"RSS +{level['rss_mb_per_session']:.1f} MB/session over idle")
+    else:
+        resources = "CPU/RSS n/a"
+    print(f"  {level['sessions']:>4} sessions  {latencies}  {level['failures']} failed  "
+          f"{level['throughput_per_minute']} guides/min  {resources}")
+
+
+def compare(current, baseline_path):
+    """
+    Print how the latency of each level differs from an earlier results file.
+
+    Args:
+        current (dict): The current results.
+        baseline_path (str): Path of the earlier results file.
+    """
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    print(f"\nCompared with {baseline.get('commit', 'unknown')} ({os.path.basename(baseline_path)}):")
+    previous_levels = {level["sessions"]: level for level in baseline.get("levels", [])}
+    for level in current["levels"]:
+        previous = previous_levels.get(level["sessions"])
+        if not previous:
+            continue
+        for pct in ("p50", "p99"):
+            new, old = level["latency"].get(pct), previous["latency"].get(pct)
+            if new is not None and old:
+                print(f"  {level['sessions']} sessions {pct}: {old:.2f}s -> {new:.2f}s ({(new - old) / old:+.1%})")
+    print(f"  Failure point: {baseline.get('failure_point') or 'none'} -> {current['failure_point'] or 'none'}")
+
+
+def main(argv=None):
+    """
+    Run the load test.
+
+    Args:
+        argv (list, optional): Command-line arguments. Defaults to sys.argv.
+
+    Returns:
+        int: The process exit code.
+    """
+    parser = argparse.ArgumentParser(description="Load test the Streamlit app with concurrent sessions.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=DEFAULT_LEVELS,
+                        help="Concurrent sessions at each level of the ramp")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds a session waits for its guide")
+    parser.add_argument("--max-failure-rate", type=float, default=0.0,
+                        help="Fraction of failed sessions above which a level is the failure point")
+    parser.add_argument("--max-p99", type=float, default=None,
+                        help="p99 latency in seconds above which a level is the failure point")
+    parser.add_argument("--no-stop", action="store_true", help="Run every level, even after the failure point")
+    parser.add_argument("--first-token-latency", type=float, default=0.5, help="Simulated seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="Simulated decode speed")
+    parser.add_argument("--output-tokens", type=int, default=300, help="Simulated tokens per response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests rejected with 429")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for error injection")
+    parser.add_argument("--output", help="Results file (defaults to benchmarks/results/load_<time>_<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    configure_environment()
+    # Every session submits a new request, so the memo would only skip work in repeated runs
+    os.environ["STAGE_MEMO_DISABLED"] = "true"
+
+    config_kwargs = {
+        "first_token_latency": args.first_token_latency,
+        "tokens_per_second": args.tokens_per_second,
+        "error_rate": args.error_rate,
+        "rate_limit_rate": args.rate_limit_rate,
+        "output_tokens": args.output_tokens,
+        "seed": args.seed,
+    }
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "latency_measure": LATENCY_MEASURE,
+        "idle_session": None,
+        "levels": [],
+        "failure_point": None,
+        "failure_reason": None,
+    }
+
+    context = multiprocessing.get_context("spawn")
+    parent_conn, child_conn = context.Pipe()
+    backend = context.Process(target=_serve_backend, args=(config_kwargs, child_conn), daemon=True)
+    backend.start()
+    try:
+        # Session processes are spawned after this, so they inherit the backend's address
+        os.environ["OLLAMA_HOST"] = parent_conn.recv()
+        idle_session = measure_idle_session(args.timeout)
+        results["idle_session"] = {
+            "cpu_seconds": round(idle_session["cpu_seconds"], 3),
+            "peak_rss_mb": round(idle_session["peak_rss"] / 2 ** 20, 1),
+        }
+        print(f"Idle session: {results['idle_session']['cpu_seconds']:.2f}s CPU, "
+              f"{results['idle_session']['peak_rss_mb']:.0f} MB peak RSS")
+        print(f"Ramping {', '.join(map(str, args.sessions))} concurrent sessions, "
+              f"one process each (latency from {LATENCY_MEASURE}):")
+        for sessions in args.sessions:
+            level = run_level(sessions, args.timeout, idle_session)
+            results["levels"].append(level)
+            print_level(level)
+            reason = failure_reason(level, args.max_failure_rate, args.max_p99)
+            if reason and results["failure_point"] is None:
+                results["failure_point"], results["failure_reason"] = sessions, reason
+                print(f"  Failure point: {sessions} sessions ({reason})")
+                if not args.no_stop:
+                    break
+    finally:
+        parent_conn.close()
+        backend.join(timeout=5)
+        if backend.is_alive():
+            backend.terminate()
+
+    if results["failure_point"] is None:
+        print(f"  No failure point up to {args.sessions[-1]} sessions")
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"load_{time.strftime('%Y%m%d-%H%M%S')}_{results['commit']}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nSaved results to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,435 @@
+"""
+Pipeline benchmarks for the interview preparation framework.
+
+Drives ResearchAgent, InterviewAgent, the full research -> questions pipeline
+and the Streamlit app against a local fake model backend, so performance can
+be measured without spending provider quota. Reports p50/p95/p99 latencies,
+time to first token, per-stage times and throughput, and saves the results to
+benchmarks/results/ for comparison across commits.
+
+Usage:
+    python -m benchmarks.run_benchmarks --backend ollama --runs 20 --concurrency 4
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/<earlier run>.json
+"""
+import argparse
+import functools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+SCENARIOS = ["research", "interview", "pipeline", "app"]
+
+
+def configure_environment(backend_url=None):
+    """
+    Point the app at the fake backend and keep caches from hiding model latency.
+    Must run before the project's modules are imported.
+
+    Args:
+        backend_url (str, optional): URL of the fake Ollama server.
+    """
+    scratch = tempfile.mkdtemp(prefix="interview-prep-bench-")
+    os.environ["RESPONSE_CACHE_DISABLED"] = "true"
+    os.environ["SIMILARITY_CACHE_DISABLED"] = "true"
+    os.environ["GUIDE_ARCHIVE_DISABLED"] = "true"
+    os.environ["COMPANY_INDEX_PATH"] = os.path.join(scratch, "company_index.sqlite3")
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+    if backend_url:
+        os.environ["OLLAMA_HOST"] = backend_url
+    if ROOT_DIR not in sys.path:
+        sys.path.insert(0, ROOT_DIR)
+
+
+def percentile(values, pct):
+    """
+    Get a percentile using the nearest-rank method.
+
+    Args:
+        values (list): The samples.
+        pct (float): The percentile, between 0 and 100.
+
+    Returns:
+        float: The percentile, or None if there are no samples.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100.0 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(values):
+    """
+    Summarize latency samples.
+
+    Args:
+        values (list): The samples, in seconds.
+
+    Returns:
+        dict: Count, mean, p50, p95 and p99, rounded to milliseconds.
+    """
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 3),
+        "p50": round(percentile(values, 50), 3),
+        "p95": round(percentile(values, 95), 3),
+        "p99": round(percentile(values, 99), 3),
+    }
+
+
+def consume_stream(chunks, started):
+    """
+    Drain a stream of text chunks, timing the first one.
+
+    Args:
+        chunks (iterable): The stream.
+        started (float): perf_counter() value the time to first token is measured from.
+
+    Returns:
+        tuple: (text, time_to_first_token)
+    """
+    parts = []
+    first_token = None
+    for chunk in chunks:
+        if first_token is None:
+            first_token = time.perf_counter() - started
+        parts.append(chunk)
+    return "".join(parts), first_token
+
+
+def make_request(run_id):
+    """
+    Build unique inputs for a run so no cache can serve it.
+
+    Returns:
+        tuple: (role, company_name, experience_level)
+    """
+    suffix = uuid.uuid4().hex[:8]
+    return f"Software Engineer {run_id}", f"Benchmark Company {suffix}", "Mid Level (3-5 years)"
+
+
+def run_research(integration, run_id):
+    """
+    Benchmark one company research call and one role analysis call.
+    """
+    from agents.research_agent import ResearchAgent
+
+    agent = ResearchAgent(integration)
+    role, company_name, experience_level = make_request(run_id)
+    started = time.perf_counter()
+    _, ttft = consume_stream(agent.research_company(company_name, stream=True), started)
+    research_time = time.perf_counter() - started
+    started_role = time.perf_counter()
+    agent.analyze_role(role, company_name, experience_level)
+    role_time = time.perf_counter() - started_role
+    return {
+        "latency": research_time + role_time,
+        "ttft": ttft,
+        "stages": {"company_research": research_time, "role_analysis": role_time},
+    }
+
+
+def run_interview(integration, run_id):
+    """
+    Benchmark one streamed interview question generation.
+    """
+    from agents.interview_agent import InterviewAgent
+    from utils.helpers import is_error_response
+
+    agent = InterviewAgent(integration)
+    role, company_name, experience_level = make_request(run_id)
+    started = time.perf_counter()
+    text, ttft = consume_stream(
+        agent.generate_interview_questions(
+            role, company_name, experience_level, "Company research.", "Role analysis.", stream=True
+        ),
+        started
+    )
+    latency = time.perf_counter() - started
+    return {
+        "latency": latency, "ttft": ttft, "stages": {"interview_questions": latency}, "failed": is_error_response(text)
+    }
+
+
+def run_pipeline(integration, run_id, continue_context=False):
+    """
+    Benchmark the full pipeline the way app.py runs it: concurrent research, then streamed questions.
+    With continue_context, the stages continue one Ollama session.
+    """
+    from agents.interview_agent import InterviewAgent
+    from agents.pipeline import run_research_stages
+    from agents.research_agent import ResearchAgent
+    from utils.helpers import is_error_response
+
+    if continue_context and hasattr(integration, "session"):
+        integration = integration.session()
+    research_agent = ResearchAgent(integration)
+    interview_agent = InterviewAgent(integration)
+    role, company_name, experience_level = make_request(run_id)
+
+    stages = {}
+    started = time.perf_counter()
+
+    def on_stage_complete(stage, error):
+        stages[stage] = time.perf_counter() - started
+
+    company_info, role_info, _ = run_research_stages(
+        research_agent, role, company_name, experience_level, on_stage_complete=on_stage_complete
+    )
+    research_done = time.perf_counter()
+    text, ttft = consume_stream(
+        interview_agent.generate_interview_questions(
+            role, company_name, experience_level, company_info, role_info, stream=True
+        ),
+        started
+    )
+    finished = time.perf_counter()
+    stages["interview_questions"] = finished - research_done
+    return {"latency": finished - started, "ttft": ttft, "stages": stages, "failed": is_error_response(text)}
+
+
+def run_app(integration, run_id, timeout=300, idle=False):
+    """
+    Benchmark one form submission through the Streamlit app with AppTest.
+
+    The latency is taken from the job's own timestamps, from submission to
+    completion, rather than from when the page shows the result, which is
+    only checked once per JOB_POLL_SECONDS rerun. With idle, the session
+    fills in the form but does not submit it, which measures what a session
+    costs without a generation.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    from utils.job_queue import get_job_queue
+
+    role, company_name, experience_level = make_request(run_id)
+    app = AppTest.from_file(os.path.join(ROOT_DIR, "app.py"), default_timeout=timeout)
+    app.run()
+    provider = "Ollama" if integration.provider == "ollama" else "Google AI Studio"
+    app.sidebar.selectbox[0].select(provider).run()
+    next(field for field in app.text_input if field.label == "Job Role").input(role)
+    next(field for field in app.text_input if field.label == "Company Name").input(company_name)
+    if idle:
+        return {"latency": None, "ttft": None, "stages": {}, "failed": bool(app.exception)}
+
+    started = time.perf_counter()
+    next(button for button in app.button if button.label == "Generate Interview Questions").click().run()
+    # Generation runs as a background job; rerun the script until it is no longer in progress
+    while any(button.label == "Cancel generation" for button in app.button) and \
+            time.perf_counter() - started < timeout:
+        app.run()
+    # AppTest runs the script in this process, so the app's job queue is this process's queue
+    job = get_job_queue().get(app.session_state["job_id"]) if "job_id" in app.session_state else None
+    finished = job is not None and job.finished_at is not None
+    latency = job.finished_at - job.created_at if finished else None
+
+    rendered = " ".join(str(element.value) for element in app.markdown)
+    failed = (not finished or bool(app.exception) or bool(app.error) or
+              f"Interview Questions for {role}" not in rendered)
+    return {"latency": latency, "ttft": None, "stages": {}, "failed": failed}
+
+
+def run_scenario(name, integration, runs, concurrency, continue_context=False):
+    """
+    Run a scenario several times, optionally concurrently, and summarize it.
+
+    Args:
+        name (str): The scenario name.
+        integration: The model integration to benchmark.
+        runs (int): Number of runs.
+        concurrency (int): Number of runs in flight at once.
+        continue_context (bool): Whether pipeline runs continue one Ollama session across their stages.
+
+    Returns:
+        dict: The scenario summary.
+    """
+    run_fn = {"research": run_research, "interview": run_interview, "pipeline": run_pipeline, "app": run_app}[name]
+    if name == "pipeline" and continue_context:
+        run_fn = functools.partial(run_pipeline, continue_context=True)
+
+    def safe_run(run_id):
+        try:
+            return run_fn(integration, run_id)
+        except Exception as e:
+            print(f"{name} run {run_id} failed: {e}")
+            return {"latency": None, "ttft": None, "stages": {}, "failed": True}
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(safe_run, range(runs)))
+    wall_time = time.perf_counter() - started
+
+    succeeded = [result for result in results if not result.get("failed")]
+    stage_names = sorted({stage for result in succeeded for stage in result["stages"]})
+    return {
+        "runs": runs,
+        "concurrency": concurrency,
+        "failures": len(results) - len(succeeded),
+        "wall_time": round(wall_time, 3),
+        "throughput_per_minute": round(len(succeeded) / wall_time * 60, 2) if wall_time else None,
+        "latency": summarize([result["latency"] for result in succeeded]),
+        "ttft": summarize([result["ttft"] for result in succeeded if result["ttft"] is not None]),
+        "stages": {
+            stage: summarize([result["stages"][stage] for result in succeeded if stage in result["stages"]])
+            for stage in stage_names
+        },
+    }
+
+
+def git_commit():
+    """
+    Get the current git commit, if available.
+
+    Returns:
+        str: The short commit hash, or "unknown".
+    """
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_summary(name, summary):
+    """
+    Print one scenario's results.
+    """
+    def fmt(stats):
+        if not stats.get("count"):
+            return "n/a"
+        return f"p50 {stats['p50']:.3f}s  p95 {stats['p95']:.3f}s  p99 {stats['p99']:.3f}s"
+
+    print(f"\n[{name}] {summary['runs']} runs x{summary['concurrency']}, {summary['failures']} failed, "
+          f"{summary['throughput_per_minute']} runs/min")
+    print(f"  {'end_to_end':<20} {fmt(summary['latency'])}")
+    print(f"  {'first_token':<20} {fmt(summary['ttft'])}")
+    for stage, stats in summary["stages"].items():
+        print(f"  {stage:<20} {fmt(stats)}")
+
+
+def compare(current, baseline_path):
+    """
+    Print how the current results differ from an earlier results file.
+
+    Args:
+        current (dict): The current results.
+        baseline_path (str): Path of the earlier results file.
+    """
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    print(f"\nCompared with {baseline.get('commit', 'unknown')} ({os.path.basename(baseline_path)}):")
+    for name, summary in current["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        for metric in ("latency", "ttft"):
+            for pct in ("p50", "p95", "p99"):
+                new, old = summary[metric].get(pct), previous.get(metric, {}).get(pct)
+                if new is not None and old:
+                    print(f"  {name} {metric} {pct}: {old:.3f}s -> {new:.3f}s ({(new - old) / old:+.1%})")
+
+
+def main(argv=None):
+    """
+    Run the benchmarks.
+
+    Args:
+        argv (list, optional): Command-line arguments. Defaults to sys.argv.
+
+    Returns:
+        int: The process exit code.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the interview preparation pipeline against a fake model.")
+    parser.add_argument("--backend", choices=["ollama", "gemini"], default="ollama",
+                        help="Fake provider to benchmark: the Ollama HTTP API or the Gemini client")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=["research", "interview", "pipeline"],
+                        help="Scenarios to run (the app scenario needs streamlit)")
+    parser.add_argument("--runs", type=int, default=10, help="Runs per scenario")
+    parser.add_argument("--concurrency", type=int, default=1, help="Runs in flight at once")
+    parser.add_argument("--first-token-latency", type=float, default=0.5, help="Simulated seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="Simulated decode speed")
+    parser.add_argument("--output-tokens", type=int, default=300, help="Simulated tokens per response")
+    parser.add_argument("--load-latency", type=float, default=0.0,
+                        help="Simulated seconds for the fake Ollama server to load a model")
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=0.0,
+                        help="Simulated prompt evaluation speed of the fake Ollama server (0 for instant)")
+    parser.add_argument("--continue-context", action="store_true",
+                        help="Continue one Ollama session across the stages of each pipeline run")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests rejected with 429")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for error injection")
+    parser.add_argument("--output", help="Results file (defaults to benchmarks/results/<time>_<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    configure_environment()
+    from benchmarks.fake_llm import FakeLLMConfig, FakeOllamaServer, fake_gemini
+
+    config = FakeLLMConfig(
+        first_token_latency=args.first_token_latency,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        output_tokens=args.output_tokens,
+        seed=args.seed,
+        load_latency=args.load_latency,
+        prompt_tokens_per_second=args.prompt_tokens_per_second,
+    )
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "backend": args.backend,
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "scenarios": {},
+    }
+
+    if args.backend == "ollama":
+        server = FakeOllamaServer(config).start()
+        os.environ["OLLAMA_HOST"] = server.url
+        backend = None
+    else:
+        server = None
+        backend = fake_gemini(config)
+        backend.__enter__()
+
+    try:
+        from utils.helpers import get_model_integration
+
+        integration = get_model_integration("ollama" if args.backend == "ollama" else "google")
+        for name in args.scenarios:
+            summary = run_scenario(name, integration, args.runs, max(1, args.concurrency), args.continue_context)
+            results["scenarios"][name] = summary
+            print_summary(name, summary)
+    finally:
+        if server:
+            server.stop()
+        if backend:
+            backend.__exit__(None, None, None)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}_{results['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nSaved results to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+Startup-time benchmark for the interview preparation framework.
+
+Starts fresh interpreters with -X importtime for the entry points (the
+Streamlit app, batch generation, and first use of each provider) and
+reports process wall time, total import time and the slowest top-level
+imports, so cold start for the Streamlit server and headless use can be
+compared across commits.
+
+Usage:
+    python -m benchmarks.startup_time --repeat 5
+    python -m benchmarks.startup_time --compare benchmarks/results/<earlier run>.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.run_benchmarks import RESULTS_DIR, ROOT_DIR, git_commit
+
+# Code run by each target; provider targets include creating the integration
+TARGETS = {
+    "app": "import app",
+    "batch": "import batch_generate",
+    "helpers": "import utils.helpers",
+    "provider_ollama": "from utils.helpers import get_model_integration; get_model_integration('ollama')",
+    "provider_google": "from utils.helpers import get_model_integration; get_model_integration('google')",
+}
+
+
+def parse_importtime(stderr):
+    """
+    Parse -X importtime output.
+
+    Args:
+        stderr (str): The interpreter's stderr.
+
+    Returns:
+        dict: Cumulative microseconds of each top-level import.
+    """
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split(":", 1)[1].split("|")
+        # Nested imports are indented under the module that imported them
+        if not name.startswith("  "):
+            imports[name.strip()] = int(cumulative_us)
+    return imports
+
+
+def measure(code):
+    """
+    Start a fresh interpreter and time it.
+
+    Args:
+        code (str): The code to run.
+
+    Returns:
+        dict: Wall time, total import time and per-module import times, or the error.
+    """
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT_DIR, env=env, capture_output=True, text=True
+    )
+    wall_time = time.perf_counter() - started
+    if result.returncode != 0:
+        return {"error": result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed"}
+
+    imports = parse_importtime(result.stderr)
+    return {"wall_time": wall_time, "import_time": sum(imports.values()) / 1e6, "imports": imports}
+
+
+def run_target(code, repeat):
+    """
+    Measure a target several times and summarize it.
+
+    Args:
+        code (str): The code the target runs.
+        repeat (int): Number of measurements.
+
+    Returns:
+        dict: Median wall and import times and the slowest imports of the median run.
+    """
+    runs = [measure(code) for _ in range(repeat)]
+    succeeded = [run for run in runs if "error" not in run]
+    if not succeeded:
+        return {"error": runs[0]["error"]}
+
+    median_run = sorted(succeeded, key=lambda run: run["wall_time"])[len(succeeded) // 2]
+    slowest = sorted(median_run["imports"].items(), key=lambda item: item[1], reverse=True)[:10]
+    return {
+        "runs": len(succeeded),
+        "wall_time": round(statistics.median(run["wall_time"] for run in succeeded), 3),
+        "import_time": round(statistics.median(run["import_time"] for run in succeeded), 3),
+        "slowest_imports": {name: round(us / 1e6, 3) for name, us in slowest},
+    }
+
+
+def main(argv=None):
+    """
+    Run the startup benchmark.
+
+    Args:
+        argv (list, optional): Command-line arguments. Defaults to sys.argv.
+
+    Returns:
+        int: The process exit code.
+    """
+    parser = argparse.ArgumentParser(description="Measure interpreter startup and import time of the entry points.")
+    parser.add_argument("--targets", nargs="+", choices=list(TARGETS), default=list(TARGETS), help="Targets to measure")
+    parser.add_argument("--repeat", type=int, default=5, help="Measurements per target")
+    parser.add_argument("--output", help="Results file (defaults to benchmarks/results/startup_<time>_<commit>.json)")
+    parser.add_argument("--compare", help="Earlier startup results file to compare against")
+    args = parser.parse_args(argv)
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "targets": {},
+    }
+    for target in args.targets:
+        summary = run_target(TARGETS[target], max(1, args.repeat))
+        results["targets"][target] = summary
+        if "error" in summary:
+            print(f"[{target}] failed: {summary['error']}")
+            continue
+        print(f"[{target}] wall {summary['wall_time']:.3f}s, imports {summary['import_time']:.3f}s")
+        for name, seconds in list(summary["slowest_imports"].items())[:5]:
+            print(f"  {name:<40} {seconds:.3f}s")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"startup_{time.strftime('%Y%m%d-%H%M%S')}_{results['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nSaved results to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {baseline.get('commit', 'unknown')} ({os.path.basename(args.compare)}):")
+        for target, summary in results["targets"].items():
+            previous = baseline.get("targets", {}).get(target, {})
+            for metric in ("wall_time", "import_time"):
+                new, old = summary.get(metric), previous.get(metric)
+                if new is not None and old:
+                    print(f"  {target} {metric}: {old:.3f}s -> {new:.3f}s ({(new - old) / old:+.1%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
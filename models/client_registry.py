@@ -0,0 +1,161 @@
+"""
+Process-wide registry of provider clients for the interview preparation framework.
+Clients are created once and shared by every integration, session and thread,
+so HTTP connections are reused instead of being set up per request.
+"""
+import asyncio
+import hashlib
+import json
+import threading
+import weakref
+
+_lock = threading.Lock()
+_ollama_clients = {}
+# Async clients hold connections bound to the event loop they were created on
+_ollama_async_clients = weakref.WeakKeyDictionary()
+# Google AI clients, models and async models are kept per API key, so sessions using
+# different keys never share a client. The async ones are also kept per event loop.
+_google_client_managers = {}
+_google_models = {}
+_google_async_models = weakref.WeakKeyDictionary()
+
+
+def fingerprint(value):
+    """
+    Get a short, non-reversible fingerprint of a secret such as an API key.
+
+    Args:
+        value (str): The value to fingerprint.
+
+    Returns:
+        str: The fingerprint, or an empty string if value is empty.
+    """
+    if not value:
+        return ""
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:16]
+
+
+def get_ollama_client(host=None):
+    """
+    Get the shared Ollama client for a host.
+
+    Args:
+        host (str, optional): The Ollama server URL. Defaults to OLLAMA_HOST or the local server.
+
+    Returns:
+        ollama.Client: The shared client.
+    """
+    import ollama
+
+    with _lock:
+        client = _ollama_clients.get(host)
+        if client is None:
+            client = ollama.Client(host=host)
+            _ollama_clients[host] = client
+        return client
+
+
+def get_ollama_async_client(host=None):
+    """
+    Get the shared async Ollama client for a host on the running event loop.
+
+    Args:
+        host (str, optional): The Ollama server URL. Defaults to OLLAMA_HOST or the local server.
+
+    Returns:
+        ollama.AsyncClient: The shared client.
+    """
+    import ollama
+
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _ollama_async_clients.setdefault(loop, {})
+        client = clients.get(host)
+        if client is None:
+            client = ollama.AsyncClient(host=host)
+            clients[host] = client
+        return client
+
+
+def _google_client_manager(api_key):
+    """
+    Get the Google AI client manager of an API key. Must be called holding _lock.
+
+    genai.configure sets the SDK's process-wide key, so a session using a
+    different key would reconfigure every other session. Each key instead
+    gets its own client manager, configured once.
+    """
+    from google.generativeai import client as genai_client
+
+    key = fingerprint(api_key)
+    manager = _google_client_managers.get(key)
+    if manager is None:
+        manager = genai_client._ClientManager()
+        manager.configure(api_key=api_key)
+        _google_client_managers[key] = manager
+    return manager
+
+
+def get_google_client(api_key, name="generative"):
+    """
+    Get the shared Google AI client of a service for an API key.
+
+    Args:
+        api_key (str): The Google AI API key.
+        name (str): The service, e.g. "generative" or "model".
+
+    Returns:
+        The shared client, bound to api_key.
+    """
+    with _lock:
+        return _google_client_manager(api_key).get_default_client(name)
+
+
+def get_google_model(model_name, generation_config, safety_settings, api_key, asynchronous=False):
+    """
+    Get the shared Google AI model object for a model, configuration and API key.
+
+    Args:
+        model_name (str): The name of the Google AI model.
+        generation_config (dict): The generation settings.
+        safety_settings (list): The safety settings.
+        api_key (str): The Google AI API key the model's requests are sent with.
+        asynchronous (bool): Whether the model is used with generate_content_async on the
+            running event loop, whose async client cannot be shared with other loops.
+
+    Returns:
+        genai.GenerativeModel: The shared model object.
+    """
+    import google.generativeai as genai
+
+    key = (fingerprint(api_key), model_name,
+           json.dumps([generation_config, safety_settings], sort_keys=True, default=str))
+    with _lock:
+        models = _google_async_models.setdefault(asyncio.get_running_loop(), {}) if asynchronous else _google_models
+        model = models.get(key)
+        if model is None:
+            model = genai.GenerativeModel(
+                model_name=model_name,
+                generation_config=generation_config,
+                safety_settings=safety_settings
+            )
+            # Bind the model to the key's own clients instead of the SDK's global ones
+            manager = _google_client_manager(api_key)
+            if asynchronous:
+                model._async_client = manager.make_client("generative_async")
+            else:
+                model._client = manager.get_default_client("generative")
+            models[key] = model
+        return model
+
+
+def clear():
+    """
+    Drop every registered client, e.g. after changing provider settings.
+    """
+    with _lock:
+        _ollama_clients.clear()
+        _ollama_async_clients.clear()
+        _google_client_managers.clear()
+        _google_models.clear()
+        _google_async_models.clear()
@@ -3,25 +3,69 @@ Google AI Studio model integration for the interview preparation framework.
 Simplified version that doesn't rely on crewai or langchain.
 """
 import os
-import google.generativeai as genai
+
+from models.client_registry import get_google_client, get_google_model
+from models.rate_limiter import get_google_rate_limiter, is_rate_limit_error, parse_retry_delay
+from models.response_cache import (
+    acached_generate, acached_generate_stream, cached_generate, cached_generate_stream
+)
+from utils.metrics import record_backoff, record_retry, record_truncation
+from utils.token_budget import estimate_tokens, trim_to_tokens
+
+# Default generation settings
+GENERATION_CONFIG = {
+    "temperature": 0.7,
+    "top_p": 0.95,
+    "top_k": 40,
+    "max_output_tokens": 8192,  # Adjust based on your needs
+}
+
+# Safety settings
+SAFETY_SETTINGS = [
+    {
+        "category": "HARM_CATEGORY_HARASSMENT",
+        "threshold": "BLOCK_MEDIUM_AND_ABOVE"
+    },
+    {
+        "category": "HARM_CATEGORY_HATE_SPEECH",
+        "threshold": "BLOCK_MEDIUM_AND_ABOVE"
+    },
+    {
+        "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
+        "threshold": "BLOCK_MEDIUM_AND_ABOVE"
+    },
+    {
+        "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
+        "threshold": "BLOCK_MEDIUM_AND_ABOVE"
+    },
+]
+
+# Prompt token limits, before and after a timeout
+MAX_PROMPT_TOKENS = 7500
+TIMEOUT_PROMPT_TOKENS = 3750
 
 class GoogleAIIntegration:
     """
     Integration with Google AI Studio models for the interview preparation framework.
     """
 
-    def __init__(self, model_name="gemini-2.5-pro-exp-03-25"):
+    provider = "google"
+    DEFAULT_MODELS = ["gemini-2.5-pro-exp-03-25", "gemini-pro", "gemini-pro-vision"]
+
+    def __init__(self, model_name="gemini-2.5-pro-exp-03-25", generation_config=None):
         """
         Initialize the Google AI Studio integration.
 
         Args:
             model_name (str): The name of the Google AI model to use.
+            generation_config (dict, optional): Overrides for the default generation settings.
         """
         self.model_name = model_name
+        self.generation_config = dict(GENERATION_CONFIG)
+        if generation_config:
+            self.generation_config.update(generation_config)
         self.api_key = os.getenv("GOOGLE_API_KEY")
-
-        if self.api_key:
-            genai.configure(api_key=self.api_key)
+        self.rate_limiter = get_google_rate_limiter()
 
     def get_available_models(self):
         """
@@ -31,14 +75,25 @@ class GoogleAIIntegration:
             list: A list of available model names.
         """
         if not self.api_key:
-            return ["gemini-2.5-pro-exp-03-25", "gemini-pro", "gemini-pro-vision"]  # Default fallback models
+            return list(self.DEFAULT_MODELS)  # Default fallback models
 
         try:
-            models = genai.list_models()
-            return [model.name.split('/')[-1] for model in models]
+            return self.list_models()
         except Exception as e:
             print(f"Error fetching Google AI models: {e}")
-            return ["gemini-2.5-pro-exp-03-25", "gemini-pro", "gemini-pro-vision"]  # Default fallback models
+            return list(self.DEFAULT_MODELS)  # Default fallback models
+
+    def list_models(self):
+        """
+        Fetch the list of available Google AI models, raising on errors.
+
+        Returns:
+            list: A list of available model names.
+        """
+        import google.generativeai as genai
+
+        models = genai.list_models(client=get_google_client(self.api_key, "model"))
+        return [model.name.split('/')[-1] for model in models]
 
     def invoke(self, prompt):
         """
@@ -52,13 +107,16 @@ class GoogleAIIntegration:
         """
         return self.generate_response(prompt)
 
-    def generate_response(self, prompt, max_retries=3):
+    def generate_response(self, prompt, max_retries=3, call_type=None, use_cache=True, timeout=None):
         """
         Generate a response using the Google AI model directly.
 
         Args:
             prompt (str): The prompt to send to the model.
             max_retries (int): Maximum number of retry attempts.
+            call_type (str, optional): The type of call, used to pick the cache TTL.
+            use_cache (bool): Set to False to bypass the response cache.
+            timeout (float, optional): Maximum seconds to wait for an identical request already in flight.
 
         Returns:
             str: The generated response.
@@ -66,68 +124,346 @@ class GoogleAIIntegration:
         if not self.api_key:
             return "Error: Google API key not found. Please set the GOOGLE_API_KEY environment variable."
 
-        # Check if prompt is too long and truncate if necessary
-        if len(prompt) > 30000:  # Approximate token limit
-            print("Warning: Prompt is very long, truncating to avoid timeout issues.")
-            prompt = prompt[:30000] + "\n[Note: Prompt was truncated due to length.]"
-
-        # Configure generation settings
-        generation_config = {
-            "temperature": 0.7,
-            "top_p": 0.95,
-            "top_k": 40,
-            "max_output_tokens": 8192,  # Adjust based on your needs
-        }
-
-        # Safety settings
-        safety_settings = [
-            {
-                "category": "HARM_CATEGORY_HARASSMENT",
-                "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-            },
-            {
-                "category": "HARM_CATEGORY_HATE_SPEECH",
-                "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-            },
-            {
-                "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-            },
-            {
-                "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
-                "threshold": "BLOCK_MEDIUM_AND_ABOVE"
-            },
-        ]
+        return cached_generate(
+            self.provider, self.model_name, self.generation_config, prompt,
+            lambda p: self._generate_uncached(p, max_retries),
+            call_type=call_type, use_cache=use_cache, timeout=timeout
+        )
+
+    def generate_response_stream(self, prompt, max_retries=3, call_type=None, use_cache=True, timeout=None):
+        """
+        Stream a response from the Google AI model as it is generated.
+
+        Args:
+            prompt (str): The prompt to send to the model.
+            max_retries (int): Maximum number of retry attempts before the first chunk arrives.
+            call_type (str, optional): The type of call, used to pick the cache TTL.
+            use_cache (bool): Set to False to bypass the response cache.
+            timeout (float, optional): Maximum seconds to wait for an identical request already in flight.
+
+        Yields:
+            str: Chunks of the generated response.
+        """
+        if not self.api_key:
+            yield "Error: Google API key not found. Please set the GOOGLE_API_KEY environment variable."
+            return
+
+        yield from cached_generate_stream(
+            self.provider, self.model_name, self.generation_config, prompt,
+            lambda p: self._generate_stream_uncached(p, max_retries),
+            call_type=call_type, use_cache=use_cache, timeout=timeout
+        )
+
+    async def agenerate_response(self, prompt, max_retries=3, call_type=None, use_cache=True, timeout=None):
+        """
+        Async counterpart of generate_response, using the SDK's async client.
+
+        Args:
+            prompt (str): The prompt to send to the model.
+            max_retries (int): Maximum number of retry attempts.
+            call_type (str, optional): The type of call, used to pick the cache TTL.
+            use_cache (bool): Set to False to bypass the response cache.
+            timeout (float, optional): Maximum seconds to wait for the response.
+
+        Returns:
+            str: The generated response.
+        """
+        if not self.api_key:
+            return "Error: Google API key not found. Please set the GOOGLE_API_KEY environment variable."
+
+        return await acached_generate(
+            self.provider, self.model_name, self.generation_config, prompt,
+            lambda p: self._agenerate_uncached(p, max_retries),
+            call_type=call_type, use_cache=use_cache, timeout=timeout
+        )
+
+    async def agenerate_response_stream(self, prompt, max_retries=3, call_type=None, use_cache=True):
+        """
+        Async counterpart of generate_response_stream.
+
+        Args:
+            prompt (str): The prompt to send to the model.
+            max_retries (int): Maximum number of retry attempts before the first chunk arrives.
+            call_type (str, optional): The type of call, used to pick the cache TTL.
+            use_cache (bool): Set to False to bypass the response cache.
+
+        Yields:
+            str: Chunks of the generated response.
+        """
+        if not self.api_key:
+            yield "Error: Google API key not found. Please set the GOOGLE_API_KEY environment variable."
+            return
+
+        async for chunk in acached_generate_stream(
+            self.provider, self.model_name, self.generation_config, prompt,
+            lambda p: self._agenerate_stream_uncached(p, max_retries),
+            call_type=call_type, use_cache=use_cache
+        ):
+            yield chunk
+
+    def _generate_uncached(self, prompt, max_retries):
+        """
+        Call the Google AI model, retrying on transient errors.
+
+        Args:
+            prompt (str): The prompt to send to the model.
+            max_retries (int): Maximum number of retry attempts.
+
+        Returns:
+            str: The generated response.
+        """
+        prompt = self._fit_prompt(prompt)
 
         for attempt in range(max_retries):
             try:
-                model = genai.GenerativeModel(
-                    model_name=self.model_name,
-                    generation_config=generation_config,
-                    safety_settings=safety_settings
-                )
+                model = self._get_model()
 
                 # Use a simpler approach without timeout parameter
-                response = model.generate_content(prompt)
+                with self.rate_limiter.limit(self._estimate_tokens(prompt)):
+                    response = model.generate_content(prompt)
+                self.rate_limiter.record_success(self._estimate_tokens(response.text))
                 return response.text
             except Exception as e:
-                error_message = str(e)
-                print(f"Attempt {attempt + 1}/{max_retries} failed: {error_message}")
-
-                # Check for specific errors
-                if "504" in error_message or "Deadline Exceeded" in error_message:
-                    print("Timeout error detected, retrying with a shorter prompt...")
-                    # If this is not the last retry, try with a shorter prompt
-                    if len(prompt) > 15000:
-                        prompt = prompt[:15000] + "\n[Note: Prompt was truncated due to timeout issues.]"
-                        print(f"Prompt truncated to {len(prompt)} characters")
-                elif "429" in error_message or "quota" in error_message.lower():
-                    print("Rate limit or quota exceeded, waiting before retry...")
-                    import time
-                    time.sleep(5 * (attempt + 1))  # Exponential backoff
-                elif "Unknown field" in error_message:
-                    print("API parameter error detected. Using default parameters.")
+                prompt = self._handle_attempt_error(e, attempt, max_retries, prompt)
 
                 # If this is the last attempt, give up and return error
                 if attempt == max_retries - 1:
                     return f"Error: Could not generate response with Google AI after {max_retries} attempts. Last error: {e}"
+
+    def _generate_stream_uncached(self, prompt, max_retries):
+        """
+        Stream a response from the Google AI model, retrying until the first chunk arrives.
+
+        Errors after the first chunk are raised, since the partial output has
+        already been handed to the caller and cannot be retried transparently.
+
+        Args:
+            prompt (str): The prompt to send to the model.
+            max_retries (int): Maximum number of retry attempts.
+
+        Yields:
+            str: Chunks of the generated response.
+        """
+        prompt = self._fit_prompt(prompt)
+
+        for attempt in range(max_retries):
+            started = False
+            try:
+                model = self._get_model()
+
+                output = []
+                with self.rate_limiter.limit(self._estimate_tokens(prompt)):
+                    for chunk in model.generate_content(prompt, stream=True):
+                        try:
+                            text = chunk.text
+                        except ValueError:
+                            # Chunks without text parts, e.g. the final finish_reason chunk
+                            continue
+                        if text:
+                            started = True
+                            output.append(text)
+                            yield text
+                self.rate_limiter.record_success(self._estimate_tokens("".join(output)))
+                return
+            except Exception as e:
+                if started:
+                    print(f"Streaming from Google AI failed mid-response: {e}")
+                    raise
+                prompt = self._handle_attempt_error(e, attempt, max_retries, prompt)
+
+                if attempt == max_retries - 1:
+                    yield f"Error: Could not generate response with Google AI after {max_retries} attempts. Last error: {e}"
+
+    async def _agenerate_uncached(self, prompt, max_retries):
+        """
+        Async counterpart of _generate_uncached. Cancelling the caller cancels the request.
+
+        Args:
+            prompt (str): The prompt to send to the model.
+            max_retries (int): Maximum number of retry attempts.
+
+        Returns:
+            str: The generated response.
+        """
+        prompt = self._fit_prompt(prompt)
+
+        for attempt in range(max_retries):
+            try:
+                model = self._get_model(asynchronous=True)
+
+                async with self.rate_limiter.alimit(self._estimate_tokens(prompt)):
+                    response = await model.generate_content_async(prompt)
+                self.rate_limiter.record_success(self._estimate_tokens(response.text))
+                return response.text
+            except Exception as e:
+                prompt = await self._ahandle_attempt_error(e, attempt, max_retries, prompt)
+
+                if attempt == max_retries - 1:
+                    return f"Error: Could not generate response with Google AI after {max_retries} attempts. Last error: {e}"
+
+    async def _agenerate_stream_uncached(self, prompt, max_retries):
+        """
+        Async counterpart of _generate_stream_uncached.
+
+        Args:
+            prompt (str): The prompt to send to the model.
+            max_retries (int): Maximum number of retry attempts.
+
+        Yields:
+            str: Chunks of the generated response.
+        """
+        prompt = self._fit_prompt(prompt)
+
+        for attempt in range(max_retries):
+            started = False
+            try:
+                model = self._get_model(asynchronous=True)
+
+                output = []
+                async with self.rate_limiter.alimit(self._estimate_tokens(prompt)):
+                    async for chunk in await model.generate_content_async(prompt, stream=True):
+                        try:
+                            text = chunk.text
+                        except ValueError:
+                            # Chunks without text parts, e.g. the final finish_reason chunk
+                            continue
+                        if text:
+                            started = True
+                            output.append(text)
+                            yield text
+                self.rate_limiter.record_success(self._estimate_tokens("".join(output)))
+                return
+            except Exception as e:
+                if started:
+                    print(f"Streaming from Google AI failed mid-response: {e}")
+                    raise
+                prompt = await self._ahandle_attempt_error(e, attempt, max_retries, prompt)
+
+                if attempt == max_retries - 1:
+                    yield f"Error: Could not generate response with Google AI after {max_retries} attempts. Last error: {e}"
+
+    def _estimate_tokens(self, text):
+        """
+        Estimate the number of tokens in a text for this model.
+
+        Args:
+            text (str): The text.
+
+        Returns:
+            int: The estimated token count.
+        """
+        return estimate_tokens(text, self.provider, self.model_name)
+
+    def _fit_prompt(self, prompt):
+        """
+        Trim a prompt that exceeds the prompt token limit.
+
+        Args:
+            prompt (str): The prompt.
+
+        Returns:
+            str: The prompt, trimmed at a paragraph or sentence boundary if it was too long.
+        """
+        if self._estimate_tokens(prompt) > MAX_PROMPT_TOKENS:
+            print("Warning: Prompt is very long, truncating to avoid timeout issues.")
+            record_truncation(self.provider, "length")
+            prompt = trim_to_tokens(
+                prompt, MAX_PROMPT_TOKENS, self.provider, self.model_name,
+                marker="\n[Note: Prompt was truncated due to length.]"
+            )
+        return prompt
+
+    def _get_model(self, asynchronous=False):
+        """
+        Get the shared model object for this integration's model, settings and API key.
+
+        Args:
+            asynchronous (bool): Whether the model is used from a coroutine on the running event loop.
+
+        Returns:
+            genai.GenerativeModel: The model object.
+        """
+        return get_google_model(
+            self.model_name, self.generation_config, SAFETY_SETTINGS, self.api_key, asynchronous=asynchronous
+        )
+
+    def _handle_attempt_error(self, error, attempt, max_retries, prompt):
+        """
+        Log a failed attempt, back off if throttled and prepare the prompt for the next one.
+
+        Args:
+            error (Exception): The error raised by the attempt.
+            attempt (int): The zero-based attempt number.
+            max_retries (int): Maximum number of retry attempts.
+            prompt (str): The prompt used for the attempt.
+
+        Returns:
+            str: The prompt to use for the next attempt.
+        """
+        prompt, throttled = self._prepare_retry(error, attempt, max_retries, prompt)
+        if throttled:
+            delay = self.rate_limiter.backoff(attempt, retry_after=parse_retry_delay(error))
+            record_backoff(self.provider, delay)
+            print(f"Waited {delay:.1f}s before retrying")
+        return prompt
+
+    async def _ahandle_attempt_error(self, error, attempt, max_retries, prompt):
+        """
+        Async counterpart of _handle_attempt_error that backs off without blocking the event loop.
+
+        Returns:
+            str: The prompt to use for the next attempt.
+        """
+        prompt, throttled = self._prepare_retry(error, attempt, max_retries, prompt)
+        if throttled:
+            delay = await self.rate_limiter.abackoff(attempt, retry_after=parse_retry_delay(error))
+            record_backoff(self.provider, delay)
+            print(f"Waited {delay:.1f}s before retrying")
+        return prompt
+
+    def _prepare_retry(self, error, attempt, max_retries, prompt):
+        """
+        Log a failed attempt and prepare the prompt for the next one.
+
+        Args:
+            error (Exception): The error raised by the attempt.
+            attempt (int): The zero-based attempt number.
+            max_retries (int): Maximum number of retry attempts.
+            prompt (str): The prompt used for the attempt.
+
+        Returns:
+            tuple: (prompt, throttled) where throttled is True if the caller should back off before retrying.
+        """
+        error_message = str(error)
+        print(f"Attempt {attempt + 1}/{max_retries} failed: {error_message}")
+        will_retry = attempt < max_retries - 1
+        throttled = False
+
+        # Check for specific errors
+        if "504" in error_message or "Deadline Exceeded" in error_message:
+            reason = "timeout"
+            print("Timeout error detected, retrying with a shorter prompt...")
+            # If this is not the last retry, try with a shorter prompt
+            if self._estimate_tokens(prompt) > TIMEOUT_PROMPT_TOKENS:
+                prompt = trim_to_tokens(
+                    prompt, TIMEOUT_PROMPT_TOKENS, self.provider, self.model_name,
+                    marker="\n[Note: Prompt was truncated due to timeout issues.]"
+                )
+                record_truncation(self.provider, "timeout")
+                print(f"Prompt truncated to about {self._estimate_tokens(prompt)} tokens")
+        elif is_rate_limit_error(error):
+            reason = "rate_limit"
+            # No point waiting after the last attempt
+            if will_retry:
+                print("Rate limit or quota exceeded, waiting before retry...")
+                throttled = True
+        elif "Unknown field" in error_message:
+            reason = "invalid_request"
+            print("API parameter error detected. Using default parameters.")
+        else:
+            reason = "error"
+
+        if will_retry:
+            record_retry(self.provider, reason)
+
+        return prompt, throttled
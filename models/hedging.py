@@ -0,0 +1,502 @@
+"""
+Hedged requests for the model integrations.
+
+A hedged integration sends each call to a primary model and, if no result
+(or, when streaming, no first token) has arrived once the call is slower
+than most recent calls, sends the same prompt to a backup model or provider.
+The first good result wins and the other call is abandoned. The threshold is
+learned from a sliding window of the primary model's recent latencies.
+"""
+import asyncio
+import contextvars
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+from utils.helpers import is_error_response, submit_with_context
+from utils.metrics import record_hedge
+
+DEFAULT_PERCENTILE = 95
+# Threshold used until enough latencies have been seen, and the lowest threshold allowed
+DEFAULT_DELAY = 20.0
+MIN_DELAY = 1.0
+DEFAULT_WINDOW = 200
+MIN_SAMPLES = 20
+
+RESPONSE = "response"
+FIRST_TOKEN = "first_token"
+# Attributes describing the primary's provider that a hedged integration passes through. Anything
+# that makes calls must be hedged here instead, so it is not silently sent to the primary alone.
+PRIMARY_ATTRIBUTES = ("api_key", "DEFAULT_MODELS", "get_available_models", "list_models")
+
+
+# Watches active in the current context, told when a hedged call is won by the backup model
+_backup_watches = contextvars.ContextVar("backup_watches", default=())
+
+
+class BackupWatch:
+    """
+    Records whether any hedged call made while it was active was answered by the backup model.
+
+    A hedged integration reports the primary's provider and model, so callers
+    that store outputs under that name, such as caches and the guide archive,
+    use a watch to skip outputs the backup model wrote.
+    """
+
+    def __init__(self):
+        self.backup_won = False
+
+    @contextmanager
+    def active(self):
+        """
+        Watch the hedged calls made in this block, including those made from threads started with a copy of
+        the current context. Watches can be nested, and each one sees the calls made inside it.
+        """
+        token = _backup_watches.set(_backup_watches.get() + (self,))
+        try:
+            yield self
+        finally:
+            _backup_watches.reset(token)
+
+
+def watch_backup_wins():
+    """
+    Start watching for hedged calls answered by the backup model.
+
+    Returns:
+        contextmanager: Yields the BackupWatch.
+    """
+    return BackupWatch().active()
+
+
+def _record_winner(provider, call_type, winner):
+    """
+    Record which model answered a hedged call, in the metrics and the active watches.
+    """
+    record_hedge(provider, call_type, winner)
+    if winner == "secondary":
+        for watch in _backup_watches.get():
+            watch.backup_won = True
+
+
+class LatencyTracker:
+    """
+    Sliding windows of recent latencies, used to pick hedging thresholds.
+    """
+
+    def __init__(self, window=DEFAULT_WINDOW, min_samples=MIN_SAMPLES):
+        """
+        Initialize the tracker.
+
+        Args:
+            window (int): Number of recent latencies kept per key.
+            min_samples (int): Latencies needed before percentiles are reported.
+        """
+        self.window = window
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._samples = {}
+
+    def record(self, key, seconds):
+        """
+        Record a latency.
+
+        Args:
+            key (tuple): Identifies the model and type of call.
+            seconds (float): The latency.
+        """
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, key, pct):
+        """
+        Get a percentile of the recent latencies.
+
+        Args:
+            key (tuple): Identifies the model and type of call.
+            pct (float): The percentile, between 0 and 100.
+
+        Returns:
+            float: The latency, or None if too few have been recorded.
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+_latency_tracker = LatencyTracker()
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("HEDGE_MAX_WORKERS", 64)), thread_name_prefix="hedge")
+
+
+class HedgedIntegration:
+    """
+    Model integration that hedges slow calls to a primary integration with a backup one.
+
+    Calls that lose the race are abandoned: async calls are cancelled, streams
+    stop being read, and blocking calls finish in the background (their
+    responses are still cached).
+    """
+
+    def __init__(self, primary, secondary, percentile=None, min_delay=None, default_delay=None, tracker=None):
+        """
+        Initialize the hedged integration.
+
+        Args:
+            primary: The integration normally used.
+            secondary: The backup integration, e.g. a local Ollama model.
+            percentile (float, optional): Primary latency percentile after which the backup is called.
+                Defaults to HEDGE_PERCENTILE or 95.
+            min_delay (float, optional): Lowest threshold in seconds. Defaults to HEDGE_MIN_DELAY or 1.
+            default_delay (float, optional): Threshold in seconds until enough latencies have been seen.
+                Defaults to HEDGE_DEFAULT_DELAY or 20.
+            tracker (LatencyTracker, optional): Where latencies are recorded. Defaults to the process-wide tracker.
+        """
+        self.primary = primary
+        self.secondary = secondary
+        self.percentile = float(percentile or os.getenv("HEDGE_PERCENTILE", DEFAULT_PERCENTILE))
+        self.min_delay = float(min_delay or os.getenv("HEDGE_MIN_DELAY", MIN_DELAY))
+        self.default_delay = float(default_delay or os.getenv("HEDGE_DEFAULT_DELAY", DEFAULT_DELAY))
+        self.tracker = tracker or _latency_tracker
+        # Cache keys, token budgets and similarity lookups follow the primary model
+        self.provider = primary.provider
+        self.model_name = primary.model_name
+
+    def __getattr__(self, name):
+        if name not in PRIMARY_ATTRIBUTES:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        return getattr(self.primary, name)
+
+    def session(self):
+        """
+        Hedged calls do not continue a session: the backup model would not have the
+        session's context, so each call is sent with its full prompt.
+
+        Returns:
+            HedgedIntegration: This integration.
+        """
+        print("Hedged requests do not continue a session, sending every step its full prompt.")
+        return self
+
+    def _key(self, call_type, kind):
+        return self.primary.provider, self.primary.model_name, call_type, kind
+
+    def hedge_delay(self, call_type, kind=RESPONSE):
+        """
+        Get how long to wait for the primary before calling the backup.
+
+        Args:
+            call_type (str): The type of call, e.g. "company_research".
+            kind (str): RESPONSE for complete responses or FIRST_TOKEN for streams.
+
+        Returns:
+            float: The delay in seconds.
+        """
+        latency = self.tracker.percentile(self._key(call_type, kind), self.percentile)
+        return self.default_delay if latency is None else max(self.min_delay, latency)
+
+    def warm_up(self, wait=False):
+        """
+        Warm up whichever of the two integrations support it.
+        """
+        for integration in (self.primary, self.secondary):
+            if hasattr(integration, "warm_up"):
+                integration.warm_up(wait=wait)
+
+    def invoke(self, prompt):
+        """
+        Generate a response (compatible with LLM interface).
+
+        Args:
+            prompt (str): The prompt to send to the model.
+
+        Returns:
+            str: The generated response.
+        """
+        return self.generate_response(prompt)
+
+    def generate_response(self, prompt, call_type=None, use_cache=True, timeout=None):
+        """
+        Generate a response, calling the backup if the primary is slow or fails.
+
+        Args:
+            prompt (str): The prompt to send to the model.
+            call_type (str, optional): The type of call, used to pick the cache TTL.
+            use_cache (bool): Set to False to bypass the response cache.
+            timeout (float, optional): Maximum seconds to wait for an identical request already in flight.
+
+        Returns:
+            str: The first good response, or the primary's error if both fail.
+        """
+        def call_primary():
+            started = time.monotonic()
+            response = self.primary.generate_response(prompt, call_type=call_type, use_cache=use_cache, timeout=timeout)
+            if not is_error_response(response):
+                self.tracker.record(self._key(call_type, RESPONSE), time.monotonic() - started)
+            return response
+
+        pending = {submit_with_context(_executor, call_primary): "primary"}
+        done, _ = wait(pending, timeout=self.hedge_delay(call_type))
+        first_error = None
+        if done:
+            response = self._result(next(iter(done)))
+            if not is_error_response(response):
+                return response
+            first_error = response
+            pending = {}
+
+        print(f"Primary model is slow or failed, hedging {call_type or 'request'} to {self.secondary.provider}/"
+              f"{self.secondary.model_name}")
+        secondary = submit_with_context(
+            _executor, self.secondary.generate_response, prompt,
+            call_type=call_type, use_cache=use_cache, timeout=timeout
+        )
+        pending[secondary] = "secondary"
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                winner = pending.pop(future)
+                response = self._result(future)
+                if not is_error_response(response):
+                    _record_winner(self.primary.provider, call_type, winner)
+                    return response
+                if first_error is None or winner == "primary":
+                    first_error = response
+        return first_error
+
+    @staticmethod
+    def _result(future):
+        try:
+            return future.result()
+        except Exception as e:
+            return f"Error: {e}"
+
+    def generate_response_stream(self, prompt, call_type=None, use_cache=True):
+        """
+        Stream a response, switching to the backup if the primary's first token is slow or it fails.
+
+        Args:
+            prompt (str): The prompt to send to the model.
+            call_type (str, optional): The type of call, used to pick the cache TTL.
+            use_cache (bool): Set to False to bypass the response cache.
+
+        Yields:
+            str: Chunks of the response from whichever model produced the first good chunk.
+        """
+        events = queue.Queue()
+        stops = {}
+
+        def start(name, integration):
+            stops[name] = threading.Event()
+            submit_with_context(
+                _executor, self._pump_stream, name, integration, prompt, call_type, use_cache, events, stops[name]
+            )
+
+        start("primary", self.primary)
+        deadline = time.monotonic() + self.hedge_delay(call_type, FIRST_TOKEN)
+        winner = None
+        failed = {}
+        try:
+            while True:
+                if winner is None and "secondary" not in stops:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        name, kind, value = events.get(timeout=max(0.0, remaining))
+                    except queue.Empty:
+                        print(f"Primary model is slow to start, hedging {call_type or 'request'} to "
+                              f"{self.secondary.provider}/{self.secondary.model_name}")
+                        start("secondary", self.secondary)
+                        continue
+                else:
+                    name, kind, value = events.get()
+
+                if name in failed:
+                    continue
+                if winner is not None:
+                    if name != winner:
+                        continue
+                    if kind == "chunk":
+                        yield value
+                    elif kind == "error":
+                        raise value
+                    else:
+                        return
+                    continue
+
+                if kind == "chunk" and not is_error_response(value):
+                    winner = name
+                    for other, stop in stops.items():
+                        if other != name:
+                            stop.set()
+                    if "secondary" in stops:
+                        _record_winner(self.primary.provider, call_type, name)
+                    yield value
+                    continue
+
+                # The stream failed before its first good chunk
+                if kind == "chunk":
+                    stops[name].set()
+                if isinstance(value, str):
+                    failed[name] = value
+                else:
+                    failed[name] = f"Error: {value}" if value else "Error: Empty response"
+                if "secondary" not in stops:
+                    start("secondary", self.secondary)
+                elif len(failed) == len(stops):
+                    yield failed.get("primary") or failed[name]
+                    return
+        finally:
+            for stop in stops.values():
+                stop.set()
+
+    def _pump_stream(self, name, integration, prompt, call_type, use_cache, events, stop):
+        """
+        Read a stream on a worker thread, forwarding its chunks until asked to stop.
+        """
+        started = time.monotonic()
+        first = True
+        chunks = integration.generate_response_stream(prompt, call_type=call_type, use_cache=use_cache)
+        try:
+            for chunk in chunks:
+                if stop.is_set():
+                    break
+                if first and name == "primary" and not is_error_response(chunk):
+                    self.tracker.record(self._key(call_type, FIRST_TOKEN), time.monotonic() - started)
+                first = False
+                events.put((name, "chunk", chunk))
+                if stop.is_set():
+                    break
+            else:
+                events.put((name, "done", None))
+        except Exception as e:
+            events.put((name, "error", e))
+        finally:
+            # Closing the generator stops the underlying request
+            chunks.close()
+
+    async def agenerate_response(self, prompt, call_type=None, use_cache=True, timeout=None):
+        """
+        Async counterpart of generate_response. The losing call is cancelled.
+
+        Args:
+            prompt (str): The prompt to send to the model.
+            call_type (str, optional): The type of call, used to pick the cache TTL.
+            use_cache (bool): Set to False to bypass the response cache.
+            timeout (float, optional): Maximum seconds to wait for the response.
+
+        Returns:
+            str: The first good response, or the primary's error if both fail.
+        """
+        async def call_primary():
+            started = time.monotonic()
+            response = await self.primary.agenerate_response(
+                prompt, call_type=call_type, use_cache=use_cache, timeout=timeout
+            )
+            if not is_error_response(response):
+                self.tracker.record(self._key(call_type, RESPONSE), time.monotonic() - started)
+            return response
+
+        primary = asyncio.ensure_future(call_primary())
+        tasks = {primary: "primary"}
+        first_error = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay(call_type))
+            if done:
+                response = self._result(primary)
+                if not is_error_response(response):
+                    return response
+                first_error = response
+                del tasks[primary]
+
+            secondary = asyncio.ensure_future(self.secondary.agenerate_response(
+                prompt, call_type=call_type, use_cache=use_cache, timeout=timeout
+            ))
+            tasks[secondary] = "secondary"
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    response = self._result(task)
+                    if not is_error_response(response):
+                        _record_winner(self.primary.provider, call_type, tasks[task])
+                        return response
+                    if first_error is None or tasks[task] == "primary":
+                        first_error = response
+            return first_error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def agenerate_response_stream(self, prompt, call_type=None, use_cache=True):
+        """
+        Async counterpart of generate_response_stream. The losing stream is closed.
+
+        Args:
+            prompt (str): The prompt to send to the model.
+            call_type (str, optional): The type of call, used to pick the cache TTL.
+            use_cache (bool): Set to False to bypass the response cache.
+
+        Yields:
+            str: Chunks of the response from whichever model produced the first good chunk.
+        """
+        streams = {}
+        # Task reading the first chunk of each stream
+        firsts = {}
+
+        def start(name, integration):
+            streams[name] = integration.agenerate_response_stream(prompt, call_type=call_type, use_cache=use_cache)
+            firsts[asyncio.ensure_future(anext(streams[name]))] = name
+
+        started = time.monotonic()
+        start("primary", self.primary)
+        winner = None
+        failed = {}
+        try:
+            done, _ = await asyncio.wait(set(firsts), timeout=self.hedge_delay(call_type, FIRST_TOKEN))
+            while True:
+                for task in done:
+                    name = firsts.pop(task)
+                    chunk = self._first_chunk(task)
+                    if not is_error_response(chunk):
+                        winner, first = name, chunk
+                        break
+                    failed[name] = chunk
+                if winner is not None:
+                    break
+                if "secondary" not in streams:
+                    print(f"Primary model is slow or failed, hedging {call_type or 'request'} to "
+                          f"{self.secondary.provider}/{self.secondary.model_name}")
+                    start("secondary", self.secondary)
+                elif not firsts:
+                    yield failed.get("primary") or failed["secondary"]
+                    return
+                done, _ = await asyncio.wait(set(firsts), return_when=asyncio.FIRST_COMPLETED)
+
+            if winner == "primary":
+                self.tracker.record(self._key(call_type, FIRST_TOKEN), time.monotonic() - started)
+            if "secondary" in streams:
+                _record_winner(self.primary.provider, call_type, winner)
+            yield first
+            async for chunk in streams[winner]:
+                yield chunk
+        finally:
+            for task in firsts:
+                task.cancel()
+            await asyncio.gather(*firsts, return_exceptions=True)
+            for stream in streams.values():
+                # Closing the generator stops the underlying request
+                await stream.aclose()
+
+    @staticmethod
+    def _first_chunk(task):
+        try:
+            return task.result()
+        except StopAsyncIteration:
+            return "Error: Empty response"
+        except Exception as e:
+            return f"Error: {e}"
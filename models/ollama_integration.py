@@ -2,21 +2,37 @@
 Ollama model integration for the interview preparation framework.
 Simplified version that doesn't rely on crewai.
 """
-import ollama
+import asyncio
+import threading
+
+from models.client_registry import get_ollama_async_client, get_ollama_client
+from models.ollama_residency import DEFAULT_OUTPUT_RESERVE, get_residency_manager
+from models.response_cache import (
+    acached_generate, acached_generate_stream, cached_generate, cached_generate_stream
+)
 
 class OllamaIntegration:
     """
     Integration with Ollama models for the interview preparation framework.
     """
 
-    def __init__(self, model_name="llama3"):
+    provider = "ollama"
+    DEFAULT_MODELS = ["llama3", "mistral", "gemma", "codellama"]
+
+    def __init__(self, model_name="llama3", options=None, host=None):
         """
         Initialize the Ollama integration.
 
         Args:
             model_name (str): The name of the Ollama model to use.
+            options (dict, optional): Model options passed to Ollama with every request.
+            host (str, optional): The Ollama server URL. Defaults to OLLAMA_HOST or the local server.
         """
         self.model_name = model_name
+        self.options = dict(options or {})
+        self.host = host
+        self.client = get_ollama_client(host)
+        self.residency = get_residency_manager(self.client, host)
 
     def get_available_models(self):
         """
@@ -26,11 +42,50 @@ class OllamaIntegration:
             list: A list of available model names.
         """
         try:
-            models = ollama.list()
-            return [model['name'] for model in models.get('models', [])]
+            return self.list_models()
         except Exception as e:
             print(f"Error fetching Ollama models: {e}")
-            return ["llama3", "mistral", "gemma", "codellama"]  # Default fallback models
+            return list(self.DEFAULT_MODELS)  # Default fallback models
+
+    def list_models(self):
+        """
+        Fetch the list of models installed on the Ollama server, raising on errors.
+
+        Returns:
+            list: A list of available model names.
+        """
+        models = self.client.list()
+        return [model['name'] for model in models.get('models', [])]
+
+    def warm_up(self, wait=False):
+        """
+        Load the model ahead of the first request so users do not wait for it.
+
+        Args:
+            wait (bool): Whether to block until the model is loaded.
+
+        Returns:
+            bool: True if the model was not loaded yet.
+        """
+        return self.residency.warm_up(self.model_name, wait=wait)
+
+    def is_loaded(self):
+        """
+        Check whether the model is expected to be loaded on the server.
+
+        Returns:
+            bool: True if the model was used or warmed up within its keep_alive period.
+        """
+        return self.residency.is_loaded(self.model_name)
+
+    def session(self):
+        """
+        Start a session whose calls continue from each other's context.
+
+        Returns:
+            OllamaSession: The new session.
+        """
+        return OllamaSession(self)
 
     def invoke(self, prompt):
         """
@@ -44,10 +99,82 @@ class OllamaIntegration:
         """
         return self.generate_response(prompt)
 
-    def generate_response(self, prompt):
+    def generate_response(self, prompt, call_type=None, use_cache=True, timeout=None):
         """
         Generate a response using the Ollama model directly.
 
+        Args:
+            prompt (str): The prompt to send to the model.
+            call_type (str, optional): The type of call, used to pick the cache TTL.
+            use_cache (bool): Set to False to bypass the response cache.
+            timeout (float, optional): Maximum seconds to wait for an identical request already in flight.
+
+        Returns:
+            str: The generated response.
+        """
+        return cached_generate(
+            self.provider, self.model_name, self.options, prompt, self._generate_uncached,
+            call_type=call_type, use_cache=use_cache, timeout=timeout
+        )
+
+    def generate_response_stream(self, prompt, call_type=None, use_cache=True, timeout=None):
+        """
+        Stream a response from the Ollama model as it is generated.
+
+        Args:
+            prompt (str): The prompt to send to the model.
+            call_type (str, optional): The type of call, used to pick the cache TTL.
+            use_cache (bool): Set to False to bypass the response cache.
+            timeout (float, optional): Maximum seconds to wait for an identical request already in flight.
+
+        Yields:
+            str: Chunks of the generated response.
+        """
+        yield from cached_generate_stream(
+            self.provider, self.model_name, self.options, prompt, self._generate_stream_uncached,
+            call_type=call_type, use_cache=use_cache, timeout=timeout
+        )
+
+    async def agenerate_response(self, prompt, call_type=None, use_cache=True, timeout=None):
+        """
+        Async counterpart of generate_response, using Ollama's async client.
+
+        Args:
+            prompt (str): The prompt to send to the model.
+            call_type (str, optional): The type of call, used to pick the cache TTL.
+            use_cache (bool): Set to False to bypass the response cache.
+            timeout (float, optional): Maximum seconds to wait for the response.
+
+        Returns:
+            str: The generated response.
+        """
+        return await acached_generate(
+            self.provider, self.model_name, self.options, prompt, self._agenerate_uncached,
+            call_type=call_type, use_cache=use_cache, timeout=timeout
+        )
+
+    async def agenerate_response_stream(self, prompt, call_type=None, use_cache=True):
+        """
+        Async counterpart of generate_response_stream.
+
+        Args:
+            prompt (str): The prompt to send to the model.
+            call_type (str, optional): The type of call, used to pick the cache TTL.
+            use_cache (bool): Set to False to bypass the response cache.
+
+        Yields:
+            str: Chunks of the generated response.
+        """
+        async for chunk in acached_generate_stream(
+            self.provider, self.model_name, self.options, prompt, self._agenerate_stream_uncached,
+            call_type=call_type, use_cache=use_cache
+        ):
+            yield chunk
+
+    def _generate_uncached(self, prompt):
+        """
+        Call the Ollama model.
+
         Args:
             prompt (str): The prompt to send to the model.
 
@@ -55,8 +182,372 @@ class OllamaIntegration:
             str: The generated response.
         """
         try:
-            response = ollama.generate(model=self.model_name, prompt=prompt)
+            options, keep_alive = self.residency.prepare(self.model_name, prompt, self.options)
+            response = self.client.generate(
+                model=self.model_name, prompt=prompt, options=options, keep_alive=keep_alive
+            )
+            self.residency.record_response(self.model_name, response)
             return response.get('response', '')
         except Exception as e:
             print(f"Error generating response with Ollama: {e}")
             return "Error: Could not generate response with Ollama."
+
+    def _generate_stream_uncached(self, prompt):
+        """
+        Stream a response from the Ollama model.
+
+        Errors after the first chunk are raised, since the partial output has
+        already been handed to the caller.
+
+        Args:
+            prompt (str): The prompt to send to the model.
+
+        Yields:
+            str: Chunks of the generated response.
+        """
+        started = False
+        try:
+            options, keep_alive = self.residency.prepare(self.model_name, prompt, self.options)
+            for part in self.client.generate(model=self.model_name, prompt=prompt, options=options,
+                                             keep_alive=keep_alive, stream=True):
+                text = part.get('response', '')
+                if text:
+                    started = True
+                    yield text
+                if part.get('done'):
+                    self.residency.record_response(self.model_name, part)
+        except Exception as e:
+            if started:
+                print(f"Streaming from Ollama failed mid-response: {e}")
+                raise
+            print(f"Error generating response with Ollama: {e}")
+            yield "Error: Could not generate response with Ollama."
+
+    async def _agenerate_uncached(self, prompt):
+        """
+        Call the Ollama model without blocking the event loop.
+
+        Args:
+            prompt (str): The prompt to send to the model.
+
+        Returns:
+            str: The generated response.
+        """
+        try:
+            client = get_ollama_async_client(self.host)
+            options, keep_alive = self.residency.prepare(self.model_name, prompt, self.options)
+            response = await client.generate(
+                model=self.model_name, prompt=prompt, options=options, keep_alive=keep_alive
+            )
+            self.residency.record_response(self.model_name, response)
+            return response.get('response', '')
+        except Exception as e:
+            print(f"Error generating response with Ollama: {e}")
+            return "Error: Could not generate response with Ollama."
+
+    async def _agenerate_stream_uncached(self, prompt):
+        """
+        Stream a response from the Ollama model without blocking the event loop.
+
+        Args:
+            prompt (str): The prompt to send to the model.
+
+        Yields:
+            str: Chunks of the generated response.
+        """
+        started = False
+        try:
+            client = get_ollama_async_client(self.host)
+            options, keep_alive = self.residency.prepare(self.model_name, prompt, self.options)
+            async for part in await client.generate(model=self.model_name, prompt=prompt, options=options,
+                                                    keep_alive=keep_alive, stream=True):
+                text = part.get('response', '')
+                if text:
+                    started = True
+                    yield text
+                if part.get('done'):
+                    self.residency.record_response(self.model_name, part)
+        except Exception as e:
+            if started:
+                print(f"Streaming from Ollama failed mid-response: {e}")
+                raise
+            print(f"Error generating response with Ollama: {e}")
+            yield "Error: Could not generate response with Ollama."
+
+
+class OllamaSession:
+    """
+    A conversation with an Ollama model that the stages of one pipeline run continue in turn.
+
+    Every call passes the context returned by the previous one, so Ollama
+    continues from tokens it has already processed instead of encoding
+    earlier responses again when a later prompt repeats them. Calls in a
+    session run one after another, since each continues the one before.
+    """
+
+    def __init__(self, integration):
+        """
+        Initialize the session.
+
+        Args:
+            integration (OllamaIntegration): The integration the session sends its calls to.
+        """
+        self.integration = integration
+        self.provider = integration.provider
+        self.model_name = integration.model_name
+        self._lock = threading.Lock()
+        self._async_lock = None
+        self._context = None
+        self._turns = []
+
+    def __getattr__(self, name):
+        # Model listing, warm-up and the like are not part of the conversation
+        if name == "integration":
+            raise AttributeError(name)
+        return getattr(self.integration, name)
+
+    def fork(self):
+        """
+        Start a session that continues from this session's conversation so far.
+
+        Calls that fan out from the same point, such as the question categories
+        generated in parallel, each continue from a fork instead of chaining onto
+        whichever call finished before them. A fork's calls do not add to this
+        session's context.
+
+        Returns:
+            OllamaSession: A session with a snapshot of this session's context.
+        """
+        with self._lock:
+            fork = OllamaSession(self.integration)
+            fork._context = self._context
+            fork._turns = list(self._turns)
+        return fork
+
+    def in_context(self, text):
+        """
+        Check whether a text is a response the model already has in the session's context.
+
+        Args:
+            text (str): The text, e.g. the output of an earlier stage.
+
+        Returns:
+            bool: True if a later prompt can refer to the text instead of repeating it.
+        """
+        if not text or not self._context:
+            return False
+        # Leave room for the next prompt and response in the largest context requested
+        if len(self._context) + 2 * DEFAULT_OUTPUT_RESERVE > self.integration.residency.max_num_ctx:
+            return False
+        return any(response == text.strip() for _, response in self._turns)
+
+    def invoke(self, prompt):
+        """
+        Generate a response (compatible with LLM interface).
+
+        Args:
+            prompt (str): The prompt to send to the model.
+
+        Returns:
+            str: The generated response.
+        """
+        return self.generate_response(prompt)
+
+    def generate_response(self, prompt, call_type=None, use_cache=True, timeout=None):
+        """
+        Generate a response that continues the session.
+
+        A cached or shared response would not come with the context Ollama
+        returns, leaving the session behind the conversation, so every call
+        of a session is sent to the model.
+
+        Args:
+            prompt (str): The prompt to send to the model.
+            call_type (str, optional): The type of call, used in the metrics.
+            use_cache (bool): Ignored; session calls bypass the response cache.
+            timeout (float, optional): Ignored; session calls do not wait for identical requests in flight.
+
+        Returns:
+            str: The generated response.
+        """
+        with self._lock:
+            return cached_generate(
+                self.provider, self.model_name, self.integration.options, prompt, self._continue,
+                call_type=call_type, use_cache=False, coalesce=False
+            )
+
+    def generate_response_stream(self, prompt, call_type=None, use_cache=True, timeout=None):
+        """
+        Stream a response that continues the session. Like generate_response,
+        it is always sent to the model.
+
+        Args:
+            prompt (str): The prompt to send to the model.
+            call_type (str, optional): The type of call, used in the metrics.
+            use_cache (bool): Ignored; session calls bypass the response cache.
+            timeout (float, optional): Ignored; session calls do not wait for identical requests in flight.
+
+        Yields:
+            str: Chunks of the generated response.
+        """
+        with self._lock:
+            yield from cached_generate_stream(
+                self.provider, self.model_name, self.integration.options, prompt, self._continue_stream,
+                call_type=call_type, use_cache=False, coalesce=False
+            )
+
+    async def agenerate_response(self, prompt, call_type=None, use_cache=True, timeout=None):
+        """
+        Async counterpart of generate_response.
+
+        Args:
+            prompt (str): The prompt to send to the model.
+            call_type (str, optional): The type of call, used in the metrics.
+            use_cache (bool): Ignored; session calls bypass the response cache.
+            timeout (float, optional): Maximum seconds to wait for the response.
+
+        Returns:
+            str: The generated response.
+        """
+        async with self._get_async_lock():
+            return await acached_generate(
+                self.provider, self.model_name, self.integration.options, prompt, self._acontinue,
+                call_type=call_type, use_cache=False, timeout=timeout, coalesce=False
+            )
+
+    async def agenerate_response_stream(self, prompt, call_type=None, use_cache=True):
+        """
+        Async counterpart of generate_response_stream.
+
+        Args:
+            prompt (str): The prompt to send to the model.
+            call_type (str, optional): The type of call, used in the metrics.
+            use_cache (bool): Ignored; session calls bypass the response cache.
+
+        Yields:
+            str: Chunks of the generated response.
+        """
+        async with self._get_async_lock():
+            async for chunk in acached_generate_stream(
+                self.provider, self.model_name, self.integration.options, prompt, self._acontinue_stream,
+                call_type=call_type, use_cache=False
+            ):
+                yield chunk
+
+    def _get_async_lock(self):
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+        return self._async_lock
+
+    def _request(self, prompt):
+        """
+        Build the arguments of a generate call that continues the session.
+        """
+        options, keep_alive = self.integration.residency.prepare(
+            self.model_name, prompt, self.integration.options, context_tokens=len(self._context or ())
+        )
+        request = {"model": self.model_name, "prompt": prompt, "options": options, "keep_alive": keep_alive}
+        if self._context:
+            request["context"] = self._context
+        return request
+
+    def _remember(self, prompt, response, final):
+        """
+        Record the context returned with a response, so the next call continues from it.
+        """
+        self.integration.residency.record_response(self.model_name, final)
+        if final.get('context'):
+            self._context = final['context']
+            self._turns.append((prompt, response.strip()))
+
+    def _continue(self, prompt):
+        """
+        Call the Ollama model with the session's context.
+
+        Args:
+            prompt (str): The prompt to send to the model.
+
+        Returns:
+            str: The generated response.
+        """
+        try:
+            response = self.integration.client.generate(**self._request(prompt))
+            text = response.get('response', '')
+            self._remember(prompt, text, response)
+            return text
+        except Exception as e:
+            print(f"Error generating response with Ollama: {e}")
+            return "Error: Could not generate response with Ollama."
+
+    def _continue_stream(self, prompt):
+        """
+        Stream a response from the Ollama model with the session's context.
+
+        Args:
+            prompt (str): The prompt to send to the model.
+
+        Yields:
+            str: Chunks of the generated response.
+        """
+        chunks = []
+        try:
+            for part in self.integration.client.generate(stream=True, **self._request(prompt)):
+                text = part.get('response', '')
+                if text:
+                    chunks.append(text)
+                    yield text
+                if part.get('done'):
+                    self._remember(prompt, "".join(chunks), part)
+        except Exception as e:
+            if chunks:
+                print(f"Streaming from Ollama failed mid-response: {e}")
+                raise
+            print(f"Error generating response with Ollama: {e}")
+            yield "Error: Could not generate response with Ollama."
+
+    async def _acontinue(self, prompt):
+        """
+        Call the Ollama model with the session's context without blocking the event loop.
+
+        Args:
+            prompt (str): The prompt to send to the model.
+
+        Returns:
+            str: The generated response.
+        """
+        try:
+            client = get_ollama_async_client(self.integration.host)
+            response = await client.generate(**self._request(prompt))
+            text = response.get('response', '')
+            self._remember(prompt, text, response)
+            return text
+        except Exception as e:
+            print(f"Error generating response with Ollama: {e}")
+            return "Error: Could not generate response with Ollama."
+
+    async def _acontinue_stream(self, prompt):
+        """
+        Stream a response from the Ollama model with the session's context without blocking the event loop.
+
+        Args:
+            prompt (str): The prompt to send to the model.
+
+        Yields:
+            str: Chunks of the generated response.
+        """
+        chunks = []
+        try:
+            client = get_ollama_async_client(self.integration.host)
+            async for part in await client.generate(stream=True, **self._request(prompt)):
+                text = part.get('response', '')
+                if text:
+                    chunks.append(text)
+                    yield text
+                if part.get('done'):
+                    self._remember(prompt, "".join(chunks), part)
+        except Exception as e:
+            if chunks:
+                print(f"Streaming from Ollama failed mid-response: {e}")
+                raise
+            print(f"Error generating response with Ollama: {e}")
+            yield "Error: Could not generate response with Ollama."
@@ -0,0 +1,257 @@
+"""
+Model residency management for Ollama.
+
+Ollama unloads a model after a few idle minutes and reloads it whenever the
+context size changes, and every load costs seconds before the first token.
+The residency manager preloads the selected model, keeps it loaded with
+keep_alive, sizes num_ctx from the prompts actually sent (growing it in a
+few steps rather than per request, so the model is not reloaded), and tracks
+which models are loaded.
+"""
+import os
+import threading
+import time
+
+from utils.token_budget import estimate_tokens
+
+DEFAULT_KEEP_ALIVE = "30m"
+# Context sizes are rounded up to a power of two within these bounds
+DEFAULT_MIN_NUM_CTX = 4096
+DEFAULT_MAX_NUM_CTX = 16384
+# Room left in the context for the response when num_predict is not set
+DEFAULT_OUTPUT_RESERVE = 2048
+# Loads slower than this are reported as cold starts
+COLD_START_SECONDS = 1.0
+
+_DURATION_UNITS = {"s": 1, "m": 60, "h": 60 * 60}
+
+
+def parse_keep_alive(keep_alive):
+    """
+    Convert an Ollama keep_alive value to seconds.
+
+    Args:
+        keep_alive (str or float): A duration such as "30m", "1h" or a number of seconds.
+            Negative values keep the model loaded indefinitely.
+
+    Returns:
+        float: The duration in seconds, or None to keep the model loaded indefinitely.
+    """
+    if isinstance(keep_alive, (int, float)):
+        seconds = float(keep_alive)
+    else:
+        value = str(keep_alive).strip().lower()
+        unit = _DURATION_UNITS.get(value[-1:], None)
+        seconds = float(value[:-1]) * unit if unit else float(value)
+    return None if seconds < 0 else seconds
+
+
+class OllamaResidencyManager:
+    """
+    Keeps Ollama models warm and tracks which ones are loaded on a server.
+    """
+
+    def __init__(self, client, keep_alive=DEFAULT_KEEP_ALIVE, min_num_ctx=DEFAULT_MIN_NUM_CTX,
+                 max_num_ctx=DEFAULT_MAX_NUM_CTX):
+        """
+        Initialize the residency manager.
+
+        Args:
+            client (ollama.Client): The client of the Ollama server.
+            keep_alive (str): How long Ollama keeps a model loaded after a request.
+            min_num_ctx (int): The smallest context size requested.
+            max_num_ctx (int): The largest context size requested.
+        """
+        self.client = client
+        self.keep_alive = keep_alive
+        self.keep_alive_seconds = parse_keep_alive(keep_alive)
+        self.min_num_ctx = min_num_ctx
+        self.max_num_ctx = max(min_num_ctx, max_num_ctx)
+        self._lock = threading.Lock()
+        self._models = {}
+        self._warming = {}
+        self._stats = {"warm_ups": 0, "cold_starts": 0, "load_seconds": 0.0}
+
+    def _state(self, model_name):
+        return self._models.setdefault(model_name, {"num_ctx": self.min_num_ctx, "expires_at": 0.0})
+
+    def _is_loaded(self, state, now):
+        return state["expires_at"] is None or state["expires_at"] > now
+
+    def is_loaded(self, model_name):
+        """
+        Check whether a model should still be loaded, based on its last use and keep_alive.
+
+        Args:
+            model_name (str): The name of the model.
+
+        Returns:
+            bool: True if the model is expected to be loaded.
+        """
+        with self._lock:
+            state = self._models.get(model_name)
+            return state is not None and self._is_loaded(state, time.time())
+
+    def loaded_models(self):
+        """
+        Get the models expected to be loaded and their context sizes.
+
+        Returns:
+            dict: {model_name: {"num_ctx": int, "expires_in": float or None}}
+        """
+        now = time.time()
+        with self._lock:
+            return {
+                model_name: {
+                    "num_ctx": state["num_ctx"],
+                    "expires_in": None if state["expires_at"] is None else round(state["expires_at"] - now, 1),
+                }
+                for model_name, state in self._models.items() if self._is_loaded(state, now)
+            }
+
+    def prepare(self, model_name, prompt, options=None, context_tokens=0):
+        """
+        Get the options and keep_alive for a request.
+
+        num_ctx is sized to fit the prompt and the response. It only grows
+        while the model is loaded, since any change makes Ollama reload it.
+        An explicit num_ctx in the options is left alone.
+
+        Args:
+            model_name (str): The name of the model.
+            prompt (str): The prompt to send.
+            options (dict, optional): The integration's model options.
+            context_tokens (int): Tokens of an earlier conversation the prompt continues.
+
+        Returns:
+            tuple: (options, keep_alive)
+        """
+        options = dict(options or {})
+        if "num_ctx" not in options:
+            needed = (context_tokens + estimate_tokens(prompt, "ollama", model_name)
+                      + options.get("num_predict", DEFAULT_OUTPUT_RESERVE))
+            with self._lock:
+                state = self._state(model_name)
+                if not self._is_loaded(state, time.time()):
+                    state["num_ctx"] = self.min_num_ctx
+                num_ctx = state["num_ctx"]
+                while num_ctx < needed and num_ctx < self.max_num_ctx:
+                    num_ctx *= 2
+                state["num_ctx"] = num_ctx = min(num_ctx, self.max_num_ctx)
+            options["num_ctx"] = num_ctx
+        return options, self.keep_alive
+
+    def record_response(self, model_name, response=None):
+        """
+        Record that a model served a request and is loaded for another keep_alive period.
+
+        Args:
+            model_name (str): The name of the model.
+            response (dict, optional): The final Ollama response, used to detect cold starts from load_duration.
+        """
+        load_seconds = ((response or {}).get("load_duration") or 0) / 1e9
+        with self._lock:
+            state = self._state(model_name)
+            state["expires_at"] = None if self.keep_alive_seconds is None else time.time() + self.keep_alive_seconds
+            if load_seconds >= COLD_START_SECONDS:
+                self._stats["cold_starts"] += 1
+                self._stats["load_seconds"] += load_seconds
+        if load_seconds >= COLD_START_SECONDS:
+            print(f"Ollama model {model_name} took {load_seconds:.1f}s to load")
+
+    def warm_up(self, model_name, wait=False):
+        """
+        Load a model ahead of the first request, unless it is already loaded or loading.
+
+        Args:
+            model_name (str): The name of the model.
+            wait (bool): Whether to block until the model is loaded.
+
+        Returns:
+            bool: True if a warm-up was started or awaited, False if the model is already loaded.
+        """
+        with self._lock:
+            thread = self._warming.get(model_name)
+            if thread is None:
+                state = self._models.get(model_name)
+                if state is not None and self._is_loaded(state, time.time()):
+                    return False
+                thread = threading.Thread(
+                    target=self._load, args=(model_name,), name=f"ollama-warm-up-{model_name}", daemon=True
+                )
+                self._warming[model_name] = thread
+                thread.start()
+        if wait:
+            thread.join()
+        return True
+
+    def _load(self, model_name):
+        """
+        Load a model by sending it an empty prompt.
+        """
+        try:
+            with self._lock:
+                num_ctx = self._state(model_name)["num_ctx"]
+                self._stats["warm_ups"] += 1
+            response = self.client.generate(
+                model=model_name, prompt="", options={"num_ctx": num_ctx}, keep_alive=self.keep_alive
+            )
+            self.record_response(model_name, response)
+            print(f"Ollama model {model_name} is loaded")
+        except Exception as e:
+            print(f"Error warming up Ollama model {model_name}: {e}")
+        finally:
+            with self._lock:
+                self._warming.pop(model_name, None)
+
+    def is_warming(self, model_name):
+        """
+        Check whether a warm-up of a model is in progress.
+
+        Args:
+            model_name (str): The name of the model.
+
+        Returns:
+            bool: True while the model is being loaded.
+        """
+        with self._lock:
+            return model_name in self._warming
+
+    def get_stats(self):
+        """
+        Get warm-up and cold start counters.
+
+        Returns:
+            dict: Warm-ups started, cold starts seen by requests and the time they spent loading.
+        """
+        with self._lock:
+            return dict(self._stats)
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_residency_manager(client, host=None):
+    """
+    Get the process-wide residency manager for an Ollama server, configured from
+    OLLAMA_KEEP_ALIVE, OLLAMA_MIN_NUM_CTX and OLLAMA_MAX_NUM_CTX.
+
+    Args:
+        client (ollama.Client): The shared client of the server.
+        host (str, optional): The Ollama server URL.
+
+    Returns:
+        OllamaResidencyManager: The shared manager.
+    """
+    with _managers_lock:
+        manager = _managers.get(host)
+        if manager is None:
+            manager = OllamaResidencyManager(
+                client,
+                keep_alive=os.getenv("OLLAMA_KEEP_ALIVE", DEFAULT_KEEP_ALIVE),
+                min_num_ctx=int(os.getenv("OLLAMA_MIN_NUM_CTX", DEFAULT_MIN_NUM_CTX)),
+                max_num_ctx=int(os.getenv("OLLAMA_MAX_NUM_CTX", DEFAULT_MAX_NUM_CTX))
+            )
+            _managers[host] = manager
+        return manager
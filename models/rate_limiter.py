@@ -0,0 +1,465 @@
+"""
+Client-side rate limiting for the model integrations.
+Keeps concurrent callers in one process under the provider's request and
+token quotas, and backs everyone off together when the provider throttles.
+"""
+import asyncio
+import os
+import random
+import re
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+# Retry hints found in Google API error messages, e.g. "retry_delay { seconds: 7 }"
+# or "Please retry in 7.5s"
+_RETRY_DELAY_PATTERNS = [
+    re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)", re.IGNORECASE),
+    re.compile(r"retry in\s*([\d.]+)\s*s", re.IGNORECASE),
+    re.compile(r"retry-after:?\s*([\d.]+)", re.IGNORECASE),
+]
+
+
+def parse_retry_delay(error):
+    """
+    Extract the server's suggested retry delay from an error.
+
+    Args:
+        error (Exception): The error raised by the provider.
+
+    Returns:
+        float: The suggested delay in seconds, or None if the error has no hint.
+    """
+    retry_delay = getattr(error, "retry_delay", None)
+    if retry_delay is not None:
+        seconds = getattr(retry_delay, "total_seconds", None)
+        return seconds() if callable(seconds) else float(retry_delay)
+
+    message = str(error)
+    for pattern in _RETRY_DELAY_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+def is_rate_limit_error(error):
+    """
+    Check whether an error means the provider is throttling requests.
+
+    Args:
+        error (Exception): The error raised by the provider.
+
+    Returns:
+        bool: True for 429 and quota errors.
+    """
+    message = str(error)
+    return "429" in message or "quota" in message.lower() or "resource exhausted" in message.lower()
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at a per-minute rate.
+    """
+
+    def __init__(self, per_minute, capacity=None):
+        """
+        Initialize the bucket.
+
+        Args:
+            per_minute (float): Tokens added per minute.
+            capacity (float, optional): Maximum tokens held. Defaults to one minute's worth.
+        """
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _try_take(self, amount):
+        """
+        Take tokens if enough are available.
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise the seconds until enough are available.
+        """
+        with self._lock:
+            self._refill()
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return 0.0
+            return (amount - self._tokens) / self.rate
+
+    def acquire(self, amount=1):
+        """
+        Take tokens from the bucket, blocking until enough are available.
+
+        Args:
+            amount (float): Tokens to take. Amounts above capacity wait for a full bucket.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            delay = self._try_take(amount)
+            if not delay:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+    async def aacquire(self, amount=1):
+        """
+        Async counterpart of acquire that waits without blocking the event loop.
+
+        Args:
+            amount (float): Tokens to take. Amounts above capacity wait for a full bucket.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            delay = self._try_take(amount)
+            if not delay:
+                return waited
+            await asyncio.sleep(delay)
+            waited += delay
+
+    def consume(self, amount):
+        """
+        Take tokens without waiting, letting the balance go negative.
+        Used to charge for usage that is only known after a request.
+
+        Args:
+            amount (float): Tokens to take.
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= amount
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Limits in-flight requests, halving the limit on throttling and growing it
+    back by one request per limit's worth of successes (AIMD).
+    """
+
+    def __init__(self, initial=4, minimum=1, maximum=16):
+        """
+        Initialize the limiter.
+
+        Args:
+            initial (int): The starting concurrency limit.
+            minimum (int): The lowest the limit can shrink to.
+            maximum (int): The highest the limit can grow to.
+        """
+        self.minimum = minimum
+        self.maximum = maximum
+        self._limit = float(max(minimum, min(initial, maximum)))
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        # (loop, event) pairs of coroutines waiting in aacquire
+        self._async_waiters = []
+
+    @property
+    def limit(self):
+        """
+        int: The current concurrency limit.
+        """
+        return int(self._limit)
+
+    def acquire(self):
+        """
+        Wait for a free request slot.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        started = time.monotonic()
+        with self._condition:
+            while self._in_flight >= int(self._limit):
+                self._condition.wait()
+            self._in_flight += 1
+        return time.monotonic() - started
+
+    def try_acquire(self):
+        """
+        Take a free request slot without waiting.
+
+        Returns:
+            bool: True if a slot was taken.
+        """
+        with self._condition:
+            if self._in_flight >= int(self._limit):
+                return False
+            self._in_flight += 1
+            return True
+
+    async def aacquire(self):
+        """
+        Async counterpart of acquire. Slots are shared with threads, so a
+        waiting coroutine is woken through its event loop when one is freed.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._condition:
+                if self._in_flight < int(self._limit):
+                    self._in_flight += 1
+                    return time.monotonic() - started
+                waiter = (loop, asyncio.Event())
+                self._async_waiters.append(waiter)
+            try:
+                await waiter[1].wait()
+            except asyncio.CancelledError:
+                with self._condition:
+                    if waiter in self._async_waiters:
+                        self._async_waiters.remove(waiter)
+                    else:
+                        # Pass on a wake-up this coroutine will not use
+                        self._wake_async(1)
+                raise
+
+    def _wake_async(self, count=None):
+        """
+        Wake coroutines waiting in aacquire. Must be called holding the condition.
+
+        Args:
+            count (int, optional): How many to wake. Defaults to all of them.
+        """
+        woken = 0
+        while self._async_waiters and (count is None or woken < count):
+            loop, event = self._async_waiters.pop(0)
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # The waiter's event loop is closed, so wake the next one instead
+                continue
+            woken += 1
+
+    def release(self):
+        """
+        Free a request slot.
+        """
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify()
+            self._wake_async(1)
+
+    def on_success(self):
+        """
+        Grow the limit after a successful request.
+        """
+        with self._condition:
+            self._limit = min(self.maximum, self._limit + 1.0 / self._limit)
+            self._condition.notify_all()
+            self._wake_async()
+
+    def on_throttle(self):
+        """
+        Shrink the limit after the provider throttled a request.
+        """
+        with self._condition:
+            self._limit = max(self.minimum, self._limit / 2)
+
+
+class RateLimiter:
+    """
+    Shared client-side rate limiter combining request and token budgets with
+    adaptive concurrency and coordinated backoff.
+    """
+
+    def __init__(self, requests_per_minute=60, tokens_per_minute=0, max_concurrency=8,
+                 base_backoff=2.0, max_backoff=60.0):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            requests_per_minute (int): Request budget; 0 disables the request limit.
+            tokens_per_minute (int): Token budget; 0 disables the token limit.
+            max_concurrency (int): The most requests allowed in flight at once.
+            base_backoff (float): Backoff in seconds after the first throttled attempt.
+            max_backoff (float): Upper bound for a single backoff.
+        """
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.concurrency = AdaptiveConcurrencyLimiter(
+            initial=max(1, max_concurrency // 2), maximum=max_concurrency
+        )
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._cooldown_until = 0.0
+        self._lock = threading.Lock()
+        self._metrics = {
+            "requests": 0,
+            "throttled": 0,
+            "queue_wait_seconds": 0.0,
+            "backoff_seconds": 0.0,
+        }
+
+    def _record(self, name, amount):
+        with self._lock:
+            self._metrics[name] += amount
+
+    @contextmanager
+    def limit(self, estimated_tokens=0):
+        """
+        Hold a request slot for the duration of a request.
+
+        Waits out any shared cooldown, then the request and token budgets,
+        then the concurrency limit.
+
+        Args:
+            estimated_tokens (int): Estimated prompt tokens charged against the token budget.
+        """
+        waited = 0.0
+        delay = self._cooldown_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+            waited += delay
+        if self.requests:
+            waited += self.requests.acquire(1)
+        if self.tokens and estimated_tokens:
+            waited += self.tokens.acquire(estimated_tokens)
+        waited += self.concurrency.acquire()
+        self._record("queue_wait_seconds", waited)
+        self._record("requests", 1)
+        try:
+            yield
+        finally:
+            self.concurrency.release()
+
+    @asynccontextmanager
+    async def alimit(self, estimated_tokens=0):
+        """
+        Async counterpart of limit that waits without blocking the event loop.
+
+        Args:
+            estimated_tokens (int): Estimated prompt tokens charged against the token budget.
+        """
+        waited = 0.0
+        delay = self._cooldown_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+            waited += delay
+        if self.requests:
+            waited += await self.requests.aacquire(1)
+        if self.tokens and estimated_tokens:
+            waited += await self.tokens.aacquire(estimated_tokens)
+        waited += await self.concurrency.aacquire()
+        self._record("queue_wait_seconds", waited)
+        self._record("requests", 1)
+        try:
+            yield
+        finally:
+            self.concurrency.release()
+
+    def record_success(self, output_tokens=0):
+        """
+        Record a successful request.
+
+        Args:
+            output_tokens (int): Estimated output tokens to charge against the token budget.
+        """
+        if self.tokens and output_tokens:
+            self.tokens.consume(output_tokens)
+        self.concurrency.on_success()
+
+    def backoff(self, attempt, retry_after=None):
+        """
+        Record a throttled request and wait before retrying.
+
+        Every caller sharing the limiter waits out the same cooldown, so a burst
+        of 429s does not turn into a burst of retries.
+
+        Args:
+            attempt (int): The zero-based attempt number that was throttled.
+            retry_after (float, optional): The server's suggested delay in seconds.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        delay = self._start_backoff(attempt, retry_after)
+        time.sleep(delay)
+        self._record("backoff_seconds", delay)
+        return delay
+
+    async def abackoff(self, attempt, retry_after=None):
+        """
+        Async counterpart of backoff that waits without blocking the event loop.
+
+        Args:
+            attempt (int): The zero-based attempt number that was throttled.
+            retry_after (float, optional): The server's suggested delay in seconds.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        delay = self._start_backoff(attempt, retry_after)
+        await asyncio.sleep(delay)
+        self._record("backoff_seconds", delay)
+        return delay
+
+    def _start_backoff(self, attempt, retry_after):
+        """
+        Record a throttled request and extend the shared cooldown.
+
+        Returns:
+            float: Seconds to wait before retrying.
+        """
+        self.concurrency.on_throttle()
+        self._record("throttled", 1)
+
+        # Full jitter keeps retries from concurrent callers from lining up
+        delay = random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        with self._lock:
+            self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+        return delay
+
+    def get_metrics(self):
+        """
+        Get a snapshot of the limiter's counters.
+
+        Returns:
+            dict: Request, throttle and wait-time counters and the current concurrency limit.
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+        metrics["concurrency_limit"] = self.concurrency.limit
+        return metrics
+
+
+_google_rate_limiter = None
+_google_rate_limiter_lock = threading.Lock()
+
+
+def get_google_rate_limiter():
+    """
+    Get the process-wide rate limiter for Google AI requests, configured from
+    GOOGLE_RPM, GOOGLE_TPM and GOOGLE_MAX_CONCURRENCY.
+
+    Returns:
+        RateLimiter: The shared limiter.
+    """
+    global _google_rate_limiter
+    with _google_rate_limiter_lock:
+        if _google_rate_limiter is None:
+            _google_rate_limiter = RateLimiter(
+                requests_per_minute=int(os.getenv("GOOGLE_RPM", 60)),
+                tokens_per_minute=int(os.getenv("GOOGLE_TPM", 0)),
+                max_concurrency=int(os.getenv("GOOGLE_MAX_CONCURRENCY", 8))
+            )
+        return _google_rate_limiter
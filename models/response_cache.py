@@ -0,0 +1,470 @@
+"""
+Persistent response cache for the model integrations.
+Stores generated responses in a local SQLite database so repeated prompts
+are served from disk instead of the model, and joins identical calls that
+are already in flight.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from models.single_flight import get_async_single_flight, get_default_timeout, get_single_flight
+from utils.helpers import is_error_response
+from utils.metrics import record_cache_lookup, record_coalesced_call, record_llm_call
+from utils.token_budget import estimate_tokens
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "responses.sqlite3"
+)
+DEFAULT_MAX_ENTRIES = 1000
+
+# How long each type of call stays fresh, in seconds. A TTL of 0 disables caching.
+CACHE_TTLS = {
+    "company_research": 7 * 24 * 60 * 60,
+    "role_analysis": 3 * 24 * 60 * 60,
+    "interview_questions": 60 * 60,
+    "feedback": 0,
+}
+DEFAULT_TTL = 24 * 60 * 60
+
+
+class ResponseCache:
+    """
+    Size-bounded SQLite cache of model responses with per-call-type TTLs.
+    Least recently used entries are evicted once the cache is full.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES, ttls=None):
+        """
+        Initialize the response cache.
+
+        Args:
+            path (str): Path of the SQLite database file.
+            max_entries (int): Maximum number of responses to keep.
+            ttls (dict, optional): TTL overrides in seconds, keyed by call type.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.ttls = dict(CACHE_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                call_type TEXT,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_accessed REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_accessed ON responses (last_accessed)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(provider, model_name, generation_config, prompt):
+        """
+        Build the cache key for a model call.
+
+        Args:
+            provider (str): The model provider.
+            model_name (str): The name of the model.
+            generation_config (dict): The generation settings sent with the prompt.
+            prompt (str): The prompt text.
+
+        Returns:
+            str: A hex digest identifying the call.
+        """
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        payload = json.dumps(
+            [provider, model_name, generation_config or {}, prompt_hash],
+            sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def ttl_for(self, call_type):
+        """
+        Get the TTL for a type of call.
+
+        Args:
+            call_type (str): The type of call, e.g. "company_research".
+
+        Returns:
+            int: The TTL in seconds.
+        """
+        return self.ttls.get(call_type, DEFAULT_TTL)
+
+    def get(self, key):
+        """
+        Look up a cached response.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            str: The cached response, or None if missing or expired.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE responses SET last_accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row[0]
+
+    def set(self, key, response, call_type=None):
+        """
+        Store a response, evicting expired and least recently used entries as needed.
+
+        Args:
+            key (str): The cache key.
+            response (str): The response to store.
+            call_type (str, optional): The type of call, used to pick the TTL.
+        """
+        ttl = self.ttl_for(call_type)
+        if ttl <= 0:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, call_type, response, now, now + ttl, now)
+            )
+            self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+            self._conn.execute(
+                """
+                DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses ORDER BY last_accessed DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def clear(self):
+        """
+        Remove every cached response.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def is_cache_enabled():
+    """
+    Check whether response caching is enabled for this process.
+
+    Returns:
+        bool: False if RESPONSE_CACHE_DISABLED is set to a truthy value.
+    """
+    return os.getenv("RESPONSE_CACHE_DISABLED", "").lower() not in ("1", "true", "yes")
+
+
+def get_response_cache():
+    """
+    Get the process-wide response cache configured from the environment.
+
+    Returns:
+        ResponseCache: The shared cache, or None if caching is disabled or unavailable.
+    """
+    global _default_cache
+    if not is_cache_enabled():
+        return None
+
+    with _default_cache_lock:
+        if _default_cache is None:
+            try:
+                _default_cache = ResponseCache(
+                    path=os.getenv("RESPONSE_CACHE_PATH", DEFAULT_CACHE_PATH),
+                    max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+                )
+            except (sqlite3.Error, OSError) as e:
+                print(f"Error opening response cache: {e}")
+                return None
+        return _default_cache
+
+
+def cached_generate(provider, model_name, generation_config, prompt, generate_fn,
+                    call_type=None, use_cache=True, timeout=None, coalesce=True):
+    """
+    Serve a model call from the response cache, generating and storing it on a miss.
+
+    Identical calls already in flight in this process are joined instead of
+    being sent to the provider again.
+
+    Args:
+        provider (str): The model provider.
+        model_name (str): The name of the model.
+        generation_config (dict): The generation settings sent with the prompt.
+        prompt (str): The prompt text.
+        generate_fn (callable): Called with the prompt to generate a response on a miss.
+        call_type (str, optional): The type of call, used to pick the TTL.
+        use_cache (bool): Set to False to bypass the cache for this call.
+        timeout (float, optional): Maximum seconds to wait for an identical call in flight.
+            Defaults to SINGLE_FLIGHT_TIMEOUT.
+        coalesce (bool): Set to False to always make the call instead of joining an identical one in flight.
+
+    Returns:
+        str: The cached or generated response.
+    """
+    key = ResponseCache.make_key(provider, model_name, generation_config, prompt)
+    cache = _get_cache_for(call_type, use_cache)
+    if cache is not None:
+        response = _read_cache(cache, key, call_type)
+        if response is not None:
+            return response
+
+    def generate():
+        response = generate_fn(prompt)
+        _record_call(provider, model_name, call_type, prompt, response)
+        if cache is not None:
+            _write_cache(cache, key, response, call_type)
+        return response
+
+    single_flight = get_single_flight() if coalesce else None
+    if single_flight is None:
+        return generate()
+
+    timeout = get_default_timeout() if timeout is None else timeout
+    try:
+        response, shared = single_flight.do(key, generate, timeout=timeout)
+    except TimeoutError as e:
+        return f"Error: {e}"
+    if shared:
+        record_coalesced_call(provider, call_type)
+    return response
+
+
+def cached_generate_stream(provider, model_name, generation_config, prompt, generate_stream_fn,
+                           call_type=None, use_cache=True, timeout=None, coalesce=True):
+    """
+    Streaming counterpart of cached_generate.
+
+    A cache hit is yielded as a single chunk. On a miss the chunks are passed
+    through as they arrive and the assembled response is stored once the
+    stream completes. Callers joining an identical stream in flight receive
+    its chunks as they arrive.
+
+    Args:
+        provider (str): The model provider.
+        model_name (str): The name of the model.
+        generation_config (dict): The generation settings sent with the prompt.
+        prompt (str): The prompt text.
+        generate_stream_fn (callable): Called with the prompt to stream a response on a miss.
+        call_type (str, optional): The type of call, used to pick the TTL.
+        use_cache (bool): Set to False to bypass the cache for this call.
+        timeout (float, optional): Maximum seconds to wait for an identical call in flight.
+            Defaults to SINGLE_FLIGHT_TIMEOUT.
+        coalesce (bool): Set to False to always make the call instead of joining an identical one in flight.
+
+    Yields:
+        str: Chunks of the response text.
+    """
+    key = ResponseCache.make_key(provider, model_name, generation_config, prompt)
+    cache = _get_cache_for(call_type, use_cache)
+    if cache is not None:
+        response = _read_cache(cache, key, call_type)
+        if response is not None:
+            yield response
+            return
+
+    def generate_stream():
+        chunks = []
+        for chunk in generate_stream_fn(prompt):
+            chunks.append(chunk)
+            yield chunk
+
+        response = "".join(chunks)
+        _record_call(provider, model_name, call_type, prompt, response)
+        if cache is not None:
+            _write_cache(cache, key, response, call_type)
+
+    single_flight = get_single_flight() if coalesce else None
+    if single_flight is None:
+        yield from generate_stream()
+        return
+
+    timeout = get_default_timeout() if timeout is None else timeout
+    started = shared = False
+    try:
+        for chunk, shared in single_flight.do_stream(key, generate_stream, timeout=timeout):
+            started = True
+            yield chunk
+    except TimeoutError as e:
+        # Like the integrations, report failures before the first chunk as an error string
+        if started:
+            raise
+        yield f"Error: {e}"
+        return
+    if shared:
+        record_coalesced_call(provider, call_type)
+
+
+async def acached_generate(provider, model_name, generation_config, prompt, agenerate_fn,
+                           call_type=None, use_cache=True, timeout=None, coalesce=True):
+    """
+    Async counterpart of cached_generate.
+
+    Identical calls in flight on the same event loop are joined. A caller
+    that is cancelled or times out leaves the call running for the others.
+
+    Args:
+        provider (str): The model provider.
+        model_name (str): The name of the model.
+        generation_config (dict): The generation settings sent with the prompt.
+        prompt (str): The prompt text.
+        agenerate_fn (callable): Called with the prompt to get a coroutine generating the response on a miss.
+        call_type (str, optional): The type of call, used to pick the TTL.
+        use_cache (bool): Set to False to bypass the cache for this call.
+        timeout (float, optional): Maximum seconds to wait for the response.
+            Defaults to SINGLE_FLIGHT_TIMEOUT.
+        coalesce (bool): Set to False to always make the call instead of joining an identical one in flight.
+
+    Returns:
+        str: The cached or generated response.
+    """
+    key = ResponseCache.make_key(provider, model_name, generation_config, prompt)
+    # SQLite calls block, so they run in a worker thread instead of on the event loop
+    cache = await asyncio.to_thread(_get_cache_for, call_type, use_cache)
+    if cache is not None:
+        response = await asyncio.to_thread(_read_cache, cache, key, call_type)
+        if response is not None:
+            return response
+
+    async def generate():
+        response = await agenerate_fn(prompt)
+        _record_call(provider, model_name, call_type, prompt, response)
+        if cache is not None:
+            await asyncio.to_thread(_write_cache, cache, key, response, call_type)
+        return response
+
+    timeout = get_default_timeout() if timeout is None else timeout
+    single_flight = get_async_single_flight() if coalesce else None
+    try:
+        if single_flight is None:
+            response, shared = await asyncio.wait_for(generate(), timeout), False
+        else:
+            response, shared = await single_flight.do(key, generate, timeout=timeout)
+    except (TimeoutError, asyncio.TimeoutError):
+        return f"Error: Timed out after {timeout}s waiting for the response"
+    if shared:
+        record_coalesced_call(provider, call_type)
+    return response
+
+
+async def acached_generate_stream(provider, model_name, generation_config, prompt, agenerate_stream_fn,
+                                  call_type=None, use_cache=True):
+    """
+    Async counterpart of cached_generate_stream. Streams are not coalesced.
+
+    Args:
+        provider (str): The model provider.
+        model_name (str): The name of the model.
+        generation_config (dict): The generation settings sent with the prompt.
+        prompt (str): The prompt text.
+        agenerate_stream_fn (callable): Called with the prompt to get an async iterator of chunks on a miss.
+        call_type (str, optional): The type of call, used to pick the TTL.
+        use_cache (bool): Set to False to bypass the cache for this call.
+
+    Yields:
+        str: Chunks of the response text.
+    """
+    key = ResponseCache.make_key(provider, model_name, generation_config, prompt)
+    cache = await asyncio.to_thread(_get_cache_for, call_type, use_cache)
+    if cache is not None:
+        response = await asyncio.to_thread(_read_cache, cache, key, call_type)
+        if response is not None:
+            yield response
+            return
+
+    chunks = []
+    async for chunk in agenerate_stream_fn(prompt):
+        chunks.append(chunk)
+        yield chunk
+
+    response = "".join(chunks)
+    _record_call(provider, model_name, call_type, prompt, response)
+    if cache is not None:
+        await asyncio.to_thread(_write_cache, cache, key, response, call_type)
+
+
+def _get_cache_for(call_type, use_cache):
+    """
+    Get the response cache if this type of call may be cached.
+
+    Returns:
+        ResponseCache: The cache, or None.
+    """
+    cache = get_response_cache() if use_cache else None
+    if cache is None or cache.ttl_for(call_type) <= 0:
+        return None
+    return cache
+
+
+def _read_cache(cache, key, call_type):
+    """
+    Look up a cached response, treating database errors as misses.
+
+    Returns:
+        str: The cached response, or None.
+    """
+    try:
+        response = cache.get(key)
+    except sqlite3.Error as e:
+        print(f"Error reading response cache: {e}")
+        response = None
+    record_cache_lookup("response", call_type, response is not None)
+    return response
+
+
+def _write_cache(cache, key, response, call_type):
+    """
+    Store a generated response unless it is an error.
+    """
+    if not is_error_response(response):
+        try:
+            cache.set(key, response, call_type=call_type)
+        except sqlite3.Error as e:
+            print(f"Error writing response cache: {e}")
+
+
+def _record_call(provider, model_name, call_type, prompt, response):
+    """
+    Record a model call with estimated prompt and output token counts.
+    """
+    record_llm_call(
+        provider, model_name, call_type,
+        estimate_tokens(prompt, provider, model_name),
+        estimate_tokens(response or "", provider, model_name)
+    )
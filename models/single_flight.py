@@ -0,0 +1,256 @@
+"""
+Single-flight coalescing of identical in-flight model calls.
+When several callers make the same call at the same time, only the first
+one reaches the provider; the others wait for it and share its result.
+"""
+import asyncio
+import os
+import threading
+import time
+
+
+class _Call:
+    """
+    An in-flight call and the outcome shared with its followers.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.chunks = []
+        self.finished = False
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one execution.
+    """
+
+    def __init__(self):
+        """
+        Initialize the coalescer.
+        """
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def _join(self, key):
+        """
+        Join the in-flight call for a key, or register a new one.
+
+        Returns:
+            tuple: (call, is_leader)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                return call, False
+            call = self._calls[key] = _Call()
+            return call, True
+
+    def _finish(self, key, call, error=None):
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        with call.condition:
+            call.error = error
+            call.finished = True
+            call.condition.notify_all()
+
+    def do(self, key, fn, timeout=None):
+        """
+        Run fn, or wait for the identical call already in flight.
+
+        Errors raised by the leading call are raised in every caller waiting on it.
+
+        Args:
+            key (str): Identifies identical calls.
+            fn (callable): Called without arguments to produce the result.
+            timeout (float, optional): Maximum seconds to wait for another caller's call.
+
+        Returns:
+            tuple: (result, shared) where shared is True if the result came from another caller's call.
+
+        Raises:
+            TimeoutError: If the call in flight did not finish within the timeout.
+        """
+        call, leader = self._join(key)
+        if leader:
+            try:
+                result = fn()
+            except BaseException as e:
+                self._finish(key, call, error=e)
+                raise
+            call.chunks.append(result)
+            self._finish(key, call)
+            return result, False
+
+        with call.condition:
+            if not call.condition.wait_for(lambda: call.finished, timeout):
+                raise TimeoutError(f"Timed out after {timeout}s waiting for an identical request in flight")
+        if call.error is not None:
+            raise call.error
+        return call.chunks[0], True
+
+    def do_stream(self, key, stream_fn, timeout=None):
+        """
+        Stream from stream_fn, or follow the identical stream already in flight.
+
+        Followers receive every chunk produced so far and then the remaining
+        chunks as they arrive. If the leading stream fails or its consumer stops
+        reading early, followers raise an error at the point it stopped.
+
+        Args:
+            key (str): Identifies identical calls.
+            stream_fn (callable): Called without arguments to produce an iterator of chunks.
+            timeout (float, optional): Maximum seconds to wait for another caller's stream to finish.
+
+        Yields:
+            tuple: (chunk, shared) where shared is True if the chunk came from another caller's stream.
+
+        Raises:
+            TimeoutError: If the stream in flight did not finish within the timeout.
+        """
+        call, leader = self._join(key)
+        if leader:
+            error = None
+            try:
+                for chunk in stream_fn():
+                    with call.condition:
+                        call.chunks.append(chunk)
+                        call.condition.notify_all()
+                    yield chunk, False
+            except GeneratorExit:
+                error = RuntimeError("The identical request in flight was abandoned before it finished")
+                raise
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                self._finish(key, call, error=error)
+            return
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        index = 0
+        while True:
+            with call.condition:
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                if not call.condition.wait_for(lambda: call.finished or len(call.chunks) > index, remaining):
+                    raise TimeoutError(f"Timed out after {timeout}s waiting for an identical request in flight")
+                chunks = call.chunks[index:]
+                finished, error = call.finished, call.error
+            for chunk in chunks:
+                yield chunk, True
+            index += len(chunks)
+            if finished and index >= len(call.chunks):
+                if error is not None:
+                    raise error
+                return
+
+    def in_flight(self):
+        """
+        Get the number of distinct calls currently in flight.
+
+        Returns:
+            int: The number of calls.
+        """
+        with self._lock:
+            return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """
+    Asyncio counterpart of SingleFlight. Calls are coalesced per event loop.
+    """
+
+    def __init__(self):
+        """
+        Initialize the coalescer.
+        """
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    async def do(self, key, coro_fn, timeout=None):
+        """
+        Await coro_fn(), or join the identical call already in flight on this event loop.
+
+        The call runs in its own task, so a caller that is cancelled or times
+        out does not cancel it for the others. It is cancelled once every
+        caller waiting on it has gone.
+
+        Args:
+            key (str): Identifies identical calls.
+            coro_fn (callable): Called without arguments to get the coroutine producing the result.
+            timeout (float, optional): Maximum seconds this caller waits for the result.
+
+        Returns:
+            tuple: (result, shared) where shared is True if the result came from another caller's call.
+
+        Raises:
+            TimeoutError: If the result did not arrive within the timeout.
+        """
+        loop = asyncio.get_running_loop()
+        call_key = (id(loop), key)
+        with self._lock:
+            entry = self._calls.get(call_key)
+            shared = entry is not None
+            if entry is None:
+                entry = {"task": loop.create_task(coro_fn()), "waiters": 0}
+                self._calls[call_key] = entry
+                entry["task"].add_done_callback(lambda _: self._forget(call_key, entry))
+            entry["waiters"] += 1
+
+        try:
+            result = await asyncio.wait_for(asyncio.shield(entry["task"]), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Timed out after {timeout}s waiting for the response") from None
+        finally:
+            with self._lock:
+                entry["waiters"] -= 1
+                abandoned = entry["waiters"] == 0
+            if abandoned and not entry["task"].done():
+                entry["task"].cancel()
+        return result, shared
+
+    def _forget(self, call_key, entry):
+        with self._lock:
+            if self._calls.get(call_key) is entry:
+                del self._calls[call_key]
+
+
+_default_single_flight = SingleFlight()
+_default_async_single_flight = AsyncSingleFlight()
+
+
+def get_single_flight():
+    """
+    Get the process-wide coalescer.
+
+    Returns:
+        SingleFlight: The shared coalescer, or None if SINGLE_FLIGHT_DISABLED is set.
+    """
+    if os.getenv("SINGLE_FLIGHT_DISABLED", "").lower() in ("1", "true", "yes"):
+        return None
+    return _default_single_flight
+
+
+def get_async_single_flight():
+    """
+    Get the process-wide asyncio coalescer.
+
+    Returns:
+        AsyncSingleFlight: The shared coalescer, or None if SINGLE_FLIGHT_DISABLED is set.
+    """
+    if os.getenv("SINGLE_FLIGHT_DISABLED", "").lower() in ("1", "true", "yes"):
+        return None
+    return _default_async_single_flight
+
+
+def get_default_timeout():
+    """
+    Get how long callers wait for an identical call in flight, from SINGLE_FLIGHT_TIMEOUT.
+
+    Returns:
+        float: The timeout in seconds, or None to wait until the call finishes.
+    """
+    timeout = os.getenv("SINGLE_FLIGHT_TIMEOUT")
+    return float(timeout) if timeout else None
@@ -0,0 +1,134 @@
+"""
+Pre-warm the company research index for the interview preparation framework.
+
+Generates company research in bulk for a list of companies and stores it in
+the on-disk company index, which ResearchAgent consults before calling the
+model. Companies whose research is still fresh are skipped, so the command
+can run on a schedule (e.g. nightly from cron) to keep the index current.
+
+Usage:
+    python prewarm_companies.py companies.txt --provider google --workers 4 --refresh-after-days 7
+"""
+import argparse
+import csv
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from agents.research_agent import ResearchAgent
+from utils.company_index import get_company_index
+from utils.helpers import get_model_integration, is_error_response
+
+
+def load_companies(path):
+    """
+    Load company names from a text file (one per line) or a CSV with a company_name or company column.
+
+    Args:
+        path (str): Path of the companies file.
+
+    Returns:
+        list: The company names, without duplicates.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            names = [row.get("company_name") or row.get("company") or "" for row in csv.DictReader(f)]
+        else:
+            names = f.read().splitlines()
+
+    seen = set()
+    companies = []
+    for name in names:
+        name = name.strip()
+        if name and not name.startswith("#") and name.lower() not in seen:
+            seen.add(name.lower())
+            companies.append(name)
+    return companies
+
+
+def prewarm(companies, model_integration, company_index, workers=4):
+    """
+    Generate and index research for companies with bounded concurrency.
+
+    Args:
+        companies (list): The company names.
+        model_integration: The model integration used to research the companies.
+        company_index (CompanyIndex): The index the research is stored in.
+        workers (int): Maximum number of companies researched at once.
+
+    Returns:
+        tuple: (succeeded, failed) company counts.
+    """
+    # Bypass the caches so refreshed entries really are regenerated
+    research_agent = ResearchAgent(model_integration, use_cache=False)
+
+    succeeded = failed = 0
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(research_agent.research_company, company_name): company_name
+            for company_name in companies
+        }
+        for future in as_completed(futures):
+            company_name = futures[future]
+            try:
+                research = future.result()
+                if is_error_response(research):
+                    raise RuntimeError(research or "Error: Empty response")
+                company_index.put(company_name, model_integration.provider, model_integration.model_name, research)
+                succeeded += 1
+                status = "indexed"
+            except Exception as e:
+                failed += 1
+                status = f"failed ({e})"
+
+            done = succeeded + failed
+            rate = done / max(time.time() - started, 1e-6) * 60
+            print(f"[{done}/{len(companies)}] {company_name}: {status} ({rate:.1f} companies/min)")
+
+    return succeeded, failed
+
+
+def main(argv=None):
+    """
+    Run the pre-warm command.
+
+    Args:
+        argv (list, optional): Command-line arguments. Defaults to sys.argv.
+
+    Returns:
+        int: The process exit code.
+    """
+    parser = argparse.ArgumentParser(description="Generate company research in bulk for the company index.")
+    parser.add_argument("companies", help="Text file with one company per line, or a CSV with a company_name column")
+    parser.add_argument("--provider", choices=["google", "ollama"], default="google", help="Model provider")
+    parser.add_argument("--model", help="Model name (defaults to the provider's default model)")
+    parser.add_argument("--workers", type=int, default=4, help="Maximum number of companies researched at once")
+    parser.add_argument("--refresh-after-days", type=float,
+                        help="Regenerate research older than this (defaults to COMPANY_INDEX_MAX_AGE_DAYS)")
+    parser.add_argument("--force", action="store_true", help="Regenerate research for every company")
+    args = parser.parse_args(argv)
+
+    company_index = get_company_index()
+    if company_index is None:
+        return 1
+
+    model_integration = get_model_integration(args.provider, args.model)
+    companies = load_companies(args.companies)
+    if args.force:
+        pending = companies
+    else:
+        pending = company_index.needs_refresh(
+            companies, model_integration.provider, model_integration.model_name, args.refresh_after_days
+        )
+    print(f"Loaded {len(companies)} companies, {len(companies) - len(pending)} fresh, {len(pending)} to research.")
+    if not pending:
+        return 0
+
+    succeeded, failed = prewarm(pending, model_integration, company_index, workers=max(1, args.workers))
+    print(f"Indexed {succeeded} companies, {failed} failed. The index holds {len(company_index)} entries.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
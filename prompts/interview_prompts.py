@@ -1,6 +1,30 @@
 """
 Prompt templates for the interview preparation framework.
 """
+from utils.token_budget import allocate_budget
+
+# Tokens of company and role context included in the interview questions prompt
+CONTEXT_TOKEN_BUDGET = 1000
+
+# Categories of the interview guide, in order: (name, number of questions, focus points)
+INTERVIEW_CATEGORIES = [
+    ("Technical Skills", 4, [
+        "Questions that assess technical knowledge relevant to the {role} position",
+        "Tailored to {experience_level} experience level",
+    ]),
+    ("Problem-Solving", 2, [
+        "Questions that evaluate ability to solve problems",
+        "Relevant to {company_name} and the {role} position",
+    ]),
+    ("Behavioral/Situational", 2, [
+        "Questions about how the candidate handled past situations",
+        "Focus on company culture and values",
+    ]),
+    ("Company/Role-Specific", 2, [
+        "Questions specific to {company_name} and the {role}",
+        "Assess fit for the role and company",
+    ]),
+]
 
 class InterviewPrompts:
     """
@@ -59,7 +83,8 @@ class InterviewPrompts:
         """
 
     @staticmethod
-    def interview_questions_prompt(role, company_name, experience_level, company_info="", role_info=""):
+    def interview_questions_prompt(role, company_name, experience_level, company_info="", role_info="",
+                                   provider=None, model_name=None, in_context=()):
         """
         Generate a prompt for creating interview questions.
 
@@ -69,24 +94,20 @@ class InterviewPrompts:
             experience_level (str): The experience level of the candidate.
             company_info (str): Information about the company.
             role_info (str): Information about the role.
+            provider (str, optional): The model provider, used to estimate token counts.
+            model_name (str, optional): The name of the model, used to estimate token counts.
+            in_context (tuple): "company_info" and/or "role_info" if the model already has them
+                from earlier in the conversation, in which case they are not repeated.
 
         Returns:
             str: The generated prompt.
         """
-        # Truncate company_info and role_info if they're too long to avoid timeout issues
-        if company_info and len(company_info) > 2000:
-            company_info = company_info[:2000] + "... (truncated)"
-        if role_info and len(role_info) > 2000:
-            role_info = role_info[:2000] + "... (truncated)"
+        background = InterviewPrompts._background(company_info, role_info, provider, model_name, in_context)
 
         return f"""
         You are an experienced technical interviewer at {company_name}. Your task is to create interview questions for a {role} position for a candidate with {experience_level} experience.
 
-        Company Information (brief):
-        {company_info}
-
-        Role Information (brief):
-        {role_info}
+        {background}
 
         Create 10 interview questions in these categories:
 
@@ -114,6 +135,80 @@ class InterviewPrompts:
         Format as a structured interview guide.
         """
 
+    @staticmethod
+    def interview_category_prompt(role, company_name, experience_level, company_info, role_info,
+                                  category, start_number=1, provider=None, model_name=None, in_context=()):
+        """
+        Generate a prompt for creating the interview questions of a single category.
+
+        Args:
+            role (str): The job role.
+            company_name (str): The name of the company.
+            experience_level (str): The experience level of the candidate.
+            company_info (str): Information about the company.
+            role_info (str): Information about the role.
+            category (tuple): An entry of INTERVIEW_CATEGORIES.
+            start_number (int): The number of the category's first question in the full guide.
+            provider (str, optional): The model provider, used to estimate token counts.
+            model_name (str, optional): The name of the model, used to estimate token counts.
+            in_context (tuple): "company_info" and/or "role_info" if the model already has them
+                from earlier in the conversation, in which case they are not repeated.
+
+        Returns:
+            str: The generated prompt.
+        """
+        background = InterviewPrompts._background(company_info, role_info, provider, model_name, in_context)
+
+        name, count, focus = category
+        focus_points = "\n".join(
+            "        - " + point.format(role=role, company_name=company_name, experience_level=experience_level)
+            for point in focus
+        )
+        last_number = start_number + count - 1
+
+        return f"""
+        You are an experienced technical interviewer at {company_name}. Your task is to create interview questions for a {role} position for a candidate with {experience_level} experience.
+
+        {background}
+
+        Create {count} {name} questions, numbered {start_number} to {last_number}:
+{focus_points}
+
+        For each question, provide:
+        1. The question itself
+        2. What the interviewer is looking for
+        3. A sample strong answer
+
+        Start with the heading "## {name}" and label each question "**Question N:**".
+        Only write this section of the interview guide.
+        """
+
+    @staticmethod
+    def _background(company_info, role_info, provider, model_name, in_context):
+        """
+        Build the company and role sections of the interview questions prompts.
+
+        Returns:
+            str: The sections, with the ones the model already has replaced by a reference to them.
+        """
+        sections = {
+            "company_info": ("Company Information", "company research", company_info),
+            "role_info": ("Role Information", "role analysis", role_info),
+        }
+        # Fit what is repeated into a shared token budget to avoid timeout issues
+        context = allocate_budget(
+            {field: text for field, (_, _, text) in sections.items() if field not in in_context},
+            CONTEXT_TOKEN_BUDGET, provider, model_name
+        )
+
+        lines = []
+        for field, (title, earlier, _) in sections.items():
+            if field in in_context:
+                lines.append(f"{title}: use your {earlier} from earlier in this conversation.")
+            else:
+                lines.append(f"{title} (brief):\n        {context[field]}")
+        return "\n\n        ".join(lines)
+
     @staticmethod
     def feedback_prompt(candidate_answer, question, ideal_answer):
         """
@@ -147,3 +242,46 @@ class InterviewPrompts:
 
         Format your response as constructive, actionable feedback that will help the candidate improve.
         """
+
+    @staticmethod
+    def batch_feedback_prompt(items):
+        """
+        Generate a prompt for grading several answers in one response.
+
+        Args:
+            items (list): (question, candidate_answer, ideal_answer) tuples, numbered from 1 in the prompt.
+
+        Returns:
+            str: The generated prompt.
+        """
+        answers = "\n\n".join(
+            f"""        --- Item {number} ---
+        Question:
+        {question}
+
+        Candidate's Answer:
+        {candidate_answer}
+
+        Ideal Answer Components:
+        {ideal_answer}"""
+            for number, (question, candidate_answer, ideal_answer) in enumerate(items, start=1)
+        )
+
+        return f"""
+        You are an expert interview coach. Your task is to provide constructive feedback on a candidate's answers to {len(items)} interview questions.
+
+{answers}
+
+        For each answer, cover:
+        1. Strengths of the answer
+        2. Areas for improvement
+        3. Specific suggestions to make the answer stronger
+
+        and rate from 1-10 how effective the answer is.
+
+        Grade every item, in order, using exactly this format for each:
+
+        ### Item N
+        Score: <a whole number from 1 to 10>
+        Feedback: <constructive, actionable feedback that will help the candidate improve>
+        """
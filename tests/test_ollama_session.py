@@ -0,0 +1,71 @@
+"""
+Tests for OllamaSession context continuation.
+"""
+import models.response_cache as response_cache
+from models.ollama_integration import OllamaSession
+from models.ollama_residency import OllamaResidencyManager
+from models.response_cache import ResponseCache, cached_generate
+
+
+class FakeClient:
+    """
+    Stands in for ollama.Client, returning a growing context with every response.
+    """
+
+    def __init__(self):
+        self.requests = []
+
+    def generate(self, **request):
+        self.requests.append(request)
+        context = list(request.get("context") or []) + [len(self.requests)]
+        return {"response": f"response {len(self.requests)}", "context": context, "done": True}
+
+
+class FakeIntegration:
+    provider = "ollama"
+    model_name = "llama3"
+    options = {"temperature": 0.7}
+    host = None
+
+    def __init__(self):
+        self.client = FakeClient()
+        self.residency = OllamaResidencyManager(self.client)
+
+
+def test_session_continues_after_cached_response(tmp_path, monkeypatch):
+    cache = ResponseCache(path=str(tmp_path / "responses.sqlite3"))
+    monkeypatch.setattr(response_cache, "get_response_cache", lambda: cache)
+    integration = FakeIntegration()
+
+    # An earlier, sessionless run cached the response to the research prompt
+    cached = cached_generate(
+        integration.provider, integration.model_name, integration.options, "Research the company.",
+        lambda prompt: "cached research", call_type="company_research"
+    )
+    assert cached == "cached research"
+
+    session = OllamaSession(integration)
+    research = session.generate_response("Research the company.", call_type="company_research")
+
+    # The session sent the prompt to the model instead of using the cached response
+    assert research == "response 1"
+    assert session.in_context(research)
+
+    session.generate_response("Generate questions from the research above.", call_type="interview_questions")
+    assert integration.client.requests[-1]["context"] == [1]
+
+
+def test_forked_sessions_continue_from_the_same_context(tmp_path, monkeypatch):
+    cache = ResponseCache(path=str(tmp_path / "responses.sqlite3"))
+    monkeypatch.setattr(response_cache, "get_response_cache", lambda: cache)
+    integration = FakeIntegration()
+
+    session = OllamaSession(integration)
+    research = session.generate_response("Research the company.", call_type="company_research")
+    first, second = session.fork(), session.fork()
+    first.generate_response("Technical questions.", call_type="interview_questions")
+    second.generate_response("Technical questions.", call_type="interview_questions")
+
+    # The second fork made its own call from the shared context instead of reusing the first fork's response
+    assert [request.get("context") for request in integration.client.requests] == [None, [1], [1]]
+    assert session.in_context(research)
@@ -0,0 +1,151 @@
+"""
+On-disk index of pre-generated company research.
+Filled in bulk by prewarm_companies.py and consulted by ResearchAgent before
+calling the model.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from utils.similarity_cache import normalize_company
+
+DEFAULT_INDEX_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "company_index.sqlite3"
+)
+# Research older than this is no longer served and is refreshed by the next pre-warm run
+DEFAULT_MAX_AGE_DAYS = 30
+
+
+class CompanyIndex:
+    """
+    SQLite index of company research keyed by normalized company name and model.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH, max_age_days=DEFAULT_MAX_AGE_DAYS):
+        """
+        Initialize the company index.
+
+        Args:
+            path (str): Path of the SQLite database file.
+            max_age_days (float): Age after which research is considered stale.
+        """
+        self.path = path
+        self.max_age = max_age_days * 24 * 60 * 60
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS companies (
+                company_key TEXT NOT NULL,
+                provider TEXT NOT NULL,
+                model_name TEXT NOT NULL,
+                company_name TEXT NOT NULL,
+                research TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (company_key, provider, model_name)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, company_name, provider, model_name):
+        """
+        Look up fresh research for a company.
+
+        Args:
+            company_name (str): The name of the company.
+            provider (str): The model provider.
+            model_name (str): The name of the model.
+
+        Returns:
+            str: The indexed research, or None if missing or stale.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT research, updated_at FROM companies "
+                "WHERE company_key = ? AND provider = ? AND model_name = ?",
+                (normalize_company(company_name), provider, model_name)
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.max_age:
+            return None
+        return row[0]
+
+    def put(self, company_name, provider, model_name, research):
+        """
+        Store research for a company, replacing any earlier version.
+
+        Args:
+            company_name (str): The name of the company.
+            provider (str): The model provider.
+            model_name (str): The name of the model.
+            research (str): The company research.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO companies VALUES (?, ?, ?, ?, ?, ?)",
+                (normalize_company(company_name), provider, model_name, company_name, research, time.time())
+            )
+            self._conn.commit()
+
+    def needs_refresh(self, company_names, provider, model_name, refresh_after_days=None):
+        """
+        Find the companies whose research is missing or due for a refresh.
+
+        Args:
+            company_names (list): The names of the companies.
+            provider (str): The model provider.
+            model_name (str): The name of the model.
+            refresh_after_days (float, optional): Age after which research is refreshed.
+                Defaults to the index's maximum age.
+
+        Returns:
+            list: The company names to (re)generate, in their original order.
+        """
+        refresh_after = self.max_age if refresh_after_days is None else refresh_after_days * 24 * 60 * 60
+        with self._lock:
+            updated = dict(self._conn.execute(
+                "SELECT company_key, updated_at FROM companies WHERE provider = ? AND model_name = ?",
+                (provider, model_name)
+            ).fetchall())
+
+        now = time.time()
+        return [
+            name for name in company_names
+            if now - updated.get(normalize_company(name), 0) > refresh_after
+        ]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM companies").fetchone()[0]
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+
+def get_company_index():
+    """
+    Get the process-wide company index configured from COMPANY_INDEX_PATH and
+    COMPANY_INDEX_MAX_AGE_DAYS.
+
+    Returns:
+        CompanyIndex: The shared index, or None if it cannot be opened.
+    """
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            try:
+                _default_index = CompanyIndex(
+                    path=os.getenv("COMPANY_INDEX_PATH", DEFAULT_INDEX_PATH),
+                    max_age_days=float(os.getenv("COMPANY_INDEX_MAX_AGE_DAYS", DEFAULT_MAX_AGE_DAYS))
+                )
+            except (sqlite3.Error, OSError) as e:
+                print(f"Error opening company index: {e}")
+                return None
+        return _default_index
@@ -0,0 +1,89 @@
+"""
+Parser for graded feedback.
+Extracts a 1-10 score and the feedback text for each answer from the
+model's response to a batch grading prompt.
+"""
+import re
+from dataclasses import asdict, dataclass
+
+MIN_SCORE = 1
+MAX_SCORE = 10
+
+_ITEM_HEADING = re.compile(r"^[\s#*_]*item\s*(\d+)[\s*_:]*$", re.IGNORECASE | re.MULTILINE)
+_SCORE = re.compile(r"^[\s*_\-]*(?:score|rating)[\s*_]*[:\-][\s*_]*(\d+(?:\.\d+)?)\s*(?:/\s*10|out of 10)?",
+                    re.IGNORECASE | re.MULTILINE)
+_FEEDBACK_LABEL = re.compile(r"^[\s*_\-]*feedback[\s*_]*[:\-][\s*_]*", re.IGNORECASE | re.MULTILINE)
+
+
+@dataclass
+class AnswerFeedback:
+    """
+    The grading of one answer.
+    """
+    __slots__ = ("number", "score", "feedback")
+
+    number: int
+    score: int
+    feedback: str
+
+    def to_dict(self):
+        """
+        Convert the feedback to a plain dictionary, e.g. for JSON export.
+
+        Returns:
+            dict: The feedback's fields.
+        """
+        return asdict(self)
+
+
+def parse_feedback(text, number=1):
+    """
+    Parse the grading of a single answer.
+
+    Args:
+        text (str): The model's grading, with "Score:" and "Feedback:" lines.
+        number (int): The number of the answer.
+
+    Returns:
+        AnswerFeedback: The parsed feedback, or None if it has no valid score.
+    """
+    match = _SCORE.search(text)
+    if match is None:
+        return None
+    score = round(float(match.group(1)))
+    if not MIN_SCORE <= score <= MAX_SCORE:
+        return None
+
+    label = _FEEDBACK_LABEL.search(text)
+    if label is not None:
+        feedback = text[label.end():]
+    else:
+        feedback = text[:match.start()] + text[match.end():]
+    feedback = feedback.strip()
+    if not feedback:
+        return None
+    return AnswerFeedback(number, score, feedback)
+
+
+def parse_batch_feedback(text):
+    """
+    Parse the grading of several answers, one "Item N" section each.
+
+    Sections that are missing or cannot be parsed are left out, so only
+    those answers need to be graded again.
+
+    Args:
+        text (str): The model's response to a batch grading prompt.
+
+    Returns:
+        dict: AnswerFeedback by item number.
+    """
+    headings = list(_ITEM_HEADING.finditer(text))
+    results = {}
+    for index, heading in enumerate(headings):
+        end = headings[index + 1].start() if index + 1 < len(headings) else len(text)
+        number = int(heading.group(1))
+        feedback = parse_feedback(text[heading.end():end], number)
+        if feedback is not None and number not in results:
+            results[number] = feedback
+    return results
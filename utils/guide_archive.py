@@ -0,0 +1,319 @@
+"""
+Searchable archive of generated interview guides.
+Every guide is stored compressed in a local SQLite database together with the
+company research and role analysis it was written from, and indexed with
+FTS5 so past guides can be found by company, role or keyword. A request that
+was answered before is served from the archive without calling the model.
+Guides are recorded against the sessions that generated or were served them,
+so searches can be limited to a user's own guides.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from utils.similarity_cache import normalize_company
+
+DEFAULT_ARCHIVE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "guide_archive.sqlite3"
+)
+# Guides older than this are still searchable but no longer served in place of a new generation
+DEFAULT_MAX_AGE_DAYS = 30
+DEFAULT_SEARCH_LIMIT = 20
+
+_SUMMARY_COLUMNS = "guide_id, role, company_name, experience_level, provider, model_name, created_at"
+
+
+def _compress(text):
+    return zlib.compress((text or "").encode("utf-8"))
+
+
+def _decompress(blob):
+    return zlib.decompress(blob).decode("utf-8")
+
+
+def _normalize_role(role):
+    return " ".join(role.lower().split())
+
+
+def _match_query(keywords):
+    """
+    Turn free text into an FTS5 query matching every word as a prefix.
+
+    Args:
+        keywords (str): The words to search for.
+
+    Returns:
+        str: The FTS5 query, or "" if there are no words.
+    """
+    # Quoting each word keeps FTS5 operators and punctuation in the input from being parsed
+    return " ".join('"' + word.replace('"', '""') + '"*' for word in keywords.split())
+
+
+class GuideArchive:
+    """
+    SQLite archive of compressed interview guides with a full-text index.
+    """
+
+    def __init__(self, path=DEFAULT_ARCHIVE_PATH, max_age_days=DEFAULT_MAX_AGE_DAYS):
+        """
+        Initialize the guide archive.
+
+        Args:
+            path (str): Path of the SQLite database file.
+            max_age_days (float): Age after which a guide is no longer served for a new request.
+        """
+        self.path = path
+        self.max_age = max_age_days * 24 * 60 * 60
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS guides (
+                guide_id INTEGER PRIMARY KEY,
+                role_key TEXT NOT NULL,
+                company_key TEXT NOT NULL,
+                role TEXT NOT NULL,
+                company_name TEXT NOT NULL,
+                experience_level TEXT NOT NULL,
+                provider TEXT NOT NULL,
+                model_name TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                interview_questions BLOB NOT NULL,
+                company_info BLOB NOT NULL,
+                role_info BLOB NOT NULL,
+                questions BLOB NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS guides_request "
+            "ON guides (company_key, role_key, experience_level, provider, model_name, created_at)"
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS guide_owners (
+                owner TEXT NOT NULL,
+                guide_id INTEGER NOT NULL,
+                PRIMARY KEY (owner, guide_id)
+            )
+            """
+        )
+        # The text is only kept compressed in the guides table, so the index stores no copy of it
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS guides_fts USING fts5(role, company_name, body, content='')"
+        )
+        self._conn.commit()
+
+    def put(self, role, company_name, experience_level, provider, model_name, interview_questions,
+            company_info="", role_info="", questions=None, owner=None):
+        """
+        Archive a generated guide.
+
+        Args:
+            role (str): The job role.
+            company_name (str): The name of the company.
+            experience_level (str): The experience level of the candidate.
+            provider (str): The model provider.
+            model_name (str): The name of the model.
+            interview_questions (str): The text of the guide.
+            company_info (str): The company research the guide was written from.
+            role_info (str): The role analysis the guide was written from.
+            questions (list, optional): The guide's parsed questions, as dictionaries.
+            owner (str, optional): The session or user the guide was generated for.
+
+        Returns:
+            int: The ID of the archived guide.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO guides (role_key, company_key, role, company_name, experience_level, provider, "
+                "model_name, created_at, interview_questions, company_info, role_info, questions) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (_normalize_role(role), normalize_company(company_name), role, company_name, experience_level,
+                 provider, model_name, time.time(), _compress(interview_questions), _compress(company_info),
+                 _compress(role_info), _compress(json.dumps(questions or [])))
+            )
+            guide_id = cursor.lastrowid
+            self._conn.execute(
+                "INSERT INTO guides_fts (rowid, role, company_name, body) VALUES (?, ?, ?, ?)",
+                (guide_id, role, company_name,
+                 "\n\n".join([experience_level, interview_questions, company_info, role_info]))
+            )
+            if owner:
+                self._conn.execute("INSERT OR IGNORE INTO guide_owners VALUES (?, ?)", (owner, guide_id))
+            self._conn.commit()
+        return guide_id
+
+    def add_owner(self, guide_id, owner):
+        """
+        Record that a guide was served to a session or user, so it appears in their searches.
+
+        Args:
+            guide_id (int): The ID of the guide.
+            owner (str): The session or user.
+        """
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO guide_owners VALUES (?, ?)", (owner, guide_id))
+            self._conn.commit()
+
+    def find(self, role, company_name, experience_level, provider, model_name):
+        """
+        Look up the latest fresh guide generated for a request.
+
+        Args:
+            role (str): The job role.
+            company_name (str): The name of the company.
+            experience_level (str): The experience level of the candidate.
+            provider (str): The model provider.
+            model_name (str): The name of the model.
+
+        Returns:
+            dict: The guide, as returned by get(), or None if there is none or it is stale.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT guide_id FROM guides "
+                "WHERE company_key = ? AND role_key = ? AND experience_level = ? AND provider = ? "
+                "AND model_name = ? AND created_at >= ? ORDER BY created_at DESC LIMIT 1",
+                (normalize_company(company_name), _normalize_role(role), experience_level, provider, model_name,
+                 time.time() - self.max_age)
+            ).fetchone()
+        return self.get(row[0]) if row else None
+
+    def get(self, guide_id):
+        """
+        Retrieve an archived guide.
+
+        Args:
+            guide_id (int): The ID of the guide.
+
+        Returns:
+            dict: The guide's request, model and creation time, its text ("interview_questions"),
+                "company_info", "role_info" and parsed "questions", or None if it is unknown.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_SUMMARY_COLUMNS}, interview_questions, company_info, role_info, questions "
+                "FROM guides WHERE guide_id = ?",
+                (guide_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        guide = self._summary(row[:7])
+        guide.update(
+            interview_questions=_decompress(row[7]),
+            company_info=_decompress(row[8]),
+            role_info=_decompress(row[9]),
+            questions=json.loads(_decompress(row[10])),
+        )
+        return guide
+
+    def search(self, keywords="", company_name=None, role=None, owner=None, limit=DEFAULT_SEARCH_LIMIT):
+        """
+        Search archived guides, best matches first, or newest first without keywords.
+
+        Args:
+            keywords (str): Words that must all appear, as prefixes, in the guide, its research or its request.
+            company_name (str, optional): Only guides for companies whose name contains this text.
+            role (str, optional): Only guides for roles that contain this text.
+            owner (str, optional): Only guides generated for or served to this session or user.
+            limit (int): Maximum number of guides returned.
+
+        Returns:
+            list: Summaries of the matching guides, without their text.
+        """
+        conditions = []
+        params = []
+        if company_name:
+            conditions.append("g.company_name LIKE ?")
+            params.append(f"%{company_name.strip()}%")
+        if role:
+            conditions.append("g.role LIKE ?")
+            params.append(f"%{role.strip()}%")
+        if owner:
+            conditions.append("g.guide_id IN (SELECT guide_id FROM guide_owners WHERE owner = ?)")
+            params.append(owner)
+
+        query = _match_query(keywords)
+        columns = ", ".join(f"g.{column.strip()}" for column in _SUMMARY_COLUMNS.split(","))
+        if query:
+            sql = (f"SELECT {columns} FROM guides_fts JOIN guides g ON g.guide_id = guides_fts.rowid "
+                   f"WHERE guides_fts MATCH ?{''.join(' AND ' + c for c in conditions)} "
+                   "ORDER BY guides_fts.rank, g.created_at DESC LIMIT ?")
+            params = [query] + params
+        else:
+            where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+            sql = f"SELECT {columns} FROM guides g {where}ORDER BY g.created_at DESC LIMIT ?"
+
+        with self._lock:
+            rows = self._conn.execute(sql, params + [limit]).fetchall()
+        return [self._summary(row) for row in rows]
+
+    @staticmethod
+    def _summary(row):
+        guide_id, role, company_name, experience_level, provider, model_name, created_at = row
+        return {
+            "guide_id": guide_id,
+            "role": role,
+            "company_name": company_name,
+            "experience_level": experience_level,
+            "provider": provider,
+            "model_name": model_name,
+            "created_at": created_at,
+        }
+
+    def count(self, owner=None):
+        """
+        Count archived guides.
+
+        Args:
+            owner (str, optional): Only count the guides of this session or user.
+
+        Returns:
+            int: The number of guides.
+        """
+        if owner is None:
+            return len(self)
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM guide_owners WHERE owner = ?", (owner,)).fetchone()[0]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM guides").fetchone()[0]
+
+
+_default_archive = None
+_default_archive_lock = threading.Lock()
+
+
+def get_guide_archive():
+    """
+    Get the process-wide guide archive configured from GUIDE_ARCHIVE_PATH and
+    GUIDE_ARCHIVE_MAX_AGE_DAYS.
+
+    Returns:
+        GuideArchive: The shared archive, or None if GUIDE_ARCHIVE_DISABLED is set or it cannot be opened.
+    """
+    global _default_archive
+    if os.getenv("GUIDE_ARCHIVE_DISABLED", "").lower() in ("1", "true", "yes"):
+        return None
+    with _default_archive_lock:
+        if _default_archive is None:
+            try:
+                _default_archive = GuideArchive(
+                    path=os.getenv("GUIDE_ARCHIVE_PATH", DEFAULT_ARCHIVE_PATH),
+                    max_age_days=float(os.getenv("GUIDE_ARCHIVE_MAX_AGE_DAYS", DEFAULT_MAX_AGE_DAYS))
+                )
+            except (sqlite3.Error, OSError) as e:
+                # Also raised when SQLite was built without FTS5
+                print(f"Error opening guide archive: {e}")
+                return None
+        return _default_archive
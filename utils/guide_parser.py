@@ -0,0 +1,210 @@
+"""
+Incremental parser for generated interview guides.
+Turns the model's markdown into one record per question while the text is
+still streaming in.
+"""
+import re
+from dataclasses import asdict, dataclass
+
+# Canonical category names, matched by keywords in section headings
+CATEGORIES = [
+    ("Technical Skills", re.compile(r"\btechnical\b", re.IGNORECASE)),
+    ("Problem-Solving", re.compile(r"\bproblem[\s-]*solving\b", re.IGNORECASE)),
+    ("Behavioral/Situational", re.compile(r"\bbehaviou?ral\b|\bsituational\b", re.IGNORECASE)),
+    ("Company/Role-Specific", re.compile(r"\bcompany\b|\brole[\s-]*specific\b", re.IGNORECASE)),
+]
+
+# Markdown decoration stripped before a line is classified
+_DECORATION = re.compile(r"^[\s#>*_\-+]*|[\s*_]*$")
+_EMPHASIS = re.compile(r"\*\*|__")
+_HEADING = re.compile(r"^\s*(#{1,6}\s|\*\*[^*]+\*\*\s*:?\s*$|\d+[.)]\s+\*\*[^*]+\*\*\s*$)")
+_QUESTION_LABEL = re.compile(
+    r"^(?:\d+[.)]\s*)?(?:question|q)\s*(\d*)\s*[:.)\-]\s*(.*)$", re.IGNORECASE
+)
+_NUMBERED_QUESTION = re.compile(r"^(\d+)[.)]\s+(.+\?)$")
+_LOOKING_FOR_LABEL = re.compile(
+    r"^(?:\d+[.)]\s*)?(?:what\s+(?:the\s+)?interviewers?\s+(?:is|are)\s+looking\s+for|looking\s+for|"
+    r"what\s+they(?:'re|\s+are)\s+looking\s+for|evaluation\s+criteria)\s*[:\-]\s*(.*)$",
+    re.IGNORECASE
+)
+_SAMPLE_ANSWER_LABEL = re.compile(
+    r"^(?:\d+[.)]\s*)?(?:(?:a\s+)?(?:sample|example|model|ideal)\s+)?(?:strong\s+)?answer\s*[:\-]\s*(.*)$",
+    re.IGNORECASE
+)
+
+
+@dataclass
+class InterviewQuestion:
+    """
+    One question from a generated interview guide.
+    """
+    __slots__ = ("number", "category", "question", "looking_for", "sample_answer")
+
+    number: int
+    category: str
+    question: str
+    looking_for: str
+    sample_answer: str
+
+    def to_dict(self):
+        """
+        Convert the question to a plain dictionary, e.g. for JSON export.
+
+        Returns:
+            dict: The question's fields.
+        """
+        return asdict(self)
+
+
+class GuideParser:
+    """
+    Line-based incremental parser for interview guides.
+
+    Feed it chunks of text as they arrive; each call returns the questions
+    that were completed by that chunk. A question is complete once the next
+    question or category starts, or when the parser is closed.
+    """
+
+    def __init__(self):
+        """
+        Initialize the parser.
+        """
+        self.questions = []
+        self._buffer = ""
+        self._category = ""
+        self._current = None
+        self._field = None
+
+    def feed(self, chunk):
+        """
+        Parse a chunk of the guide.
+
+        Args:
+            chunk (str): The next piece of generated text.
+
+        Returns:
+            list: The InterviewQuestion records completed by this chunk.
+        """
+        self._buffer += chunk
+        if "\n" not in chunk:
+            return []
+
+        lines = self._buffer.split("\n")
+        self._buffer = lines.pop()
+        completed = []
+        for line in lines:
+            self._parse_line(line, completed)
+        return completed
+
+    def close(self):
+        """
+        Parse any remaining text and finish the last question.
+
+        Returns:
+            list: The InterviewQuestion records completed by closing the parser.
+        """
+        completed = []
+        if self._buffer:
+            self._parse_line(self._buffer, completed)
+            self._buffer = ""
+        self._finish_question(completed)
+        return completed
+
+    def parse_stream(self, chunks):
+        """
+        Pass chunks of text through while parsing them.
+
+        Args:
+            chunks (iterable): Chunks of generated text.
+
+        Yields:
+            str: The chunks, unchanged.
+        """
+        for chunk in chunks:
+            self.feed(chunk)
+            yield chunk
+        self.close()
+
+    def _parse_line(self, line, completed):
+        text = _EMPHASIS.sub("", _DECORATION.sub("", line)).strip()
+        if not text:
+            return
+
+        match = _QUESTION_LABEL.match(text)
+        if match:
+            self._start_question(completed, match.group(1), match.group(2))
+            return
+
+        match = _LOOKING_FOR_LABEL.match(text)
+        if match and self._current is not None:
+            self._set_field("looking_for", match.group(1))
+            return
+
+        match = _SAMPLE_ANSWER_LABEL.match(text)
+        if match and self._current is not None:
+            self._set_field("sample_answer", match.group(1))
+            return
+
+        if _HEADING.match(line) and "?" not in text:
+            category = self._match_category(text)
+            if category:
+                self._finish_question(completed)
+                self._category = category
+                return
+
+        match = _NUMBERED_QUESTION.match(text)
+        if match and self._field != "question":
+            self._start_question(completed, match.group(1), match.group(2))
+            return
+
+        if self._current is not None and self._field:
+            value = self._current[self._field]
+            self._current[self._field] = f"{value}\n{text}" if value else text
+
+    def _match_category(self, text):
+        for name, pattern in CATEGORIES:
+            if pattern.search(text):
+                return name
+        return None
+
+    def _start_question(self, completed, number, text):
+        self._finish_question(completed)
+        self._current = {
+            "number": int(number) if number else len(self.questions) + 1,
+            "category": self._category,
+            "question": text.strip().lstrip("*_").strip(),
+            "looking_for": "",
+            "sample_answer": "",
+        }
+        self._field = "question"
+
+    def _set_field(self, field, text):
+        self._field = field
+        # Drop the closing half of single-asterisk emphasis around the label
+        self._current[field] = text.strip().lstrip("*_").strip()
+
+    def _finish_question(self, completed):
+        if self._current is None:
+            return
+        if self._current["question"]:
+            question = InterviewQuestion(**self._current)
+            self.questions.append(question)
+            completed.append(question)
+        self._current = None
+        self._field = None
+
+
+def parse_interview_questions(questions_text):
+    """
+    Parse a complete interview guide into question records.
+
+    Args:
+        questions_text (str): The raw text of questions and answers.
+
+    Returns:
+        list: The InterviewQuestion records, in order.
+    """
+    parser = GuideParser()
+    parser.feed(questions_text)
+    parser.close()
+    return parser.questions
@@ -1,35 +1,153 @@
 """
 Helper functions for the interview preparation framework.
 """
+import contextvars
+import importlib
+import json
 import os
-from dotenv import load_dotenv
-from models.ollama_integration import OllamaIntegration
-from models.google_ai_integration import GoogleAIIntegration
+import threading
+from models.client_registry import fingerprint
+
+# Integration class and config argument of each provider. Provider modules are
+# imported on first use, so a process only loads the SDK of the provider it uses.
+PROVIDERS = {
+    "ollama": ("models.ollama_integration", "OllamaIntegration", "options"),
+    "google": ("models.google_ai_integration", "GoogleAIIntegration", "generation_config"),
+}
+
+_environment_loaded = False
+_environment_lock = threading.Lock()
+
+# Integrations shared across reruns and sessions, keyed by provider, model and config
+_integrations = {}
+_integrations_lock = threading.Lock()
+
+def load_environment():
+    """
+    Load environment variables from the .env file, once per process.
+    """
+    global _environment_loaded
+    with _environment_lock:
+        if not _environment_loaded:
+            from dotenv import load_dotenv
+            load_dotenv()
+            _environment_loaded = True
 
 # Load environment variables from .env file
-load_dotenv()
+load_environment()
+
+def register_provider(name, module_path, class_name, config_arg):
+    """
+    Register a model provider for get_model_integration.
+
+    Args:
+        name (str): The provider name, e.g. "ollama".
+        module_path (str): The module defining the integration class.
+        class_name (str): The name of the integration class.
+        config_arg (str): The constructor argument that receives the config.
+    """
+    PROVIDERS[name.lower()] = (module_path, class_name, config_arg)
 
-def get_model_integration(model_provider, model_name=None):
+def get_integration_class(model_provider):
+    """
+    Import and return the integration class of a provider.
+
+    Args:
+        model_provider (str): The model provider, e.g. "ollama" or "google".
+
+    Returns:
+        type: The integration class.
+    """
+    try:
+        module_path, class_name, _ = PROVIDERS[model_provider.lower()]
+    except KeyError:
+        raise ValueError(f"Unsupported model provider: {model_provider}") from None
+    return getattr(importlib.import_module(module_path), class_name)
+
+def get_model_integration(model_provider, model_name=None, config=None):
     """
     Get the appropriate model integration based on the provider.
+
+    Integrations are created once per provider, model, config and API key and
+    then reused, so the underlying clients and connections are shared across
+    Streamlit reruns and sessions.
     
     Args:
         model_provider (str): The model provider ("ollama" or "google").
         model_name (str, optional): The name of the model to use.
+        config (dict, optional): Generation settings for Google AI or model options for Ollama.
         
     Returns:
         object: The model integration instance.
     """
-    if model_provider.lower() == "ollama":
-        if model_name:
-            return OllamaIntegration(model_name=model_name)
-        return OllamaIntegration()
-    elif model_provider.lower() == "google":
-        if model_name:
-            return GoogleAIIntegration(model_name=model_name)
-        return GoogleAIIntegration()
-    else:
-        raise ValueError(f"Unsupported model provider: {model_provider}")
+    provider = model_provider.lower()
+    integration_class = get_integration_class(provider)
+
+    api_key = fingerprint(os.getenv("GOOGLE_API_KEY")) if provider == "google" else ""
+    key = (provider, model_name, json.dumps(config or {}, sort_keys=True), api_key)
+
+    with _integrations_lock:
+        integration = _integrations.get(key)
+        if integration is None:
+            kwargs = {"model_name": model_name} if model_name else {}
+            kwargs[PROVIDERS[provider][2]] = config
+            integration = integration_class(**kwargs)
+            _integrations[key] = integration
+        return integration
+
+def get_hedged_integration(model_provider, model_name=None, backup_provider=None, backup_model=None):
+    """
+    Get a model integration that hedges slow calls to a backup model.
+
+    Args:
+        model_provider (str): The primary model provider ("ollama" or "google").
+        model_name (str, optional): The name of the primary model.
+        backup_provider (str, optional): The backup model provider. Defaults to HEDGE_PROVIDER.
+        backup_model (str, optional): The name of the backup model. Defaults to HEDGE_MODEL.
+
+    Returns:
+        object: The hedged integration, or the primary integration if no backup is configured.
+    """
+    primary = get_model_integration(model_provider, model_name)
+    backup_provider = backup_provider or os.getenv("HEDGE_PROVIDER")
+    if not backup_provider:
+        return primary
+
+    from models.hedging import HedgedIntegration
+
+    secondary = get_model_integration(backup_provider, backup_model or os.getenv("HEDGE_MODEL") or None)
+    return HedgedIntegration(primary, secondary)
+
+def is_error_response(response):
+    """
+    Check whether a model response is a failure. Integrations report failures
+    as "Error: ..." strings rather than raising, and an empty response is
+    treated as a failure too.
+
+    Args:
+        response (str): The response text.
+
+    Returns:
+        bool: True if the response must not be used, cached or stored as a result.
+    """
+    return not response or response.startswith("Error:")
+
+def submit_with_context(executor, fn, *args, **kwargs):
+    """
+    Submit work to an executor in a copy of the caller's context, so the
+    calls it makes are measured as part of the caller's pipeline run and
+    seen by its hedging watches.
+
+    Args:
+        executor (Executor): The executor to run the work on.
+        fn (callable): The function to call.
+        *args: Positional arguments for fn.
+        **kwargs: Keyword arguments for fn.
+
+    Returns:
+        Future: The future of the call.
+    """
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
 
 def format_interview_questions(questions_text):
     """
@@ -0,0 +1,313 @@
+"""
+Background job queue for the interview preparation framework.
+
+Generation runs on a worker pool outside the Streamlit script thread, so a
+rerun caused by any widget interaction no longer throws the work away. Each
+job has an ID, belongs to a session and records its progress and partial
+results, which the app polls for and renders.
+"""
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_QUEUED = 100
+DEFAULT_MAX_JOBS_PER_SESSION = 1
+# Finished jobs are kept this long so their sessions can still show the results
+DEFAULT_RETENTION_SECONDS = 60 * 60
+
+
+class JobCancelled(Exception):
+    """
+    Raised inside a job that was cancelled, at the next point it checks.
+    """
+
+
+class Job:
+    """
+    A job on the queue, with its progress and partial results.
+    """
+
+    def __init__(self, session_id, kind, params):
+        """
+        Initialize the job.
+
+        Args:
+            session_id (str): The session that submitted the job.
+            kind (str): The type of job, e.g. "interview_guide".
+            params (dict): The arguments the job function is called with.
+        """
+        self.job_id = uuid.uuid4().hex[:12]
+        self.session_id = session_id
+        self.kind = kind
+        self.params = params
+        self.status = QUEUED
+        self.progress = 0
+        self.message = "Waiting for a free worker..."
+        self.partial = {}
+        self.warnings = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    def update(self, progress=None, message=None, **partial):
+        """
+        Record progress and partial results.
+
+        Args:
+            progress (int, optional): Percentage complete.
+            message (str, optional): What the job is doing.
+            **partial: Partial results to store, replacing earlier values.
+        """
+        with self._lock:
+            if progress is not None:
+                self.progress = progress
+            if message is not None:
+                self.message = message
+            self.partial.update(partial)
+
+    def append(self, key, text):
+        """
+        Append streamed text to a partial result.
+
+        Args:
+            key (str): The name of the partial result.
+            text (str): The text to append.
+        """
+        with self._lock:
+            self.partial[key] = self.partial.get(key, "") + text
+
+    def warn(self, message):
+        """
+        Record a warning to show alongside the job's progress.
+
+        Args:
+            message (str): The warning.
+        """
+        with self._lock:
+            self.warnings.append(message)
+
+    def cancel(self):
+        """
+        Ask the job to stop at its next check.
+        """
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def check_cancelled(self):
+        """
+        Stop the job if it was cancelled.
+
+        Raises:
+            JobCancelled: If cancel() was called.
+        """
+        if self._cancelled.is_set():
+            raise JobCancelled(f"Job {self.job_id} was cancelled")
+
+    def snapshot(self):
+        """
+        Get a consistent copy of the job's state.
+
+        Returns:
+            dict: The job's ID, status, progress, message, partial results, warnings, result and error.
+        """
+        with self._lock:
+            return {
+                "job_id": self.job_id,
+                "session_id": self.session_id,
+                "kind": self.kind,
+                "status": self.status,
+                "progress": self.progress,
+                "message": self.message,
+                "partial": dict(self.partial),
+                "warnings": list(self.warnings),
+                "result": self.result,
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+
+class JobQueue:
+    """
+    Runs jobs on a bounded worker pool and keeps them per session.
+    """
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, max_queued=DEFAULT_MAX_QUEUED,
+                 max_jobs_per_session=DEFAULT_MAX_JOBS_PER_SESSION, retention_seconds=DEFAULT_RETENTION_SECONDS):
+        """
+        Initialize the queue.
+
+        Args:
+            max_workers (int): Maximum number of jobs running at once on this server.
+            max_queued (int): Maximum number of jobs waiting for a worker before new ones are refused.
+            max_jobs_per_session (int): Maximum number of queued or running jobs per session.
+            retention_seconds (float): How long finished jobs are kept.
+        """
+        self.max_workers = max(1, max_workers)
+        self.max_queued = max_queued
+        self.max_jobs_per_session = max(1, max_jobs_per_session)
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+    def submit(self, session_id, fn, kind="job", **params):
+        """
+        Queue a job.
+
+        Args:
+            session_id (str): The session submitting the job.
+            fn (callable): Called as fn(job, **params) on a worker; its return value is the job's result.
+            kind (str): The type of job.
+            **params: Arguments for fn.
+
+        Returns:
+            str: The job ID.
+
+        Raises:
+            RuntimeError: If the session already has its maximum of active jobs, or the queue is full.
+        """
+        self._prune()
+        with self._lock:
+            # Cancelled jobs that are still winding down do not count
+            active = [job for job in self._jobs.values() if job.status in ACTIVE_STATUSES and not job.cancelled]
+            if sum(job.session_id == session_id for job in active) >= self.max_jobs_per_session:
+                raise RuntimeError("A generation for this session is already in progress.")
+            if sum(job.status == QUEUED for job in active) >= self.max_queued:
+                raise RuntimeError("The server is busy, please try again in a moment.")
+            job = Job(session_id, kind, params)
+            self._jobs[job.job_id] = job
+        self._executor.submit(self._run, job, fn)
+        return job.job_id
+
+    def _run(self, job, fn):
+        with job._lock:
+            if job.cancelled:
+                job.status, job.message, job.finished_at = CANCELLED, "Cancelled", time.time()
+                return
+            job.status, job.started_at = RUNNING, time.time()
+        try:
+            result = fn(job, **job.params)
+            status, error = DONE, None
+        except JobCancelled:
+            result, status, error = None, CANCELLED, None
+        except Exception as e:
+            print(f"Job {job.job_id} failed: {e}")
+            result, status, error = None, FAILED, str(e)
+        with job._lock:
+            job.result, job.status, job.error, job.finished_at = result, status, error, time.time()
+            # The job's arguments can hold large objects such as model integrations
+            job.params = {}
+            if status == CANCELLED:
+                job.message = "Cancelled"
+
+    def get(self, job_id):
+        """
+        Get a job.
+
+        Args:
+            job_id (str): The job ID.
+
+        Returns:
+            Job: The job, or None if it is unknown or was pruned.
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def session_jobs(self, session_id):
+        """
+        Get the jobs of a session, oldest first.
+
+        Args:
+            session_id (str): The session.
+
+        Returns:
+            list: The session's jobs.
+        """
+        with self._lock:
+            return sorted(
+                (job for job in self._jobs.values() if job.session_id == session_id),
+                key=lambda job: job.created_at
+            )
+
+    def cancel(self, job_id):
+        """
+        Cancel a job. A queued job never starts; a running job stops at its next check.
+
+        Args:
+            job_id (str): The job ID.
+
+        Returns:
+            bool: True if the job was still active.
+        """
+        job = self.get(job_id)
+        if job is None or job.status not in ACTIVE_STATUSES:
+            return False
+        job.cancel()
+        return True
+
+    def get_stats(self):
+        """
+        Get the number of jobs by status.
+
+        Returns:
+            dict: Counts of queued, running, done, failed and cancelled jobs, and the worker limit.
+        """
+        with self._lock:
+            stats = {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED, CANCELLED)}
+            for job in self._jobs.values():
+                stats[job.status] += 1
+        stats["workers"] = self.max_workers
+        return stats
+
+    def _prune(self):
+        """
+        Drop finished jobs older than the retention period.
+        """
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            for job_id, job in list(self._jobs.items()):
+                if job.finished_at is not None and job.finished_at < cutoff:
+                    del self._jobs[job_id]
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """
+    Get the process-wide job queue, configured from JOB_WORKERS, JOB_MAX_QUEUED,
+    JOB_MAX_PER_SESSION and JOB_RETENTION_SECONDS.
+
+    Returns:
+        JobQueue: The shared queue.
+    """
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(
+                max_workers=int(os.getenv("JOB_WORKERS", DEFAULT_WORKERS)),
+                max_queued=int(os.getenv("JOB_MAX_QUEUED", DEFAULT_MAX_QUEUED)),
+                max_jobs_per_session=int(os.getenv("JOB_MAX_PER_SESSION", DEFAULT_MAX_JOBS_PER_SESSION)),
+                retention_seconds=float(os.getenv("JOB_RETENTION_SECONDS", DEFAULT_RETENTION_SECONDS))
+            )
+        return _job_queue
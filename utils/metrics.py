@@ -0,0 +1,478 @@
+"""
+Lightweight instrumentation for the interview preparation framework.
+
+Records stage wall times, prompt and output token counts, retries, prompt
+truncations, backoff time and cache hits. Totals are kept process-wide and
+exported in Prometheus text format; each pipeline run also gets its own
+record, which can be written as a JSON log line and shown in the app.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRIC_PREFIX = "interview_prep"
+# Histogram buckets for stage wall times, in seconds
+STAGE_BUCKETS = (0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+DEFAULT_RECENT_RUNS = 50
+
+_METRIC_HELP = {
+    "stage_seconds": ("histogram", "Wall time of pipeline stages."),
+    "llm_calls_total": ("counter", "Model calls made, excluding cache hits."),
+    "prompt_tokens_total": ("counter", "Estimated prompt tokens sent to the model."),
+    "output_tokens_total": ("counter", "Estimated output tokens received from the model."),
+    "retries_total": ("counter", "Model call attempts that were retried."),
+    "truncations_total": ("counter", "Prompts truncated before being sent to the model."),
+    "backoff_seconds_total": ("counter", "Time spent backing off after rate limit errors."),
+    "cache_lookups_total": ("counter", "Cache lookups by cache and result."),
+    "coalesced_calls_total": ("counter", "Model calls served by joining an identical call in flight."),
+    "hedged_calls_total": ("counter", "Slow model calls hedged to a backup model, by which model answered first."),
+}
+
+
+class PipelineRun:
+    """
+    The measurements of one pipeline run.
+    """
+
+    def __init__(self, **labels):
+        """
+        Initialize the run.
+
+        Args:
+            **labels: Descriptive fields stored with the run, e.g. provider and model.
+        """
+        self.run_id = uuid.uuid4().hex[:12]
+        self.labels = labels
+        self.started_at = time.time()
+        self.elapsed_seconds = None
+        self.stages = {}
+        self.counters = {
+            "llm_calls": 0,
+            "prompt_tokens": 0,
+            "output_tokens": 0,
+            "retries": 0,
+            "truncations": 0,
+            "backoff_seconds": 0.0,
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "coalesced_calls": 0,
+            "hedged_calls": 0,
+        }
+        self._lock = threading.Lock()
+
+    def add_stage(self, stage, seconds):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def add(self, counter, value=1):
+        with self._lock:
+            self.counters[counter] += value
+
+    def to_dict(self):
+        """
+        Get the run as a JSON-serializable dictionary.
+
+        Returns:
+            dict: The run's labels, stage times and counters.
+        """
+        with self._lock:
+            return {
+                "run_id": self.run_id,
+                "started_at": round(self.started_at, 3),
+                "elapsed_seconds": None if self.elapsed_seconds is None else round(self.elapsed_seconds, 3),
+                **self.labels,
+                "stages": {stage: round(seconds, 3) for stage, seconds in self.stages.items()},
+                **{name: round(value, 3) if isinstance(value, float) else value
+                   for name, value in self.counters.items()},
+            }
+
+
+def _escape_label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """
+    Thread-safe process-wide counters and histograms.
+    """
+
+    def __init__(self, max_recent_runs=DEFAULT_RECENT_RUNS):
+        """
+        Initialize the registry.
+
+        Args:
+            max_recent_runs (int): Number of finished pipeline runs to keep.
+        """
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._recent_runs = deque(maxlen=max_recent_runs)
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def increment(self, name, value=1, **labels):
+        """
+        Add to a counter.
+
+        Args:
+            name (str): The metric name, without the prefix.
+            value (float): The amount to add.
+            **labels: The metric labels.
+        """
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """
+        Record a sample in a histogram.
+
+        Args:
+            name (str): The metric name, without the prefix.
+            value (float): The sample.
+            **labels: The metric labels.
+        """
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.setdefault(
+                key, {"buckets": [0] * len(STAGE_BUCKETS), "count": 0, "sum": 0.0}
+            )
+            for index, bound in enumerate(STAGE_BUCKETS):
+                if value <= bound:
+                    histogram["buckets"][index] += 1
+            histogram["count"] += 1
+            histogram["sum"] += value
+
+    def add_run(self, run):
+        """
+        Keep a finished pipeline run for the recent runs list.
+
+        Args:
+            run (PipelineRun): The finished run.
+        """
+        with self._lock:
+            self._recent_runs.append(run)
+
+    def recent_runs(self):
+        """
+        Get the most recently finished pipeline runs.
+
+        Returns:
+            list: Run dictionaries, oldest first.
+        """
+        with self._lock:
+            runs = list(self._recent_runs)
+        return [run.to_dict() for run in runs]
+
+    def snapshot(self):
+        """
+        Get every metric as a JSON-serializable dictionary.
+
+        Returns:
+            dict: {"counters": [...], "histograms": [...], "recent_runs": [...]}
+        """
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            histograms = [
+                {"name": name, "labels": dict(labels), "count": data["count"], "sum": round(data["sum"], 3)}
+                for (name, labels), data in sorted(self._histograms.items())
+            ]
+        return {"counters": counters, "histograms": histograms, "recent_runs": self.recent_runs()}
+
+    def render_prometheus(self):
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics text.
+        """
+        def format_labels(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in pairs) + "}"
+
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, dict(data, buckets=list(data["buckets"])))
+                                for key, data in self._histograms.items())
+
+        lines = []
+        described = set()
+
+        def describe(name):
+            if name not in described:
+                described.add(name)
+                metric_type, help_text = _METRIC_HELP.get(name, ("untyped", ""))
+                lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+                lines.append(f"# TYPE {METRIC_PREFIX}_{name} {metric_type}")
+
+        for (name, labels), value in counters:
+            describe(name)
+            lines.append(f"{METRIC_PREFIX}_{name}{format_labels(labels)} {value}")
+        for (name, labels), data in histograms:
+            describe(name)
+            for bound, count in zip(STAGE_BUCKETS, data["buckets"]):
+                lines.append(f"{METRIC_PREFIX}_{name}_bucket{format_labels(labels, [('le', str(bound))])} {count}")
+            lines.append(f"{METRIC_PREFIX}_{name}_bucket{format_labels(labels, [('le', '+Inf')])} {data['count']}")
+            lines.append(f"{METRIC_PREFIX}_{name}_count{format_labels(labels)} {data['count']}")
+            lines.append(f"{METRIC_PREFIX}_{name}_sum{format_labels(labels)} {data['sum']}")
+        return "\n".join(lines) + "\n"
+
+
+_registry = MetricsRegistry()
+_current_run = contextvars.ContextVar("interview_prep_pipeline_run", default=None)
+_log_lock = threading.Lock()
+
+
+def get_registry():
+    """
+    Get the process-wide metrics registry.
+
+    Returns:
+        MetricsRegistry: The shared registry.
+    """
+    return _registry
+
+
+def current_run():
+    """
+    Get the pipeline run being measured in this context.
+
+    Returns:
+        PipelineRun: The current run, or None outside of pipeline_run().
+    """
+    return _current_run.get()
+
+
+@contextmanager
+def pipeline_run(**labels):
+    """
+    Measure a pipeline run. Measurements made in this context, including work
+    submitted to threads with utils.helpers.submit_with_context(), are added to the run.
+
+    When METRICS_LOG_PATH is set, the finished run is appended to that file as
+    a JSON line.
+
+    Args:
+        **labels: Descriptive fields stored with the run, e.g. provider and model.
+
+    Yields:
+        PipelineRun: The run.
+    """
+    run = PipelineRun(**labels)
+    token = _current_run.set(run)
+    started = time.perf_counter()
+    try:
+        yield run
+    finally:
+        run.elapsed_seconds = time.perf_counter() - started
+        _current_run.reset(token)
+        _registry.add_run(run)
+        _log_run(run)
+
+
+def _log_run(run):
+    path = os.getenv("METRICS_LOG_PATH")
+    if not path:
+        return
+    try:
+        with _log_lock, open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(run.to_dict()) + "\n")
+    except OSError as e:
+        print(f"Error writing metrics log: {e}")
+
+
+@contextmanager
+def stage_timer(stage):
+    """
+    Measure the wall time of a pipeline stage.
+
+    Args:
+        stage (str): The name of the stage, e.g. "company_research".
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        _registry.observe("stage_seconds", seconds, stage=stage)
+        run = current_run()
+        if run is not None:
+            run.add_stage(stage, seconds)
+
+
+def record_llm_call(provider, model_name, call_type, prompt_tokens, output_tokens):
+    """
+    Record a model call and its token counts.
+
+    Args:
+        provider (str): The model provider.
+        model_name (str): The name of the model.
+        call_type (str): The type of call, e.g. "company_research".
+        prompt_tokens (int): The prompt token count.
+        output_tokens (int): The output token count.
+    """
+    labels = {"provider": provider, "model": model_name, "call_type": call_type or "other"}
+    _registry.increment("llm_calls_total", **labels)
+    _registry.increment("prompt_tokens_total", prompt_tokens, **labels)
+    _registry.increment("output_tokens_total", output_tokens, **labels)
+    run = current_run()
+    if run is not None:
+        run.add("llm_calls")
+        run.add("prompt_tokens", prompt_tokens)
+        run.add("output_tokens", output_tokens)
+
+
+def record_retry(provider, reason):
+    """
+    Record a retried model call attempt.
+
+    Args:
+        provider (str): The model provider.
+        reason (str): Why the attempt failed, e.g. "timeout" or "rate_limit".
+    """
+    _registry.increment("retries_total", provider=provider, reason=reason)
+    run = current_run()
+    if run is not None:
+        run.add("retries")
+
+
+def record_truncation(provider, reason):
+    """
+    Record a prompt that was truncated before being sent.
+
+    Args:
+        provider (str): The model provider.
+        reason (str): Why the prompt was truncated, e.g. "length" or "timeout".
+    """
+    _registry.increment("truncations_total", provider=provider, reason=reason)
+    run = current_run()
+    if run is not None:
+        run.add("truncations")
+
+
+def record_backoff(provider, seconds):
+    """
+    Record time spent backing off after a rate limit error.
+
+    Args:
+        provider (str): The model provider.
+        seconds (float): The time waited.
+    """
+    _registry.increment("backoff_seconds_total", seconds, provider=provider)
+    run = current_run()
+    if run is not None:
+        run.add("backoff_seconds", seconds)
+
+
+def record_cache_lookup(cache, kind, hit):
+    """
+    Record a cache lookup.
+
+    Args:
+        cache (str): The cache, e.g. "response", "similarity" or "company_index".
+        kind (str): The type of output looked up, e.g. "company_research".
+        hit (bool): Whether the lookup was served from the cache.
+    """
+    _registry.increment("cache_lookups_total", cache=cache, kind=kind or "other", result="hit" if hit else "miss")
+    run = current_run()
+    if run is not None:
+        run.add("cache_hits" if hit else "cache_misses")
+
+
+def record_coalesced_call(provider, call_type):
+    """
+    Record a model call that was served by joining an identical call in flight.
+
+    Args:
+        provider (str): The model provider.
+        call_type (str): The type of call, e.g. "company_research".
+    """
+    _registry.increment("coalesced_calls_total", provider=provider, call_type=call_type or "other")
+    run = current_run()
+    if run is not None:
+        run.add("coalesced_calls")
+
+
+def record_hedge(provider, call_type, winner):
+    """
+    Record a model call that was hedged to a backup model.
+
+    Args:
+        provider (str): The primary model provider.
+        call_type (str): The type of call, e.g. "company_research".
+        winner (str): "primary" or "secondary", whichever answered first.
+    """
+    _registry.increment("hedged_calls_total", provider=provider, call_type=call_type or "other", winner=winner)
+    run = current_run()
+    if run is not None:
+        run.add("hedged_calls")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.split("?")[0].rstrip("/")
+        if path == "/metrics":
+            body = _registry.render_prometheus().encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/metrics.json":
+            body = json.dumps(_registry.snapshot()).encode("utf-8")
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=None, host=None):
+    """
+    Serve /metrics (Prometheus text) and /metrics.json from a background thread.
+    Only one server is started per process; later calls return the running one.
+
+    Args:
+        port (int, optional): The port to listen on. Defaults to METRICS_PORT.
+        host (str, optional): The interface to listen on. Defaults to METRICS_HOST or 127.0.0.1.
+
+    Returns:
+        ThreadingHTTPServer: The server, or None if no port is configured or it cannot be started.
+    """
+    global _server
+    if port is None:
+        port = os.getenv("METRICS_PORT")
+        if not port:
+            return None
+
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host or os.getenv("METRICS_HOST", "127.0.0.1"), int(port)), _MetricsHandler)
+            except (OSError, ValueError) as e:
+                print(f"Error starting metrics server: {e}")
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+            print(f"Serving metrics on http://{_server.server_address[0]}:{_server.server_address[1]}/metrics")
+        return _server
@@ -0,0 +1,101 @@
+"""
+Cached model discovery for the interview preparation framework.
+Model lists are refreshed in a background thread so the sidebar never waits
+on genai.list_models() or ollama.list().
+"""
+import os
+import threading
+import time
+
+from models.client_registry import fingerprint
+from utils.helpers import get_model_integration
+
+# Seconds before a discovered model list is refreshed
+DISCOVERY_TTL = int(os.getenv("MODEL_DISCOVERY_TTL", 300))
+
+_lock = threading.Lock()
+_model_lists = {}
+_refreshing = set()
+
+
+def _discovery_key(model_provider):
+    provider = model_provider.lower()
+    if provider == "google":
+        # Different API keys can see different models
+        return provider, fingerprint(os.getenv("GOOGLE_API_KEY"))
+    return provider, ""
+
+
+def _refresh(key):
+    provider = key[0]
+    try:
+        integration = get_model_integration(provider)
+        if provider == "google" and not integration.api_key:
+            models = list(integration.DEFAULT_MODELS)
+        else:
+            models = integration.list_models()
+        with _lock:
+            _model_lists[key] = (models, time.time())
+    except Exception as e:
+        print(f"Error refreshing {provider} models: {e}")
+    finally:
+        with _lock:
+            _refreshing.discard(key)
+
+
+def refresh_models(model_provider, wait=False):
+    """
+    Refresh the model list for a provider in the background.
+
+    Args:
+        model_provider (str): The model provider ("ollama" or "google").
+        wait (bool): Whether to block until the refresh has finished.
+    """
+    key = _discovery_key(model_provider)
+    with _lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    thread = threading.Thread(target=_refresh, args=(key,), name=f"refresh-{key[0]}-models", daemon=True)
+    thread.start()
+    if wait:
+        thread.join()
+
+
+def get_default_models(model_provider):
+    """
+    Get the hard-coded fallback models for a provider.
+
+    Args:
+        model_provider (str): The model provider ("ollama" or "google").
+
+    Returns:
+        list: The default model names.
+    """
+    return list(get_model_integration(model_provider).DEFAULT_MODELS)
+
+
+def get_available_models(model_provider, ttl=DISCOVERY_TTL):
+    """
+    Get the last known model list for a provider without blocking.
+
+    Stale or missing lists trigger a background refresh. Until the first
+    refresh completes, the provider's default models are returned.
+
+    Args:
+        model_provider (str): The model provider ("ollama" or "google").
+        ttl (int): Seconds before a model list is considered stale.
+
+    Returns:
+        list: The available model names.
+    """
+    key = _discovery_key(model_provider)
+    with _lock:
+        entry = _model_lists.get(key)
+
+    if entry is None or time.time() - entry[1] > ttl:
+        refresh_models(model_provider)
+    if entry is None:
+        return get_default_models(model_provider)
+    return list(entry[0])
@@ -0,0 +1,315 @@
+"""
+Near-duplicate request cache for the interview preparation framework.
+
+Requests are normalized ("SWE" and "Software Engineer II" become "software
+engineer", "Google LLC" becomes "google") and fingerprinted with character
+n-gram MinHash signatures. An LSH index finds earlier requests with similar
+fingerprints, and their outputs are served when every text field is similar
+enough.
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from models.response_cache import CACHE_TTLS, DEFAULT_TTL
+
+NGRAM_SIZE = 3
+NUM_HASHES = 64
+BAND_SIZE = 4
+DEFAULT_THRESHOLD = 0.85
+DEFAULT_MAX_ENTRIES = 5000
+
+_MERSENNE_PRIME = (1 << 61) - 1
+# Fixed hash parameters so signatures are stable across processes
+_HASH_PARAMS = [
+    (
+        int.from_bytes(hashlib.blake2b(f"a{i}".encode(), digest_size=8).digest(), "big") % _MERSENNE_PRIME or 1,
+        int.from_bytes(hashlib.blake2b(f"b{i}".encode(), digest_size=8).digest(), "big") % _MERSENNE_PRIME,
+    )
+    for i in range(NUM_HASHES)
+]
+
+_COMPANY_SUFFIXES = {
+    "inc", "incorporated", "llc", "ltd", "limited", "corp", "corporation", "co", "company",
+    "plc", "gmbh", "ag", "sa", "group", "holdings",
+}
+_ROLE_ABBREVIATIONS = {
+    "swe": "software engineer",
+    "sde": "software engineer",
+    "ml": "machine learning",
+    "ai": "artificial intelligence",
+    "ds": "data scientist",
+    "pm": "product manager",
+    "tpm": "technical program manager",
+    "em": "engineering manager",
+    "sre": "site reliability engineer",
+    "qa": "quality assurance",
+    "ux": "user experience",
+    "ui": "user interface",
+    "sr": "senior",
+    "jr": "junior",
+    "eng": "engineer",
+    "engr": "engineer",
+    "dev": "developer",
+    "mgr": "manager",
+}
+# Level markers that do not change what the role is about
+_ROLE_LEVELS = re.compile(r"\b(?:i{1,3}|iv|v|l\d+|level \d+|\d+)\b")
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+# Symbols that tell technologies apart, e.g. "C", "C++" and "C#", turned into words before punctuation is dropped
+_SYMBOL_TOKENS = [
+    (re.compile(r"c\+\+"), " cpp "),
+    (re.compile(r"\b([a-z])#"), r" \1sharp "),
+    (re.compile(r"\.net\b"), " dotnet "),
+    (re.compile(r"\b([a-z0-9]+)\.js\b"), r" \1js "),
+    (re.compile(r"\+"), " plus "),
+]
+
+
+def _words(text):
+    """
+    Split text into lowercase words, keeping symbols that distinguish technologies as words.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        list: The words.
+    """
+    text = text.lower()
+    for pattern, replacement in _SYMBOL_TOKENS:
+        text = pattern.sub(replacement, text)
+    return _NON_WORD.sub(" ", text).split()
+
+
+def fingerprint(*texts):
+    """
+    Get a short fingerprint of texts, for inputs that must match exactly but are too long to compare.
+
+    Args:
+        *texts (str): The texts.
+
+    Returns:
+        str: A hex digest of the texts.
+    """
+    return hashlib.sha256("\0".join(texts).encode("utf-8")).hexdigest()[:16]
+
+
+def normalize_company(company_name):
+    """
+    Normalize a company name for matching.
+
+    Args:
+        company_name (str): The name of the company.
+
+    Returns:
+        str: The normalized name.
+    """
+    words = _words(company_name)
+    if words and words[0] == "the":
+        words = words[1:]
+    while len(words) > 1 and words[-1] in _COMPANY_SUFFIXES:
+        words.pop()
+    return " ".join(words)
+
+
+def normalize_role(role):
+    """
+    Normalize a job role for matching.
+
+    Args:
+        role (str): The job role.
+
+    Returns:
+        str: The normalized role.
+    """
+    words = []
+    for word in _words(role):
+        word = _ROLE_ABBREVIATIONS.get(word, word)
+        # Treat plurals as the singular, e.g. "engineers" and "engineer"
+        if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "js")):
+            word = word[:-1]
+        words.append(word)
+    text = " ".join(words)
+    return " ".join(_ROLE_LEVELS.sub(" ", text).split()) or text
+
+
+def _shingles(text):
+    padded = f" {text} "
+    if len(padded) <= NGRAM_SIZE:
+        return {padded}
+    return {padded[i:i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1)}
+
+
+def _minhash(shingles):
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "big")
+        for shingle in shingles
+    ]
+    return tuple(min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _HASH_PARAMS)
+
+
+def _jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class SimilarityCache:
+    """
+    In-memory cache of generated outputs, looked up by similar rather than identical inputs.
+    Outputs expire on the same per-type TTLs as the response cache.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, max_entries=DEFAULT_MAX_ENTRIES, ttls=None):
+        """
+        Initialize the cache.
+
+        Args:
+            threshold (float): Minimum Jaccard similarity of every text field for a hit.
+            max_entries (int): Maximum number of outputs to keep.
+            ttls (dict, optional): Seconds each type of output is kept, overriding the response cache's TTLs.
+                Types with a TTL of 0 are not cached.
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttls = dict(CACHE_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self._entries = OrderedDict()
+        self._buckets = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    @staticmethod
+    def _bands(kind, exact_fields, signature):
+        return [
+            (kind, exact_fields, start, signature[start:start + BAND_SIZE])
+            for start in range(0, NUM_HASHES, BAND_SIZE)
+        ]
+
+    def lookup(self, kind, text_fields, exact_fields=()):
+        """
+        Find the output of an earlier, similar request.
+
+        Args:
+            kind (str): The type of output, e.g. "company_research".
+            text_fields (tuple): Normalized free-text inputs compared by similarity.
+            exact_fields (tuple): Inputs that must match exactly, e.g. the model and experience level.
+
+        Returns:
+            str: The cached output, or None if no similar request is cached.
+        """
+        shingles = [_shingles(text) for text in text_fields]
+        signature = _minhash(_shingles(" | ".join(text_fields)))
+        exact_fields = tuple(exact_fields)
+
+        with self._lock:
+            stats = self._stats.setdefault(kind, {"lookups": 0, "hits": 0})
+            stats["lookups"] += 1
+
+            candidates = set()
+            for band in self._bands(kind, exact_fields, signature):
+                candidates.update(self._buckets.get(band, ()))
+
+            best_id, best_score = None, 0.0
+            now = time.time()
+            for entry_id in candidates:
+                entry = self._entries[entry_id]
+                if entry["expires_at"] <= now:
+                    self._remove(entry_id)
+                    continue
+                score = min(_jaccard(a, b) for a, b in zip(shingles, entry["shingles"]))
+                if score >= self.threshold and score > best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None:
+                return None
+            stats["hits"] += 1
+            self._entries.move_to_end(best_id)
+            return self._entries[best_id]["value"]
+
+    def store(self, kind, text_fields, value, exact_fields=()):
+        """
+        Cache the output of a request.
+
+        Args:
+            kind (str): The type of output, e.g. "company_research".
+            text_fields (tuple): Normalized free-text inputs compared by similarity.
+            value (str): The output to cache.
+            exact_fields (tuple): Inputs that must match exactly.
+        """
+        ttl = self.ttls.get(kind, DEFAULT_TTL)
+        if ttl <= 0:
+            return
+        signature = _minhash(_shingles(" | ".join(text_fields)))
+        bands = self._bands(kind, tuple(exact_fields), signature)
+
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = {
+                "shingles": [_shingles(text) for text in text_fields],
+                "bands": bands,
+                "value": value,
+                "expires_at": time.time() + ttl,
+            }
+            for band in bands:
+                self._buckets.setdefault(band, set()).add(entry_id)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, entry_id):
+        """
+        Drop an entry and its index buckets. The caller must hold the lock.
+        """
+        entry = self._entries.pop(entry_id)
+        for band in entry["bands"]:
+            bucket = self._buckets.get(band)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[band]
+
+    def get_stats(self):
+        """
+        Get lookup and hit counts per type of output.
+
+        Returns:
+            dict: {kind: {"lookups": int, "hits": int, "hit_rate": float}}
+        """
+        with self._lock:
+            return {
+                kind: dict(stats, hit_rate=stats["hits"] / stats["lookups"] if stats["lookups"] else 0.0)
+                for kind, stats in self._stats.items()
+            }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_similarity_cache():
+    """
+    Get the process-wide similarity cache configured from SIMILARITY_CACHE_THRESHOLD
+    and SIMILARITY_CACHE_MAX_ENTRIES.
+
+    Returns:
+        SimilarityCache: The shared cache, or None if SIMILARITY_CACHE_DISABLED is set.
+    """
+    global _default_cache
+    if os.getenv("SIMILARITY_CACHE_DISABLED", "").lower() in ("1", "true", "yes"):
+        return None
+
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = SimilarityCache(
+                threshold=float(os.getenv("SIMILARITY_CACHE_THRESHOLD", DEFAULT_THRESHOLD)),
+                max_entries=int(os.getenv("SIMILARITY_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+            )
+        return _default_cache
@@ -0,0 +1,161 @@
+"""
+Token budgeting for prompts in the interview preparation framework.
+Estimates token counts per provider and model, shares a token budget across
+prompt sections and trims text at paragraph or sentence boundaries.
+"""
+import math
+import re
+import threading
+
+# Approximate characters per token for English prose
+DEFAULT_CHARS_PER_TOKEN = 4.0
+PROVIDER_CHARS_PER_TOKEN = {
+    "google": 4.0,
+    "ollama": 3.8,
+}
+# Model families whose tokenizers differ noticeably from their provider's default,
+# matched by name prefix
+MODEL_CHARS_PER_TOKEN = {
+    "gemini": 4.0,
+    "gemma": 4.0,
+    "llama3": 4.2,
+    "llama2": 3.6,
+    "mistral": 3.6,
+    "codellama": 3.4,
+}
+
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s")
+
+_stats_lock = threading.Lock()
+_stats = {"trimmed_sections": 0, "tokens_saved": 0}
+
+
+def chars_per_token(provider=None, model_name=None):
+    """
+    Get the approximate number of characters per token for a model.
+
+    Args:
+        provider (str, optional): The model provider.
+        model_name (str, optional): The name of the model.
+
+    Returns:
+        float: Characters per token.
+    """
+    if model_name:
+        name = model_name.lower().split("/")[-1]
+        for prefix, ratio in MODEL_CHARS_PER_TOKEN.items():
+            if name.startswith(prefix):
+                return ratio
+    return PROVIDER_CHARS_PER_TOKEN.get(provider, DEFAULT_CHARS_PER_TOKEN)
+
+
+def estimate_tokens(text, provider=None, model_name=None):
+    """
+    Estimate the number of tokens in a text.
+
+    Args:
+        text (str): The text.
+        provider (str, optional): The model provider.
+        model_name (str, optional): The name of the model.
+
+    Returns:
+        int: The estimated token count.
+    """
+    if not text:
+        return 0
+    return math.ceil(len(text) / chars_per_token(provider, model_name))
+
+
+def trim_to_tokens(text, max_tokens, provider=None, model_name=None, marker="... (truncated)"):
+    """
+    Trim a text to a token budget, cutting at the last paragraph or sentence
+    boundary that fits rather than mid-sentence.
+
+    Args:
+        text (str): The text to trim.
+        max_tokens (int): The token budget.
+        provider (str, optional): The model provider.
+        model_name (str, optional): The name of the model.
+        marker (str): Appended to the text when it is trimmed.
+
+    Returns:
+        str: The text, trimmed if it exceeded the budget.
+    """
+    original_tokens = estimate_tokens(text, provider, model_name)
+    if original_tokens <= max_tokens:
+        return text
+
+    char_limit = max(0, int(max_tokens * chars_per_token(provider, model_name)) - len(marker))
+    head = text[:char_limit]
+    # Only fall back to a finer boundary if the coarser one would throw away too much
+    min_cut = char_limit // 2
+
+    cut = head.rfind("\n\n")
+    if cut < min_cut:
+        cut = -1
+        for match in _SENTENCE_END.finditer(head):
+            cut = match.start() + 1
+        if cut < min_cut:
+            cut = head.rfind(" ")
+            if cut < min_cut:
+                cut = char_limit
+
+    trimmed = head[:cut].rstrip() + marker
+    _record_savings(original_tokens - estimate_tokens(trimmed, provider, model_name))
+    return trimmed
+
+
+def allocate_budget(sections, total_tokens, provider=None, model_name=None, marker="... (truncated)"):
+    """
+    Share a token budget across prompt sections and trim each to its share.
+
+    Sections shorter than an even share keep all their text and the unused
+    budget goes to the longer sections.
+
+    Args:
+        sections (dict): Section texts keyed by name.
+        total_tokens (int): The token budget for all sections together.
+        provider (str, optional): The model provider.
+        model_name (str, optional): The name of the model.
+        marker (str): Appended to sections that are trimmed.
+
+    Returns:
+        dict: The fitted section texts, keyed by name.
+    """
+    sizes = {name: estimate_tokens(text, provider, model_name) for name, text in sections.items()}
+    budgets = {}
+    remaining_tokens = total_tokens
+    remaining = sorted(sizes, key=sizes.get)
+    while remaining:
+        share = remaining_tokens // len(remaining)
+        name = remaining[0]
+        if sizes[name] <= share:
+            budgets[name] = sizes[name]
+            remaining_tokens -= sizes[name]
+            remaining.pop(0)
+        else:
+            for name in remaining:
+                budgets[name] = share
+            break
+
+    return {
+        name: trim_to_tokens(text or "", budgets[name], provider, model_name, marker) if text else text
+        for name, text in sections.items()
+    }
+
+
+def _record_savings(tokens_saved):
+    with _stats_lock:
+        _stats["trimmed_sections"] += 1
+        _stats["tokens_saved"] += tokens_saved
+
+
+def get_token_savings():
+    """
+    Get the number of trimmed sections and estimated tokens saved in this process.
+
+    Returns:
+        dict: The trimmed_sections and tokens_saved counters.
+    """
+    with _stats_lock:
+        return dict(_stats)